@@ -51,6 +51,8 @@ INSTALLED_APPS = [
     'rest_framework',
     'orders',
     'payments',
+    'reports',
+    'outbox',
 ]
 
 MIDDLEWARE = [
@@ -26,4 +26,5 @@ urlpatterns = [
     path('api/products/', include('products.urls')),
     path("api/orders/", include('orders.urls')),
     path("api/payments/", include('payments.urls')),
+    path("api/reports/", include('reports.urls')),
 ]
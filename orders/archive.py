@@ -0,0 +1,93 @@
+from datetime import timedelta  # Age threshold for archiving
+
+from django.apps import apps  # Payments live in another app that imports this one
+from django.conf import settings  # Archive threshold
+from django.db import transaction  # Each batch moves all or nothing
+from django.utils import timezone  # Current time for the cutoff
+
+from .models import ArchivedOrder, ArchivedOrderProduct, Order, OrderProduct  # Hot and cold order tables
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)  # Terminal orders older than this move out
+DEFAULT_BATCH_SIZE = 500  # Orders moved per transaction
+
+
+class OrderArchiveService:
+    """
+    Moves orders that reached a terminal status long ago out of the hot tables.
+
+    - An order, its lines and its payments are copied to the archive tables and deleted from the
+      live ones in the same transaction, so an order is always in exactly one of the two places.
+    - Work is done in batches of old terminal orders ordered by ID; every batch commits on its own,
+      so an interrupted run loses nothing and the next run simply continues with what is left.
+    - Reads fall back to the archive through `get_archived_order`.
+    """
+
+    @staticmethod
+    def cutoff(days=None):
+        """
+        Orders completed before this moment are eligible for archiving.
+        """
+        return timezone.now() - timedelta(days=ARCHIVE_AFTER_DAYS if days is None else days)
+
+    @staticmethod
+    def archivable(cutoff):
+        """
+        Live orders in a terminal status that were completed before `cutoff`.
+        """
+        return Order.objects.filter(status__in=Order.TERMINAL_STATUSES, completed_at__lt=cutoff)
+
+    @staticmethod
+    def archive_batch(cutoff, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Moves up to `batch_size` archivable orders with their lines and payments.
+        Returns:
+            The number of orders archived (0 once nothing is left).
+        """
+        Payment = apps.get_model('payments', 'Payment')
+        ArchivedPayment = apps.get_model('payments', 'ArchivedPayment')
+
+        with transaction.atomic():
+            # Lock the batch so a concurrent status change cannot slip in between copy and delete
+            order_ids = list(
+                OrderArchiveService.archivable(cutoff).select_for_update()
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not order_ids:
+                return 0
+
+            # Copy: one SELECT and one INSERT per table
+            OrderArchiveService._copy(Order.objects.filter(pk__in=order_ids), ArchivedOrder)
+            OrderArchiveService._copy(OrderProduct.objects.filter(order_id__in=order_ids), ArchivedOrderProduct)
+            OrderArchiveService._copy(Payment.objects.filter(order_id__in=order_ids), ArchivedPayment)
+
+            # Delete children first; the queryset deletes skip the stock/totals logic of
+            # `OrderProduct.delete`, which must not run for orders that are merely moving
+            Payment.objects.filter(order_id__in=order_ids).delete()
+            OrderProduct.objects.filter(order_id__in=order_ids).delete()
+            Order.objects.filter(pk__in=order_ids).delete()
+            return len(order_ids)
+
+    @staticmethod
+    def _copy(source, target_model):
+        """
+        Inserts a copy of every row of `source` into `target_model`, keeping primary keys.
+        """
+        columns = [
+            field.attname for field in target_model._meta.concrete_fields
+            if field.name != 'archived_at'  # Set by the archive table itself
+        ]
+        target_model.objects.bulk_create(
+            [target_model(**row) for row in source.order_by().values(*columns)]
+        )
+
+    @staticmethod
+    def get_archived_order(pk):
+        """
+        Loads an archived order with its customer and lines, ready for `OrderSerializer`.
+        Raises:
+            ArchivedOrder.DoesNotExist: if the order was never archived.
+        """
+        return ArchivedOrder.objects.select_related('user') \
+                                    .prefetch_related('order_products__product') \
+                                    .get(pk=pk)
@@ -0,0 +1,34 @@
+import time  # High-resolution timing
+from contextlib import contextmanager  # Rolled-back benchmark data
+
+from django.db import transaction  # Synthetic data is rolled back after the run
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic benchmark data."""
+
+
+@contextmanager
+def rolled_back():
+    """
+    Runs the block in a transaction that is always rolled back, so benchmark commands leave the
+    database as they found it. Other exceptions propagate as usual.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback  # Leave the database as we found it
+    except Rollback:
+        pass
+
+
+def best_of(func, repeat):
+    """
+    Best wall-clock time of `repeat` calls of `func`, in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -0,0 +1,88 @@
+import logging  # Cache outages are logged, never raised to the caller
+import time  # Seeds fresh version counters
+
+from django.conf import settings  # Optional timeout override
+from django.core.cache import cache  # Configured Django cache (Redis in production)
+
+logger = logging.getLogger(__name__)
+
+
+class OrderDetailCache:
+    """
+    Caches serialized order detail responses under versioned keys.
+
+    Every order has a version counter in the cache; the payload lives under
+    `order_detail:<pk>:v<version>`. Invalidating an order bumps its counter, which makes
+    every previously cached payload unreachable at once. A reader that loaded stale data just
+    before a write commits can only store it under the old version, so it can never be served.
+
+    The cache is an optimization only: if it is unavailable, reads fall through to the database
+    and invalidations are logged.
+    """
+    timeout = getattr(settings, 'ORDER_DETAIL_CACHE_TIMEOUT', 300)  # Seconds a payload may be served
+    # Counters outlive every payload stored under them, but do expire, so keys probed once
+    # (including IDs that do not exist) do not pile up; a re-created counter just means a miss
+    version_timeout = getattr(settings, 'ORDER_DETAIL_VERSION_TIMEOUT', timeout * 12)
+
+    @staticmethod
+    def version_key(pk):
+        return f'order_detail_version:{pk}'
+
+    @classmethod
+    def data_key(cls, pk, version):
+        return f'order_detail:{pk}:v{version}'
+
+    @classmethod
+    def get_version(cls, pk):
+        """
+        Current version of an order's cache entry, creating the counter if needed.
+        New counters start from the clock so they are always above any version used before an eviction.
+        """
+        version = cache.get(cls.version_key(pk))
+        if version is None:
+            cache.add(cls.version_key(pk), time.time_ns(), cls.version_timeout)  # Only the first writer wins
+            version = cache.get(cls.version_key(pk))
+        return version
+
+    @classmethod
+    def get(cls, pk):
+        """
+        Cached detail payload for the order, or None on a miss.
+        Returns (payload, version) so the caller can store a fresh payload under the version it read.
+        """
+        try:
+            version = cls.get_version(pk)
+            return cache.get(cls.data_key(pk, version)), version
+        except Exception:
+            logger.warning(f"Order detail cache unavailable for order {pk}", exc_info=True)
+            return None, None
+
+    @classmethod
+    def set(cls, pk, version, payload):
+        """
+        Store a payload under the version that was current before it was read from the database.
+        """
+        if version is None:  # Cache was unavailable when reading
+            return
+        try:
+            cache.set(cls.data_key(pk, version), payload, cls.timeout)
+        except Exception:
+            logger.warning(f"Could not cache detail for order {pk}", exc_info=True)
+
+    @classmethod
+    def invalidate(cls, pk):
+        """
+        Make every cached payload for the order unreachable.
+        """
+        try:
+            try:
+                cache.incr(cls.version_key(pk))
+            except ValueError:  # Counter missing (never read or evicted)
+                cache.set(cls.version_key(pk), time.time_ns(), cls.version_timeout)
+        except Exception:
+            logger.error(f"Could not invalidate cached detail for order {pk}", exc_info=True)
+
+    @classmethod
+    def invalidate_many(cls, pks):
+        for pk in pks:
+            cls.invalidate(pk)
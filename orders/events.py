@@ -0,0 +1,17 @@
+from django.dispatch import Signal  # Custom order lifecycle signals
+
+# Order lifecycle events for read models (reports, dashboards) that must follow orders without
+# scanning them. Sent inside the writing transaction, also by the set-based code paths that do
+# not fire model signals. Kept free of model imports so models.py can send them.
+
+# Orders changed status (or were created, with `old_status` None).
+# kwargs: changes -> list of (order_id, created_at, old_status, new_status)
+orders_status_changed = Signal()
+
+# Booked units and revenue of an order's lines changed (only for orders that still hold stock,
+# i.e. not cancelled or returned). kwargs: order_id, created_at, changes -> {product_id: (units, revenue)}
+order_lines_changed = Signal()
+
+# An order was deleted for good (archiving is not deletion). Sent before the deletion commits.
+# kwargs: order_id, user_id, created_at, spent -> sum of its successful payments
+order_deleted = Signal()
@@ -1,3 +1,30 @@
 class OrderValidationError(Exception):
     """Custom exception for order validation errors"""
-    pass
\ No newline at end of file
+    pass
+
+
+class InsufficientStockError(OrderValidationError):
+    """Raised when a stock reservation cannot be satisfied"""
+
+    def __init__(self, product_id, requested, available):
+        self.product_id = product_id  # Product that ran out of stock
+        self.requested = requested  # Units the order asked for
+        self.available = available  # Units left in stock when the reservation was attempted
+        super().__init__(
+            f"Only {available} units of product {product_id} available in stock, {requested} requested"
+        )
+
+
+class OrderConcurrencyError(Exception):
+    """
+    Raised when an order was changed by someone else between loading and saving it.
+    Retryable: reload the order, re-apply the change and save again (the API answers 409).
+    """
+    retryable = True  # Safe to retry after reloading the order
+
+    def __init__(self, order_id, expected_version):
+        self.order_id = order_id  # Order that was modified concurrently
+        self.expected_version = expected_version  # Version this instance was loaded with
+        super().__init__(
+            f"Order {order_id} was modified concurrently (expected version {expected_version}); reload and retry"
+        )
@@ -0,0 +1,55 @@
+from asgiref.sync import sync_to_async  # Chunks are loaded off the event loop under ASGI
+from rest_framework.utils.encoders import JSONEncoder  # Same encoding rules as DRF's JSON renderer
+
+from .models import Order  # Orders being exported
+from .serializers import OrderSerializer  # Export rows use the public API representation
+
+DEFAULT_CHUNK_SIZE = 500  # Orders loaded (and prefetched) per round trip
+
+
+def iter_order_chunks(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield orders in primary-key order, one chunk at a time, with users, lines and products
+    prefetched for each chunk only.
+
+    Chunks are read with keyset windows (`pk > last_seen LIMIT chunk_size`) rather than one
+    long-running cursor: MySQL drivers buffer an entire result set client-side, so this is what
+    keeps peak memory bounded by `chunk_size` regardless of table size.
+    """
+    if queryset is None:
+        queryset = Order.objects.all()
+    queryset = queryset.select_related('user').prefetch_related('order_products__product').order_by('pk')
+
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])  # 3 queries: orders+users, lines, products
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def iter_orders_ndjson(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the export as newline-delimited JSON, one string per chunk of orders.
+    Each line is exactly what `OrderSerializer` returns for that order.
+    """
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for chunk in iter_order_chunks(queryset, chunk_size):
+        rows = OrderSerializer(chunk, many=True).data
+        yield ''.join(encoder.encode(row) + '\n' for row in rows)
+
+
+async def aiter_orders_ndjson(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    `iter_orders_ndjson` as an async iterator, for responses served under ASGI.
+    Django reads a sync iterator into memory before an ASGI response sends anything, so each
+    chunk is loaded and serialized in the sync thread here and sent before the next one is read.
+    """
+    blocks = iter_orders_ndjson(queryset, chunk_size)
+    next_block = sync_to_async(next)  # Thread-sensitive: every chunk uses the same database connection
+    while True:
+        block = await next_block(blocks, None)
+        if block is None:
+            return
+        yield block
@@ -0,0 +1,209 @@
+import functools  # Preserves the wrapped view's metadata
+import hashlib  # Request fingerprints
+import json  # Normalizes response bodies before storing them
+import logging  # Diagnostics for claim conflicts and failures
+import time  # Polling while another request holds the key
+from datetime import timedelta  # Stale claim detection
+
+from django.conf import settings  # Optional timing overrides
+from django.core.cache import cache  # Fast replay of completed responses
+from django.db import IntegrityError, transaction  # Claims are decided by the unique constraint
+from django.utils import timezone  # Claim ages
+from rest_framework import status  # HTTP status codes
+from rest_framework.renderers import JSONRenderer  # Same encoding the API responds with
+from rest_framework.response import Response  # Replayed responses
+
+from .models import IdempotencyKey  # Durable claim and response store
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'  # Request header carrying the client's key
+REPLAY_HEADER = 'Idempotent-Replayed'  # Set on responses replayed from a previous request
+RESPONSE_TTL = getattr(settings, 'IDEMPOTENCY_RESPONSE_TTL', 24 * 60 * 60)  # Seconds a response is replayable
+WAIT_TIMEOUT = getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)  # Seconds a duplicate waits for the original
+STALE_AFTER = getattr(settings, 'IDEMPOTENCY_STALE_AFTER', 60)  # Seconds before an unfinished claim is taken over
+POLL_INTERVAL = 0.05  # Seconds between checks while waiting
+# 4xx answers that describe a passing condition rather than the request itself; like 5xx they are not stored
+TRANSIENT_STATUSES = {
+    status.HTTP_408_REQUEST_TIMEOUT,
+    status.HTTP_409_CONFLICT,
+    status.HTTP_425_TOO_EARLY,
+    status.HTTP_429_TOO_MANY_REQUESTS,
+}
+
+
+class IdempotencyStore:
+    """
+    Claims keys and stores responses in the database, with the cache in front for replays.
+    """
+
+    def __init__(self, scope, key, request_hash):
+        self.scope = scope
+        self.key = key
+        self.request_hash = request_hash
+        self.cache_key = f'idempotency:{scope}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def cached(self):
+        """
+        Completed response from the cache, or None.
+        """
+        try:
+            return cache.get(self.cache_key)
+        except Exception:
+            logger.warning("Idempotency cache unavailable", exc_info=True)
+            return None
+
+    def claim(self):
+        """
+        Try to become the request that executes this key.
+        Returns:
+            (True, None) if this request must run, or (False, record) if the key is already taken.
+        """
+        try:
+            with transaction.atomic():  # Savepoint so a conflict does not break an outer transaction
+                IdempotencyKey.objects.create(scope=self.scope, key=self.key, request_hash=self.request_hash)
+            return True, None
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(scope=self.scope, key=self.key).first()
+            if record is None:  # The other request failed and released the key in the meantime
+                return self.claim()
+            if record.state == IdempotencyKey.State.PROCESSING and self.take_over_stale(record):
+                return True, None
+            return False, record
+
+    def take_over_stale(self, record):
+        """
+        Reclaim a key whose original request died without finishing or releasing it.
+        """
+        cutoff = timezone.now() - timedelta(seconds=STALE_AFTER)
+        return IdempotencyKey.objects.filter(
+            pk=record.pk, state=IdempotencyKey.State.PROCESSING, updated_at__lt=cutoff
+        ).update(request_hash=self.request_hash, updated_at=timezone.now()) == 1
+
+    def complete(self, response):
+        """
+        Store the response of the request that ran and publish it for replays.
+        """
+        body = json.loads(JSONRenderer().render(response.data)) if response.data is not None else None
+        IdempotencyKey.objects.filter(scope=self.scope, key=self.key).update(
+            state=IdempotencyKey.State.COMPLETED,
+            response_status=response.status_code,
+            response_body=body,
+            updated_at=timezone.now()
+        )
+        self.publish({'request_hash': self.request_hash, 'status': response.status_code, 'body': body})
+
+    def release(self):
+        """
+        Forget the claim so a retry can execute the request again (used after server errors).
+        """
+        IdempotencyKey.objects.filter(
+            scope=self.scope, key=self.key, state=IdempotencyKey.State.PROCESSING
+        ).delete()
+
+    def publish(self, entry):
+        try:
+            cache.set(self.cache_key, entry, RESPONSE_TTL)
+        except Exception:
+            logger.warning("Could not cache idempotent response", exc_info=True)
+
+    def wait(self):
+        """
+        Wait for the request holding the key to finish.
+        Polls the cache every tick and the database every few ticks (in case the cache is unavailable).
+        Returns the completed entry, None if the holder released the key, or False on timeout.
+        """
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        tick = 0
+        while time.monotonic() < deadline:
+            entry = self.cached()
+            if entry is not None:
+                return entry
+            if tick % 10 == 9:
+                record = IdempotencyKey.objects.filter(scope=self.scope, key=self.key).first()
+                if record is None:
+                    return None
+                if record.state == IdempotencyKey.State.COMPLETED:
+                    return self.entry_from(record)
+            tick += 1
+            time.sleep(POLL_INTERVAL)
+        return False
+
+    def entry_from(self, record):
+        entry = {'request_hash': record.request_hash, 'status': record.response_status, 'body': record.response_body}
+        self.publish(entry)  # Warm the cache for further retries
+        return entry
+
+
+def replay(store, entry):
+    """
+    Build the response for a retry from a stored entry.
+    """
+    if entry['request_hash'] != store.request_hash:
+        return Response(
+            {"error": f"{HEADER} was already used with a different request body."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(entry['body'], status=entry['status'])
+    response[REPLAY_HEADER] = 'true'
+    return response
+
+
+def idempotent(scope):
+    """
+    Decorator for APIView handlers that honours the `Idempotency-Key` header.
+
+    - Requests without the header run normally.
+    - The first request with a key runs and its final response (2xx, or a 4xx about the request itself)
+      is stored. Server errors, gateway failures and transient 4xx (TRANSIENT_STATUSES) release the
+      key instead, so a retry runs the handler again. So does any exception the handler raises,
+      which means a 4xx is only stored when the handler returns it rather than raising it.
+    - Retries with the same key get the stored response replayed without running the handler again.
+    - A duplicate arriving while the first request is still running waits for it instead of running
+      a second time; if it does not finish within IDEMPOTENCY_WAIT_TIMEOUT the duplicate gets 409.
+    - Reusing a key with a different request body is rejected with 422.
+
+    Apply it outside any `transaction.atomic` on the handler so the claim is visible to other requests.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return handler(view, request, *args, **kwargs)
+            if len(key) > 255:
+                return Response({"error": f"{HEADER} must be at most 255 characters."},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            store = IdempotencyStore(scope, key, hashlib.sha256(request.body).hexdigest())
+            while True:
+                entry = store.cached()  # Fast path: retry of a finished request
+                if entry is not None:
+                    return replay(store, entry)
+
+                claimed, record = store.claim()
+                if claimed:
+                    break
+                if record.state == IdempotencyKey.State.COMPLETED:
+                    return replay(store, store.entry_from(record))
+
+                entry = store.wait()  # Another request is running this key right now
+                if entry is False:
+                    return Response({"error": "A request with this Idempotency-Key is still in progress."},
+                                    status=status.HTTP_409_CONFLICT)
+                if entry is not None:
+                    return replay(store, entry)
+                # The original request failed and released the key: try to run it ourselves
+
+            try:
+                response = handler(view, request, *args, **kwargs)
+            except Exception:
+                store.release()
+                raise
+            if response.status_code >= 500 or response.status_code in TRANSIENT_STATUSES:  # Not final, let the client retry
+                store.release()
+            else:
+                store.complete(response)
+            return response
+        return wrapper
+    return decorator
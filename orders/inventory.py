@@ -0,0 +1,121 @@
+from django.db import transaction  # Reservations must run inside a transaction to hold row locks
+from django.db.models import Case, F, IntegerField, Value, When  # Database-side stock arithmetic
+from products.cache import ProductCache  # Cached product payloads include the stock level
+from products.models import Products  # Stock lives on the product rows
+from .exceptions import InsufficientStockError  # Raised when stock cannot cover a reservation
+
+
+class StockReservationService:
+    """
+    Reserves and releases product stock for orders.
+
+    - Rows are locked with `select_for_update` in ascending product ID order, so two
+      multi-line orders touching the same products always lock them in the same order
+      and cannot deadlock each other.
+    - Stock is decremented with one conditional UPDATE (`stock_quantity >= requested`),
+      so stock can never go negative even on backends that ignore row locks.
+    - Every call issues a constant number of queries regardless of how many products it touches.
+    - Cached product payloads of the touched products are invalidated once the change commits.
+    """
+
+    @staticmethod
+    def reserve(quantities):
+        """
+        Decrements stock for every product in `quantities`, all or nothing.
+        Args:
+            quantities: dict of product ID -> units to reserve.
+        Raises:
+            InsufficientStockError: if any product does not have enough stock.
+        """
+        quantities = StockReservationService._normalize(quantities)
+        if not quantities:  # Nothing to reserve
+            return
+
+        with transaction.atomic():  # Row locks are held until the surrounding transaction ends
+            available = StockReservationService._lock(quantities)
+
+            # Report the first shortfall with a precise message before attempting the update
+            for product_id, requested in quantities.items():
+                if available.get(product_id, 0) < requested:
+                    raise InsufficientStockError(product_id, requested, available.get(product_id, 0))
+
+            requested = StockReservationService._per_product(quantities)
+            updated = Products.objects.filter(
+                pk__in=quantities,  # Only the products being reserved
+                stock_quantity__gte=requested  # Conditional update: never take more than is left
+            ).update(stock_quantity=F('stock_quantity') - requested)
+
+            if updated != len(quantities):  # A concurrent writer got there first (backends without row locks)
+                shortfall = Products.objects.filter(
+                    pk__in=quantities, stock_quantity__lt=requested
+                ).values_list('pk', 'stock_quantity').first() or (None, 0)
+                raise InsufficientStockError(
+                    shortfall[0], quantities.get(shortfall[0], 0), shortfall[1]
+                )
+            StockReservationService._invalidate(quantities)
+
+    @staticmethod
+    def release(quantities):
+        """
+        Returns reserved units to stock.
+        Args:
+            quantities: dict of product ID -> units to release.
+        """
+        quantities = StockReservationService._normalize(quantities)
+        if not quantities:  # Nothing to release
+            return
+
+        with transaction.atomic():
+            StockReservationService._lock(quantities)  # Same lock order as `reserve`
+            Products.objects.filter(pk__in=quantities).update(
+                stock_quantity=F('stock_quantity') + StockReservationService._per_product(quantities)
+            )
+            StockReservationService._invalidate(quantities)
+
+    @staticmethod
+    def adjust(deltas):
+        """
+        Applies signed per-product changes: positive values are reserved, negative values released.
+        Args:
+            deltas: dict of product ID -> change in reserved units.
+        """
+        StockReservationService.reserve({pk: qty for pk, qty in deltas.items() if qty > 0})
+        StockReservationService.release({pk: -qty for pk, qty in deltas.items() if qty < 0})
+
+    @staticmethod
+    def _normalize(quantities):
+        """
+        Drops zero entries and sorts by product ID to fix the lock order.
+        """
+        return {pk: quantities[pk] for pk in sorted(quantities) if quantities[pk]}
+
+    @staticmethod
+    def _lock(quantities):
+        """
+        Locks the product rows in ascending ID order and returns their current stock.
+        """
+        return dict(
+            Products.objects.select_for_update()
+            .filter(pk__in=quantities)
+            .order_by('pk')  # Deterministic lock order prevents deadlocks between orders
+            .values_list('pk', 'stock_quantity')
+        )
+
+    @staticmethod
+    def _invalidate(quantities):
+        """
+        Drops the cached payloads of the products once the stock change commits.
+        """
+        product_ids = list(quantities)
+        transaction.on_commit(lambda: ProductCache.invalidate_many(product_ids))
+
+    @staticmethod
+    def _per_product(quantities):
+        """
+        CASE expression mapping each product ID to its quantity, for single-statement updates.
+        """
+        return Case(
+            *[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        )
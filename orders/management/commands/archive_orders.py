@@ -0,0 +1,46 @@
+import time  # Pause between batches
+
+from django.core.management.base import BaseCommand  # Base class for custom manage.py commands
+
+from orders.archive import ARCHIVE_AFTER_DAYS, DEFAULT_BATCH_SIZE, OrderArchiveService  # Batch archiver
+
+
+class Command(BaseCommand):
+    """
+    Moves old terminal orders with their lines and payments into the archive tables.
+    Every batch commits on its own, so the command can be stopped at any time and re-run
+    later to continue where it left off.
+
+    Usage:
+        python manage.py archive_orders [--older-than-days 180] [--batch-size 500] [--max-batches N]
+                                        [--sleep 0.5] [--dry-run]
+    """
+    help = "Archive terminal orders completed more than --older-than-days ago, in resumable batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=float, default=ARCHIVE_AFTER_DAYS,
+                            help="Archive orders completed before this many days ago")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Orders moved per transaction")
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches")
+        parser.add_argument('--sleep', type=float, default=0, help="Seconds to pause between batches")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the orders that would be archived")
+
+    def handle(self, *args, **options):
+        cutoff = OrderArchiveService.cutoff(options['older_than_days'])  # Fixed for the whole run
+        if options['dry_run']:
+            count = OrderArchiveService.archivable(cutoff).count()
+            self.stdout.write(f"{count} orders completed before {cutoff:%Y-%m-%d %H:%M} would be archived")
+            return
+
+        archived = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved = OrderArchiveService.archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            archived += moved
+            batches += 1
+            self.stdout.write(f"Batch {batches}: archived {moved} orders ({archived} total)")
+            if options['sleep']:
+                time.sleep(options['sleep'])  # Leave room for live traffic on the primary
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} orders in {batches} batches"))
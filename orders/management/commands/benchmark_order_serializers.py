@@ -0,0 +1,68 @@
+from decimal import Decimal  # Prices for the synthetic catalog
+
+from django.core.management.base import BaseCommand, CommandError  # Base classes for manage.py commands
+from rest_framework.renderers import JSONRenderer  # Render both outputs the way the API does
+
+from orders.benchmarking import best_of, rolled_back  # Shared timing and rollback helpers
+from orders.models import Order, OrderProduct  # Orders being serialized
+from orders.serializers import OrderReadSerializer, OrderSerializer  # The two serialization paths
+from products.models import Products, User  # Synthetic customers and catalog
+
+
+class Command(BaseCommand):
+    """
+    Micro-benchmark comparing `OrderSerializer` with the `OrderReadSerializer` fast path.
+
+    Creates synthetic orders inside a transaction that is rolled back afterwards, serializes them
+    with both paths (including the queries each path needs) and reports the cost per order.
+
+    Usage:
+        python manage.py benchmark_order_serializers [--orders 500] [--lines 5] [--repeat 5]
+    """
+    help = "Compare per-order serialization cost of the DRF and fast read-only order serializers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500, help="Number of synthetic orders")
+        parser.add_argument('--lines', type=int, default=5, help="Lines per order")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per path; the best run is reported")
+
+    def handle(self, *args, **options):
+        if min(options['orders'], options['lines'], options['repeat']) < 1:
+            raise CommandError("--orders, --lines and --repeat must be positive")
+        with rolled_back():  # Leave the database as we found it
+            self.run(options['orders'], options['lines'], options['repeat'])
+
+    def run(self, order_count, line_count, repeat):
+        user = User.objects.create(name="Benchmark customer")
+        products = [
+            Products.objects.create(name=f"Benchmark product {i}", price=Decimal('19.99') + i, stock_quantity=0)
+            for i in range(line_count)
+        ]
+        orders = Order.objects.bulk_create([Order(user=user) for _ in range(order_count)])
+        if orders[0].pk is None:  # Backends that do not return primary keys from bulk inserts
+            orders = list(Order.objects.filter(user=user))
+        OrderProduct.objects.bulk_create([
+            OrderProduct(order=order, product=product, quantity=2, price_at_purchase=product.price)
+            for order in orders for product in products
+        ])
+        queryset = Order.objects.filter(user=user).order_by('-created_at', '-id')
+        renderer = JSONRenderer()
+
+        def drf():
+            return renderer.render(OrderSerializer(
+                queryset.select_related('user').prefetch_related('order_products__product'), many=True
+            ).data)
+
+        def fast():
+            return renderer.render(OrderReadSerializer(queryset).data)
+
+        if drf() != fast():
+            raise CommandError("Fast path output differs from OrderSerializer")
+
+        results = {name: best_of(path, repeat) for name, path in (('OrderSerializer', drf), ('OrderReadSerializer', fast))}
+        self.stdout.write(f"{order_count} orders × {line_count} lines, best of {repeat} runs")
+        for name, seconds in results.items():
+            self.stdout.write(f"  {name:<20} {seconds * 1000:9.1f} ms total  {seconds / order_count * 1e6:8.1f} µs/order")
+        self.stdout.write(self.style.SUCCESS(
+            f"  speed-up: {results['OrderSerializer'] / results['OrderReadSerializer']:.1f}x"
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError  # Base classes for manage.py commands
+
+from orders.exports import DEFAULT_CHUNK_SIZE, iter_orders_ndjson  # Chunked NDJSON export
+from orders.models import Order  # Orders being exported
+
+
+class Command(BaseCommand):
+    """
+    Writes every order with its lines as newline-delimited JSON, chunk by chunk,
+    so memory use does not grow with the number of orders.
+
+    Usage:
+        python manage.py export_orders [--output orders.ndjson] [--chunk-size 500] [--status delivered]
+    """
+    help = "Stream all orders with their lines to NDJSON with bounded memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="File to write (defaults to stdout)")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Orders loaded per query")
+        parser.add_argument('--status', choices=Order.OrderStatus.values, help="Only export orders in this status")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        queryset = Order.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+
+        if not options['output']:
+            for block in iter_orders_ndjson(queryset, options['chunk_size']):
+                self.stdout.write(block, ending='')  # Written immediately, nothing accumulates in memory
+            return
+
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for block in iter_orders_ndjson(queryset, options['chunk_size']):
+                output.write(block)  # Written immediately, nothing accumulates in memory
@@ -0,0 +1,220 @@
+import asyncio  # Thousands of concurrent stream clients
+import json  # Event payloads
+import statistics  # Latency percentiles
+import time  # Latency measurements
+import tracemalloc  # Server memory per connection (in-process mode)
+from urllib.parse import urlsplit  # --url target
+
+from django.core.management.base import BaseCommand, CommandError  # Base classes for manage.py commands
+
+from orders.models import Order  # Watched orders
+from orders.streams import broker  # Publishes the probe event
+
+
+class Command(BaseCommand):
+    """
+    Load test for the order status stream (`/api/orders/stream/`).
+
+    Opens --connections concurrent SSE streams watching the given orders and reports:
+    - connect latency (request sent -> first status event) and how many streams stayed open,
+    - memory per connection (in-process mode only, measured with tracemalloc),
+    - fan-out latency of one published status event to every open stream.
+
+    By default the streams run in-process against `ecommerce_application.asgi.application`; with
+    --url they are opened over TCP against a running ASGI server, and the probe event reaches it
+    through the shared cache. The probe repeats the order's current status, so nothing changes
+    in the database, but connected clients do receive it.
+
+    Usage:
+        python manage.py loadtest_order_stream --order 42 [--order 43] [--connections 1000]
+                                               [--concurrency 200] [--timeout 10] [--url http://127.0.0.1:8000]
+    """
+    help = "Measure how many idle order status streams the server holds and how fast events fan out."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order', type=int, action='append', required=True,
+                            help="Non-terminal order to watch (repeatable)")
+        parser.add_argument('--connections', type=int, default=1000, help="Streams to open")
+        parser.add_argument('--concurrency', type=int, default=200, help="Streams being opened at the same time")
+        parser.add_argument('--timeout', type=float, default=10, help="Seconds to wait for connects and the probe")
+        parser.add_argument('--url', default=None, help="Base URL of a running server (default: in-process)")
+
+    def handle(self, *args, **options):
+        if min(options['connections'], options['concurrency']) < 1:
+            raise CommandError("--connections and --concurrency must be positive")
+        statuses = dict(Order.objects.filter(pk__in=options['order']).values_list('pk', 'status'))
+        if not statuses or any(value in Order.TERMINAL_STATUSES for value in statuses.values()):
+            raise CommandError("--order must name existing orders that are not in a terminal status")
+        asyncio.run(self.run(statuses, options))
+
+    async def run(self, statuses, options):
+        path = '/api/orders/stream/?ids=' + ','.join(map(str, statuses))
+        if options['url']:
+            open_stream = self.socket_stream(options['url'])
+        else:
+            from ecommerce_application.asgi import application  # The app the ASGI server serves
+            open_stream = self.asgi_stream(application)
+            tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+        clients = [StreamClient() for _ in range(options['connections'])]
+        disconnect = asyncio.Event()
+        gate = asyncio.Semaphore(options['concurrency'])
+
+        async def connect(client):
+            async with gate:
+                client.sent = time.perf_counter()
+                task = asyncio.create_task(open_stream(path, client, disconnect))
+                client.task = task
+                try:
+                    await asyncio.wait_for(asyncio.shield(client.connected.wait()), options['timeout'])
+                except asyncio.TimeoutError:
+                    pass
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connect(client) for client in clients))
+        connect_seconds = time.perf_counter() - started
+        await asyncio.sleep(0)  # Let failed streams finish
+        open_clients = [client for client in clients if client.connected.is_set() and not client.task.done()]
+        connect_times = [client.connect_latency for client in open_clients]
+
+        self.stdout.write(f"Opened {len(open_clients)}/{len(clients)} streams in {connect_seconds:.2f}s")
+        if connect_times:
+            self.stdout.write(f"  connect latency: {self.summary(connect_times)}")
+        if tracemalloc.is_tracing():
+            used = tracemalloc.get_traced_memory()[0] - baseline
+            self.stdout.write(f"  memory: {used / 1024 / 1024:.1f} MiB, "
+                              f"{used / max(len(open_clients), 1) / 1024:.1f} KiB per stream")
+            tracemalloc.stop()
+
+        if open_clients:  # Fan one event out to every open stream
+            order_id = next(iter(statuses))
+            published = time.perf_counter()
+            await asyncio.to_thread(broker.publish, [
+                {'order_id': order_id, 'status': statuses[order_id], 'old_status': statuses[order_id]}
+            ])
+            await asyncio.wait(
+                [asyncio.create_task(client.received.wait()) for client in open_clients], timeout=options['timeout']
+            )
+            delays = [client.received_at - published for client in open_clients if client.received.is_set()]
+            self.stdout.write(f"Probe event reached {len(delays)}/{len(open_clients)} streams")
+            if delays:
+                self.stdout.write(f"  fan-out latency: {self.summary(delays)}")
+
+        disconnect.set()
+        await asyncio.gather(*(client.task for client in clients if client.task), return_exceptions=True)
+        failures = [client.error for client in clients if client.error]
+        if failures:
+            self.stdout.write(self.style.WARNING(f"{len(failures)} streams failed, e.g. {failures[0]}"))
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    @staticmethod
+    def summary(seconds):
+        ordered = sorted(seconds)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return (f"p50 {statistics.median(ordered) * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms, "
+                f"max {ordered[-1] * 1000:.1f}ms")
+
+    @staticmethod
+    def asgi_stream(application):
+        """
+        Runs one request through the ASGI application, the way the server would.
+        """
+        async def open_stream(path, client, disconnect):
+            route, _, query = path.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': route, 'raw_path': route.encode(), 'query_string': query.encode(),
+                'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream')],
+                'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+            }
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start' and message['status'] != 200:
+                    client.error = f"HTTP {message['status']}"
+                elif message['type'] == 'http.response.body':
+                    client.feed(message.get('body', b''))
+
+            try:
+                await application(scope, receive, send)
+            except Exception as exc:
+                client.error = repr(exc)
+        return open_stream
+
+    @staticmethod
+    def socket_stream(url):
+        """
+        Opens streams over TCP. HTTP/1.0 keeps the body unchunked, so events can be read as they are.
+        """
+        target = urlsplit(url)
+        host, port = target.hostname, target.port or 80
+
+        async def open_stream(path, client, disconnect):
+            writer = None
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(f"GET {path} HTTP/1.0\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+                status_line = await reader.readline()
+                if b' 200 ' not in status_line:
+                    client.error = status_line.decode(errors='replace').strip() or 'connection closed'
+                    return
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):  # Skip the headers
+                    pass
+                closed = asyncio.create_task(disconnect.wait())
+                while True:
+                    chunk = asyncio.create_task(reader.read(65536))
+                    await asyncio.wait([chunk, closed], return_when=asyncio.FIRST_COMPLETED)
+                    if not chunk.done():
+                        chunk.cancel()
+                        break
+                    if not chunk.result():
+                        break
+                    client.feed(chunk.result())
+                closed.cancel()
+            except OSError as exc:
+                client.error = repr(exc)
+            finally:
+                if writer is not None:
+                    writer.close()
+        return open_stream
+
+
+class StreamClient:
+    """
+    Timings of one stream: first event (connected) and first live event (the probe).
+    """
+
+    def __init__(self):
+        self.task = None
+        self.sent = None  # perf_counter() when the request went out
+        self.connect_latency = None
+        self.connected = asyncio.Event()
+        self.received = asyncio.Event()
+        self.received_at = None
+        self.error = None
+        self._buffer = ''
+
+    def feed(self, data):
+        self._buffer += data.decode()
+        *events, self._buffer = self._buffer.split('\n\n')
+        for event in events:
+            fields = dict(line.split(': ', 1) for line in event.splitlines() if ': ' in line and line[0] != ':')
+            if fields.get('event') != 'status':
+                continue
+            now = time.perf_counter()
+            if not self.connected.is_set():
+                self.connect_latency = now - self.sent
+                self.connected.set()
+            if 'id' in fields and not self.received.is_set():  # Live events carry an id, snapshots do not
+                json.loads(fields['data'])  # Fail loudly on a malformed payload
+                self.received_at = now
+                self.received.set()
@@ -0,0 +1,33 @@
+from datetime import timedelta  # Retention window
+
+from django.core.management.base import BaseCommand  # Base class for custom manage.py commands
+from django.utils import timezone  # Current time for the cutoff
+
+from orders.idempotency import RESPONSE_TTL  # Responses are only replayed for this long
+from orders.models import IdempotencyKey  # Stored keys and responses
+
+
+class Command(BaseCommand):
+    """
+    Deletes idempotency keys older than the replay window so the table stays small.
+
+    Usage:
+        python manage.py prune_idempotency_keys [--older-than-hours 24] [--batch-size 1000]
+    """
+    help = "Delete expired idempotency keys in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=float, default=RESPONSE_TTL / 3600,
+                            help="Delete keys created before this many hours ago")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows deleted per statement")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+        deleted = 0
+        while True:
+            ids = list(IdempotencyKey.objects.filter(created_at__lt=cutoff)
+                       .values_list('pk', flat=True)[:options['batch_size']])  # Uses the created_at index
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys"))
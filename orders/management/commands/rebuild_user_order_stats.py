@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand  # Base class for custom manage.py commands
+
+from orders.stats import UserOrderStatsService  # Recomputes the per-customer counters
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the denormalized per-customer order stats from orders and payments
+    (live and archived). Use it to backfill the table or to repair drifted counters.
+
+    Usage:
+        python manage.py rebuild_user_order_stats [--user 12 --user 34]
+    """
+    help = "Rebuild UserOrderStats rows from orders and successful payments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help="Only rebuild this customer (repeatable)")
+
+    def handle(self, *args, **options):
+        written = UserOrderStatsService.rebuild(options['users'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt order stats for {written} customers"))
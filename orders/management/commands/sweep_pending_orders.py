@@ -0,0 +1,48 @@
+import time  # Pause between passes
+
+from django.core.management.base import BaseCommand  # Base class for custom manage.py commands
+
+from orders.sweeper import DEFAULT_BATCH_SIZE, PENDING_ORDER_TTL_MINUTES, PendingOrderSweeper  # Stale order sweep
+
+
+class Command(BaseCommand):
+    """
+    Cancels PENDING orders older than the TTL in bounded batches and reports throughput.
+    Runs a single pass by default; with --loop it keeps sweeping every --interval seconds.
+
+    Usage:
+        python manage.py sweep_pending_orders [--ttl-minutes 60] [--batch-size 500] [--max-batches N]
+                                              [--loop] [--interval 60]
+    """
+    help = "Cancel abandoned PENDING orders in batches, optionally in a loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl-minutes', type=float, default=PENDING_ORDER_TTL_MINUTES,
+                            help="Cancel orders pending for longer than this")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Orders cancelled per batch")
+        parser.add_argument('--max-batches', type=int, default=None, help="Batches per pass (default: all)")
+        parser.add_argument('--loop', action='store_true', help="Keep sweeping until interrupted")
+        parser.add_argument('--interval', type=float, default=60, help="Seconds between passes with --loop")
+
+    def handle(self, *args, **options):
+        sweeper = PendingOrderSweeper(options['ttl_minutes'], options['batch_size'])
+        try:
+            while True:
+                sweeper.sweep(options['max_batches'], on_batch=self.report_batch)
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:  # Stopping the loop is the normal way to end it
+            self.stdout.write("Interrupted")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Cancelled {sweeper.cancelled} of {sweeper.scanned} stale orders "
+            f"({sweeper.skipped} skipped) in {sweeper.batches} batches, "
+            f"{sweeper.elapsed:.2f}s, {sweeper.throughput:.0f} orders/s"
+        ))
+
+    def report_batch(self, metrics):
+        self.stdout.write(
+            f"Batch {metrics['batch']}: cancelled {metrics['cancelled']}/{metrics['scanned']} "
+            f"in {metrics['seconds'] * 1000:.0f}ms ({metrics['orders_per_second']:.0f} orders/s)"
+        )
@@ -0,0 +1,75 @@
+from decimal import Decimal  # Precise monetary arithmetic
+
+from django.core.management.base import BaseCommand  # Base class for custom manage.py commands
+from django.db.models import DecimalField, F, Sum, Value  # Aggregation helpers and version bumps
+from django.db.models.functions import Coalesce  # Treat orders without lines as a zero subtotal
+
+from orders.models import Order  # Orders whose stored totals are verified
+
+CENT = Decimal('0.01')  # Totals are stored with two decimal places
+
+
+class Command(BaseCommand):
+    """
+    Recomputes order totals from their lines in bulk and reports any drift from the
+    incrementally maintained `subtotal` and `total` columns.
+
+    Usage:
+        python manage.py verify_order_totals [--batch-size 1000] [--fix]
+    """
+    help = "Recompute order totals in bulk and report orders whose stored totals have drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Orders checked per query")
+        parser.add_argument('--fix', action='store_true', help="Overwrite drifted totals with the recomputed values")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = drifted = 0
+        last_pk = 0  # Keyset cursor so every batch is an index range scan on the primary key
+
+        while True:
+            # One aggregate query per batch: the expected subtotal is the sum of quantity × frozen price
+            rows = list(
+                Order.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .annotate(expected_subtotal=Coalesce(
+                    Sum(F('order_products__quantity') * F('order_products__price_at_purchase')),
+                    Value(Decimal('0')),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)
+                ))
+                .values('pk', 'subtotal', 'total', 'discount', 'tax_amount', 'shipping_cost', 'expected_subtotal')
+                [:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1]['pk']
+            checked += len(rows)
+
+            repairs = []  # Orders to rewrite when --fix is given
+            for row in rows:
+                expected_subtotal = Decimal(row['expected_subtotal']).quantize(CENT)
+                expected_total = max(
+                    expected_subtotal - row['discount'] + row['tax_amount'] + row['shipping_cost'],
+                    Decimal('0')
+                ).quantize(CENT)
+                if row['subtotal'] == expected_subtotal and row['total'] == expected_total:
+                    continue
+
+                drifted += 1
+                self.stdout.write(
+                    f"Order #{row['pk']}: subtotal {row['subtotal']} (expected {expected_subtotal}), "
+                    f"total {row['total']} (expected {expected_total})"
+                )
+                repairs.append(Order(
+                    pk=row['pk'], subtotal=expected_subtotal, total=expected_total,
+                    version=F('version') + 1  # Copies loaded before the repair must not overwrite it
+                ))
+
+            if options['fix'] and repairs:
+                Order.objects.bulk_update(repairs, ['subtotal', 'total', 'version'])  # Single statement per batch
+
+        summary = f"Checked {checked} orders, {drifted} with drifted totals"
+        if options['fix'] and drifted:
+            summary += " (repaired)"
+        self.stdout.write(self.style.WARNING(summary) if drifted else self.style.SUCCESS(summary))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_paid_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='The date and time when this record was first created', verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='The date and time when this record was last updated', verbose_name='Updated At')),
+                ('scope', models.CharField(help_text='Endpoint the key was used on', max_length=50)),
+                ('key', models.CharField(help_text='Value of the Idempotency-Key header', max_length=255)),
+                ('request_hash', models.CharField(help_text='Fingerprint of the request body the key was first used with', max_length=64)),
+                ('state', models.CharField(choices=[('processing', 'Processing'), ('completed', 'Completed')], default='processing', help_text='Whether the original request has finished', max_length=15)),
+                ('response_status', models.PositiveSmallIntegerField(blank=True, help_text='HTTP status of the stored response', null=True)),
+                ('response_body', models.JSONField(blank=True, help_text='JSON body of the stored response', null=True)),
+            ],
+            options={
+                'verbose_name': 'Idempotency Key',
+                'verbose_name_plural': 'Idempotency Keys',
+                'indexes': [models.Index(fields=['created_at'], name='orders_idem_created_f961b5_idx')],
+                'unique_together': {('scope', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_archivedorder'),
+        ('products', '0004_remove_orderproduct_order_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='orders_orde_status_25e057_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_orde_status_c6dd84_idx',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 23:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_order_status_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Incremented on every write; saves only succeed against the version they loaded', verbose_name='Version'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 23:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_version'),
+        ('products', '0004_remove_orderproduct_order_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserOrderStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_stats', serialize=False, to='products.user', verbose_name='Customer')),
+                ('order_count', models.PositiveIntegerField(default=0, help_text='Orders placed by this customer', verbose_name='Order Count')),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, help_text="Sum of this customer's successful payments", max_digits=14, verbose_name='Total Spent')),
+                ('last_order_at', models.DateTimeField(blank=True, help_text='When this customer last placed an order', null=True, verbose_name='Last Order At')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User Order Stats',
+                'verbose_name_plural': 'User Order Stats',
+            },
+        ),
+    ]
@@ -4,7 +4,12 @@ from decimal import Decimal  # Used for precise calculations of monetary values
 from django.core.validators import MinValueValidator  # Ensures fields have minimum values (e.g., no negative values)
 from django.utils import timezone  # Provides timezone-aware datetime objects
 from django.db import transaction  # Enables atomic transactions to ensure data consistency
+from django.db.models import F, Sum, Value  # Database-side expressions for atomic total updates
+from django.db.models.functions import Greatest  # Clamps the database-side total at zero
 from products.models import User, Products  # Import the User and Product models from the products app
+from .inventory import StockReservationService  # Reserves and releases product stock for order lines
+from .exceptions import OrderConcurrencyError  # Raised when a versioned save loses a race
+from .events import order_deleted, order_lines_changed, orders_status_changed  # Lifecycle events for read models
 
 
 class AuditData(models.Model):
@@ -68,6 +73,10 @@ class Order(AuditData):
         OrderStatus.CANCELLED,  # Final state: Order cancelled
         OrderStatus.RETURNED  # Final state: Order returned
     ]
+    STOCK_RELEASE_STATUSES = [
+        OrderStatus.CANCELLED,  # Cancelled orders give their reserved stock back
+        OrderStatus.RETURNED  # Returned goods go back into inventory
+    ]
 
     # Relationships 1:N
     user = models.ForeignKey(
@@ -157,9 +166,17 @@ class Order(AuditData):
         help_text="When order reached terminal status"  # Explains what this field represents
     )
 
+    # Optimistic concurrency control
+    version = models.PositiveIntegerField(
+        default=1,  # First version on creation
+        editable=False,  # Maintained by save() and the set-based updates only
+        verbose_name="Version",  # User-friendly name shown in the admin interface
+        help_text="Incremented on every write; saves only succeed against the version they loaded"
+    )
+
     class Meta:
         indexes = [
-            models.Index(fields=['status']),  # Optimizes queries by status
+            models.Index(fields=['status', 'created_at']),  # Status filters, and oldest-first scans within a status
             models.Index(fields=['user', 'created_at']),  # Optimizes user-specific order queries
             models.Index(fields=['created_at']),  # Optimizes queries by creation time
         ]
@@ -185,22 +202,22 @@ class Order(AuditData):
 
         # Business Rule 3: Validate valid status transitions for updates only
         if self.pk:  # If the order exists in the database
-            # Fetch the current order instance from the database
-            original = Order.objects.get(pk=self.pk)
-            # Ensure the status transition is allowed
-            self.validate_status_transition(original)
+            # Ensure the status transition is allowed, using the status this instance was loaded with
+            self.validate_status_transition(self.original_status)
 
-    def validate_status_transition(self, original):
+    def validate_status_transition(self, original_status):
         """
         Internal method to validate status changes.
         Prevents invalid workflow transitions and ensures order validity.
+        Args:
+            original_status: The status currently stored in the database.
         """
         # Rule 1: Prevent changes from terminal states
-        if (original.status in self.TERMINAL_STATUSES and  # Original status is terminal
-                self.status != original.status):  # New status differs from terminal status
+        if (original_status in self.TERMINAL_STATUSES and  # Original status is terminal
+                self.status != original_status):  # New status differs from terminal status
             # Raise an error to prevent changes from terminal states
             raise ValidationError(
-                f"Cannot change status from {original.get_status_display()}"
+                f"Cannot change status from {self.OrderStatus(original_status).label}"
             )
 
         # Rule 2: Ensure terminal statuses require at least one product
@@ -209,36 +226,158 @@ class Order(AuditData):
             raise ValidationError(
                 "Orders marked as delivered, returned, or cancelled must include at least one product.")
 
+    # Dirty-field tracking: snapshot of the values this instance was loaded with
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Keep a snapshot of the loaded values so changes can be detected without re-querying.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))  # Keyed by attname (e.g. `user_id`)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        """
+        Reload fields from the database and treat the fresh values as the new snapshot.
+        """
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._take_snapshot(fields)
+
+    def _take_snapshot(self, fields=None):
+        """
+        Record the current values of loaded concrete fields as the stored state.
+        Args:
+            fields: Optional field names to refresh; by default every loaded field is recorded.
+        """
+        deferred = self.get_deferred_fields()  # Deferred fields are not known yet
+        snapshot = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred and (fields is None or field.name in fields)
+        }
+        if fields is None or getattr(self, '_loaded_values', None) is None:
+            self._loaded_values = snapshot
+        else:
+            self._loaded_values.update(snapshot)  # Only the written fields changed in the database
+
+    def get_dirty_fields(self):
+        """
+        Fields changed since the instance was loaded or last saved.
+        Returns:
+            dict: field name -> originally loaded value (None when the value was never loaded)
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        deferred = self.get_deferred_fields()
+        dirty = {}
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname in deferred:  # Untouched deferred fields cannot be dirty
+                continue
+            if loaded is None or field.attname not in loaded:  # Never loaded, so it must be written
+                dirty[field.name] = None
+            elif getattr(self, field.attname) != loaded[field.attname]:  # Value changed since load
+                dirty[field.name] = loaded[field.attname]
+        return dirty
+
+    @property
+    def original_status(self):
+        """
+        Status currently stored in the database (None for unsaved orders).
+        Taken from the load snapshot; only queries when the instance was not loaded from the database.
+        """
+        if self._state.adding:  # Not saved yet, so there is no stored status
+            return None
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or 'status' not in loaded:
+            status = Order.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+            if loaded is not None:
+                loaded['status'] = status  # Remember it for later checks
+            return status
+        return loaded['status']
 
     def save(self, *args, **kwargs):
         """
         Custom save handler with:
         - Atomic transactions for data integrity
         - Status tracking
-        - Automatic total calculation
+        - Total derived from the stored subtotal
+        - Optimistic concurrency: updates run as `UPDATE ... WHERE version = N` and bump the
+          version, raising `OrderConcurrencyError` if another writer saved the order first
+
+        The subtotal itself is kept up to date incrementally by the order lines
+        (see `apply_subtotal_delta`), so saving an order never re-reads its lines.
         """
         with transaction.atomic():  # Ensures all database operations are atomic
+            original_status = None  # New orders have no previous status
             # Handle terminal state transitions
             if self.pk:  # The order already exists (updating)
-                # Fetch the original order from the database
-                original = Order.objects.get(pk=self.pk)
+                # Compare against the status this instance was loaded with (no extra query)
+                original_status = self.original_status
                 if self.status in self.TERMINAL_STATUSES:  # If new status is terminal
-                    if original.status not in self.TERMINAL_STATUSES:  # If original was non-terminal
+                    if original_status not in self.TERMINAL_STATUSES:  # If original was non-terminal
                         self.completed_at = timezone.now()  # Set the completion timestamp
                 else:  # If the new status is non-terminal
                     self.completed_at = None  # Reset the completion timestamp
 
-            # Handle order creation (no primary key yet)
-            if not self.pk:
-                super().save(*args, **kwargs)  # Save the initial record to generate a primary key
-                self.calculate_totals()  # Calculate financial totals after creation
-                return super().save(  # Save again to store the calculated fields
-                    update_fields=['subtotal', 'total', 'completed_at']  # Only update specific fields
+                # Return reserved stock once the order is cancelled or returned
+                if (self.status in self.STOCK_RELEASE_STATUSES and
+                        original_status not in self.STOCK_RELEASE_STATUSES):
+                    self.release_stock()
+
+            # Discount, tax or shipping may have changed, so re-derive the total in memory
+            self.apply_totals(self.subtotal)
+
+            # For updates of loaded instances, write only the fields that actually changed
+            if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+                dirty = self.get_dirty_fields()
+                if not dirty:  # Nothing changed, so there is nothing to write
+                    return
+                kwargs['update_fields'] = set(dirty) | {'updated_at'}  # Keep the audit timestamp current
+
+            if self._state.adding or kwargs.get('force_insert'):  # New rows start at the default version
+                super().save(*args, **kwargs)  # Save the record
+            else:
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = set(kwargs['update_fields']) | {'version'}  # Always write the new version
+                self._save_versioned(*args, **kwargs)  # Only succeeds against the version this instance loaded
+            self._take_snapshot(kwargs.get('update_fields'))  # The saved values are now the stored state
+
+            if self.status != original_status:  # Created, or moved to another status
+                orders_status_changed.send(
+                    sender=Order, changes=[(self.pk, self.created_at, original_status, self.status)]
                 )
 
-            # For updates: Recalculate totals and save the updated record
-            self.calculate_totals()  # Recalculate totals for financial fields
+    def _save_versioned(self, *args, **kwargs):
+        """
+        Write an existing order only if its stored version still matches, and bump the version.
+        Raises:
+            OrderConcurrencyError: if the stored version changed since this instance was loaded.
+        """
+        expected = self.version
+        self.version = expected + 1
+        self._expected_version = expected  # Picked up by `_do_update`
+        try:
             super().save(*args, **kwargs)  # Save the record
+        except Exception:
+            self.version = expected  # Nothing was written, keep the loaded version
+            raise
+        finally:
+            self._expected_version = None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update, *args, **kwargs):
+        """
+        Add the version check to the UPDATE Django issues for `save()`.
+        A zero-row update on an order that still exists means another writer won the race.
+        """
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:  # Not a versioned save
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update, *args, **kwargs)
+
+        updated = super()._do_update(
+            base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update, *args, **kwargs
+        )
+        if not updated and base_qs.filter(pk=pk_val).exists():
+            raise OrderConcurrencyError(pk_val, expected)
+        return updated
 
     def calculate_totals(self):
         """
@@ -253,12 +392,77 @@ class Order(AuditData):
             self.order_products.select_related('product').all()  # Prefetch related all products of this order for efficiency
         ) if hasattr(self, 'order_products') else Decimal('0')  # Default to 0 if no products
 
+        self.apply_totals(self.subtotal)  # Derive the final total from the fresh subtotal
+
+    def apply_totals(self, subtotal):
+        """
+        Set the subtotal and derive the total from it without touching the database.
+        Used by `calculate_totals` and by callers that already hold every line in memory.
+        """
+        self.subtotal = subtotal  # Sum of all line totals
+
         # Calculate the total amount, ensuring no negative totals
         self.total = max(
             (self.subtotal - self.discount) + self.tax_amount + self.shipping_cost,  # Total formula
             Decimal('0')  # Prevents negative values
         )
 
+    def apply_subtotal_delta(self, delta):
+        """
+        Atomically shift the stored subtotal by `delta` and re-derive the total in the database.
+        Called whenever a line is added, changed or removed instead of summing every line again.
+        The in-memory instance is updated the same way so callers keep working with fresh totals.
+        """
+        if not delta:  # Nothing changed, skip the round trip
+            return
+
+        Order.objects.filter(pk=self.pk).update(
+            # `total` is listed before `subtotal` on purpose: MySQL evaluates SET assignments left to
+            # right, so this keeps both expressions reading the pre-update subtotal on every backend
+            total=Greatest(
+                F('subtotal') + delta - F('discount') + F('tax_amount') + F('shipping_cost'),  # Total formula
+                Value(Decimal('0'))  # Prevents negative values
+            ),
+            subtotal=F('subtotal') + delta,  # Apply the line change to the stored subtotal
+            version=F('version') + 1,  # Totals changed, so copies loaded earlier are stale
+            updated_at=timezone.now()  # `update()` bypasses auto_now
+        )
+        self.apply_totals(self.subtotal + delta)  # Mirror the change on this instance
+        self.version += 1  # Matches the database unless someone else wrote in between (then saves conflict)
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is not None:  # The database already holds these values, so they are not dirty
+            loaded.update(subtotal=self.subtotal, total=self.total, version=self.version)
+
+    @property
+    def holds_stock(self):
+        """
+        Whether this order's lines currently hold reserved stock.
+        """
+        return self.status not in self.STOCK_RELEASE_STATUSES
+
+    def release_stock(self):
+        """
+        Give every unit reserved by this order's lines back to inventory.
+        """
+        StockReservationService.release(dict(self.order_products.values_list('product_id', 'quantity')))
+
+    def delete(self, *args, **kwargs):
+        """
+        Deletes the order and returns the stock its lines still hold.
+        The lines are removed by the cascade as one bulk delete, which skips `OrderProduct.delete`,
+        so the reservation is released here (before the lines are gone) in the same transaction.
+        Sends `order_deleted` with the order's successful payments, which the cascade removes too.
+        """
+        with transaction.atomic():
+            if self.original_status not in self.STOCK_RELEASE_STATUSES:  # Stored status: still holds stock
+                self.release_stock()
+            order_id = self.pk
+            spent = self.payments.filter(status='success').aggregate(spent=Sum('amount'))['spent']
+            result = super().delete(*args, **kwargs)
+            order_deleted.send(sender=Order, order_id=order_id, user_id=self.user_id,
+                               created_at=self.created_at, spent=spent or Decimal('0'))
+            return result
+
     def get_product_quantities(self):
         """
         Get list of products and their quantities in this order.
@@ -327,18 +531,34 @@ class OrderProduct(models.Model):
         """
         Validate the line item meets business rules.
         """
-        # Validate sufficient stock
-        if hasattr(self, 'product') and self.quantity > self.product.stock_quantity:
+        # Validate sufficient stock for the units this save would newly reserve
+        if hasattr(self, 'product') and self.quantity - self._stored_line()[0] > self.product.stock_quantity:
             raise ValidationError({
                 'quantity': f"Only {self.product.stock_quantity} available in stock"
             })
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the stored quantity and line total so later saves and deletes can apply
+        deltas to the order totals and to the reserved stock.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._stored_values = (
+            (instance.quantity, instance.line_total())
+            if {'quantity', 'price_at_purchase'} <= set(field_names)  # Deferred fields cannot be used
+            else None
+        )
+        return instance
+
     def save(self, *args, **kwargs):
         """
         Custom save handler that:
         1. Validates the line item
         2. Captures current product price on creation
-        3. Updates parent order totals
+        3. Reserves (or releases) stock for the change in quantity
+        4. Applies the change in line total to the parent order as a single delta
+        5. Reports the change in booked units and revenue (`order_lines_changed`)
         """
         self.full_clean()  # Ensure validation runs before saving
 
@@ -346,11 +566,55 @@ class OrderProduct(models.Model):
         if not self.pk:  # Check if this is the first time saving the line item
             self.price_at_purchase = self.product.price  # Freeze the product price at purchase
 
-        super().save(*args, **kwargs)  # Perform the actual save operation
+        with transaction.atomic():  # Keep the line, the stock and the order totals consistent
+            previous_quantity, previous_total = self._stored_line()  # What this line held before the save
+            if self.order.holds_stock:  # Cancelled/returned orders have already given their stock back
+                StockReservationService.adjust({self.product_id: self.quantity - previous_quantity})
 
-        # Update parent order totals
-        self.order.calculate_totals()  # Recalculate the parent order totals
-        self.order.save()  # Save the updated parent order
+            super().save(*args, **kwargs)  # Perform the actual save operation
+
+            # Update parent order totals with the difference only
+            self.order.apply_subtotal_delta(self.line_total() - previous_total)
+            self._report_change(self.quantity - previous_quantity, self.line_total() - previous_total)
+            self._stored_values = (self.quantity, self.line_total())  # This is now what the database holds
+
+    def delete(self, *args, **kwargs):
+        """
+        Removes the line, returns its stock and subtracts its contribution from the parent order totals.
+        """
+        with transaction.atomic():  # Keep the line, the stock and the order totals consistent
+            previous_quantity, previous_total = self._stored_line()  # Contribution being removed
+            if self.order.holds_stock:
+                StockReservationService.release({self.product_id: previous_quantity})
+            result = super().delete(*args, **kwargs)  # Perform the actual delete operation
+            self.order.apply_subtotal_delta(-previous_total)  # Subtract the removed line from the order
+            self._report_change(-previous_quantity, -previous_total)
+            self._stored_values = None  # Nothing is stored any more
+        return result
+
+    def _report_change(self, units, revenue):
+        """
+        Send `order_lines_changed` for this line if the order's sales still count.
+        """
+        if (units or revenue) and self.order.holds_stock:  # Cancelled/returned orders are no longer sales
+            order_lines_changed.send(
+                sender=OrderProduct, order_id=self.order_id, created_at=self.order.created_at,
+                changes={self.product_id: (units, revenue)}
+            )
+
+    def _stored_line(self):
+        """
+        Quantity and line total currently stored in the database for this line ((0, 0) for new lines).
+        Uses the values captured in `from_db` and only queries when they are unknown.
+        """
+        if self._state.adding:  # Not inserted yet, so it holds nothing
+            return 0, Decimal('0')
+        stored = getattr(self, '_stored_values', None)
+        if stored is None:  # Instance was not loaded from the database (or fields were deferred)
+            row = OrderProduct.objects.filter(pk=self.pk).values_list('quantity', 'price_at_purchase').first()
+            stored = (row[0], row[0] * row[1]) if row else (0, Decimal('0'))
+            self._stored_values = stored
+        return stored
 
     def line_total(self):
         """
@@ -363,3 +627,180 @@ class OrderProduct(models.Model):
     def __str__(self):
         """Human-readable representation"""
         return f"{self.quantity} × {self.product.name} @ ₹{self.price_at_purchase:.2f}"
+
+
+class UserOrderStats(models.Model):
+    """
+    Denormalized lifetime order summary for one customer.
+    Maintained incrementally by `UserOrderStatsService` (an UPDATE with F() expressions per new
+    order, successful payment or deleted order), so the account page never has to aggregate a
+    customer's orders. Archived orders keep counting; deleted orders and their payments are taken
+    back out, so the counters always match what `UserOrderStatsService.rebuild` would compute.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,  # Stats go with the customer
+        primary_key=True,  # One row per customer, looked up by user ID
+        related_name='order_stats',
+        verbose_name="Customer"
+    )
+    order_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Order Count",
+        help_text="Orders placed by this customer"
+    )
+    total_spent = models.DecimalField(
+        max_digits=14,  # Lifetime sums outgrow a single order's 12 digits
+        decimal_places=2,
+        default=0,
+        verbose_name="Total Spent",
+        help_text="Sum of this customer's successful payments"
+    )
+    last_order_at = models.DateTimeField(
+        null=True,  # No orders yet
+        blank=True,
+        verbose_name="Last Order At",
+        help_text="When this customer last placed an order"
+    )
+    updated_at = models.DateTimeField(auto_now=True)  # Last time the counters changed through save()
+
+    class Meta:
+        verbose_name = "User Order Stats"
+        verbose_name_plural = "User Order Stats"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.order_count} orders, ₹{self.total_spent:.2f}"
+
+
+class IdempotencyKey(AuditData):
+    """
+    Durable record of a request made with an `Idempotency-Key` header.
+    The first request claims the (scope, key) pair; its response is stored here and replayed
+    to every retry, so retried checkouts and payment requests are executed only once.
+    """
+
+    class State(models.TextChoices):
+        """Lifecycle of an idempotent request."""
+        PROCESSING = 'processing', 'Processing'  # First request is still running
+        COMPLETED = 'completed', 'Completed'  # Response stored and ready to replay
+
+    scope = models.CharField(
+        max_length=50,  # e.g. "orders.create" or "payments.create"
+        help_text="Endpoint the key was used on"  # Keys are only unique per endpoint
+    )
+    key = models.CharField(
+        max_length=255,  # Client-generated key, usually a UUID
+        help_text="Value of the Idempotency-Key header"
+    )
+    request_hash = models.CharField(
+        max_length=64,  # SHA-256 hex digest
+        help_text="Fingerprint of the request body the key was first used with"
+    )
+    state = models.CharField(
+        max_length=15,
+        choices=State.choices,
+        default=State.PROCESSING,  # Claimed but not finished yet
+        help_text="Whether the original request has finished"
+    )
+    response_status = models.PositiveSmallIntegerField(
+        null=True,  # Unknown until the request finishes
+        blank=True,
+        help_text="HTTP status of the stored response"
+    )
+    response_body = models.JSONField(
+        null=True,  # Unknown until the request finishes
+        blank=True,
+        help_text="JSON body of the stored response"
+    )
+
+    class Meta:
+        unique_together = ('scope', 'key')  # The database is the final arbiter between concurrent requests
+        indexes = [
+            models.Index(fields=['created_at']),  # Pruning of expired keys
+        ]
+        verbose_name = "Idempotency Key"
+        verbose_name_plural = "Idempotency Keys"
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} ({self.get_state_display()})"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Cold copy of an order that reached a terminal status long ago.
+    Rows are moved here by `OrderArchiveService` so the hot `Order` table (and its status and
+    created_at indexes) only holds orders that are still being worked on.
+    Keeps the original primary key and the same attribute names as `Order`, so the order
+    serializers can render an archived order unchanged.
+    """
+    id = models.BigIntegerField(
+        primary_key=True,  # Same ID the order had while it was live
+        verbose_name="Order ID"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.PROTECT,  # Archived orders keep their customer, like live ones
+        related_name='archived_orders',  # Reverse lookup for a customer's order history
+        verbose_name="Customer"
+    )
+
+    # Financial fields, copied as they were when the order was archived
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    shipping_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    status = models.CharField(
+        max_length=15,
+        choices=Order.OrderStatus.choices,  # Always one of `Order.TERMINAL_STATUSES`
+        verbose_name="Order Status"
+    )
+    completed_at = models.DateTimeField(null=True, blank=True)  # When the order reached its terminal status
+    created_at = models.DateTimeField()  # Original timestamps, not reset on archiving
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(
+        auto_now_add=True,  # When the order was moved out of the hot table
+        help_text="When this order was moved to the archive"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at']),  # A customer's order history
+            models.Index(fields=['completed_at']),  # Reporting over old completions
+        ]
+        ordering = ['-created_at']  # Same default ordering as live orders
+        verbose_name = "Archived Order"
+        verbose_name_plural = "Archived Orders"
+
+    def __str__(self):
+        return f"Archived order #{self.id} ({self.get_status_display()}) - ₹{self.total:.2f}"
+
+
+class ArchivedOrderProduct(models.Model):
+    """
+    Cold copy of an `OrderProduct` line belonging to an `ArchivedOrder`.
+    """
+    id = models.BigIntegerField(primary_key=True)  # Same ID the line had while it was live
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,  # Lines go with their archived order
+        related_name='order_products',  # Same accessor as live orders, so serializers work unchanged
+    )
+    product = models.ForeignKey(
+        Products,
+        on_delete=models.PROTECT,  # Products referenced by archived orders cannot be deleted either
+        related_name='archived_order_lines',
+    )
+    quantity = models.PositiveIntegerField()
+    price_at_purchase = models.DecimalField(max_digits=12, decimal_places=2)  # Frozen price, as on the live line
+
+    class Meta:
+        unique_together = ('order', 'product')  # One line per product, as on live orders
+        verbose_name = "Archived Order Product"
+        verbose_name_plural = "Archived Order Products"
+
+    def line_total(self):
+        """Total for this line (quantity × frozen price)."""
+        return self.quantity * self.price_at_purchase
@@ -0,0 +1,127 @@
+import base64  # Cursors are URL-safe base64 so clients treat them as opaque tokens
+import json  # Cursor payload encoding
+
+from django.db.models import Q  # Builds the keyset seek condition
+from rest_framework.exceptions import NotFound  # Raised for tampered or malformed cursors
+from rest_framework.pagination import BasePagination  # DRF pagination interface
+from rest_framework.response import Response  # Standard API response
+from rest_framework.utils.urls import remove_query_param, replace_query_param  # Next-link construction
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over a fixed, unique ordering.
+
+    Instead of OFFSET, every page seeks directly to the position after the last row the
+    client saw (e.g. `created_at <= X AND (created_at < X OR id < Y)`), so the database
+    walks the index from that point and the cost of a page does not depend on its depth.
+
+    The ordering must end with a unique field (the primary key) and all fields must sort
+    in the same direction so the seek condition matches an index scan.
+    """
+    ordering = ('-created_at', '-id')  # Newest first; `id` breaks ties between equal timestamps
+    page_size = 20  # Default number of rows per page
+    page_size_query_param = 'page_size'  # Allows dynamic resizing via query params
+    max_page_size = 100  # Prevents excessive data requests
+    cursor_query_param = 'cursor'  # Opaque position token returned in `next`
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return the rows of the requested page, reading one extra row to know if another page exists.
+        """
+        self.request = request
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+        self.position = self.decode_cursor(request)  # None on the first page
+
+        queryset = queryset.order_by(*self.ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.seek_filter(self.position))
+
+        rows = list(queryset[:self.page_size + 1])  # One extra row tells us whether there is a next page
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),  # None on the last page
+            'results': data
+        })
+
+    def get_page_size(self, request):
+        """
+        Page size from the query string, clamped to `max_page_size`.
+        """
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        position = [self._cursor_value(last, name) for name in self.field_names]
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(position)
+        )
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    @property
+    def field_names(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    @property
+    def descending(self):
+        return self.ordering[0].startswith('-')
+
+    def seek_filter(self, position):
+        """
+        Condition selecting the rows strictly after `position` in the ordering.
+        The leading field gets a plain range bound (`<=`/`>=`) so the database can use it as an index
+        range, and the full lexicographic comparison handles ties on the leading value.
+        """
+        names = self.field_names
+        strict, inclusive = ('lt', 'lte') if self.descending else ('gt', 'gte')
+
+        after = Q()
+        for index in range(len(names) - 1, -1, -1):  # (a < x) | (a == x & ((b < y) | ...))
+            condition = Q(**{f'{names[index]}__{strict}': position[index]})
+            after = condition if index == len(names) - 1 else condition | (Q(**{names[index]: position[index]}) & after)
+        return Q(**{f'{names[0]}__{inclusive}': position[0]}) & after
+
+    def encode_cursor(self, position):
+        payload = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """
+        Parse the cursor from the query string into typed field values.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(raw, list) or len(raw) != len(self.field_names):
+                raise ValueError("Cursor does not match the ordering")
+            return [self._field(name).to_python(value) for name, value in zip(self.field_names, raw)]
+        except Exception:
+            raise NotFound("Invalid cursor")
+
+    def _cursor_value(self, row, name):
+        """
+        JSON-safe value of `name` for a model instance or a `values()` row.
+        """
+        value = row[name] if isinstance(row, dict) else getattr(row, self._field(name).attname)
+        if hasattr(value, 'isoformat'):  # Dates and datetimes
+            return value.isoformat()
+        return value if isinstance(value, (int, str)) or value is None else str(value)
+
+    def _field(self, name):
+        return self.model._meta.get_field(name)
@@ -1,15 +1,74 @@
-from django.db import transaction  # For managing database transactions
+import decimal  # Decimal quantization for the fast read path
+from django.utils import timezone  # Timezone conversion for the fast read path
+from rest_framework import ISO_8601  # DRF's default datetime output format marker
+from rest_framework.settings import api_settings  # DRF output settings (decimal coercion, datetime format)
 from rest_framework import serializers  # Provides serialization/deserialization functionality
-from .models import Order, OrderProduct  # Import Order and OrderProduct models
+from .models import Order, OrderProduct, UserOrderStats  # Import the order models
 from products.models import Products, User  # Import related models like Products and User
 from .services import OrderService  # Import additional service layer logic if needed
 
+class BatchedProductField(serializers.PrimaryKeyRelatedField):
+    """
+    Product primary key field that reuses products already loaded by `OrderProductListSerializer`.
+    Falls back to the regular per-value lookup when used outside a list (or for malformed values).
+    """
+
+    def to_internal_value(self, data):
+        list_serializer = self.parent.parent if self.parent is not None else None  # field -> item -> list
+        resolved = getattr(list_serializer, 'resolved_products', None)
+        if resolved is not None and not isinstance(data, bool):
+            try:
+                product = resolved.get(int(data))  # Already fetched by the single in_bulk query
+            except (TypeError, ValueError):
+                product = None
+            if product is not None:
+                return product
+        return super().to_internal_value(data)
+
+
+class OrderProductListSerializer(serializers.ListSerializer):
+    """
+    Validates a list of order items while resolving every `product_id` with a single `in_bulk` query.
+    Unknown product IDs are reported together in one error instead of one lookup (and one error) per line.
+    """
+    resolved_products = None  # Products loaded for the list currently being validated
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):  # Let the base class report the type error
+            return super().to_internal_value(data)
+
+        requested = []  # Product IDs in request order (malformed values are left to per-item validation)
+        for item in data:
+            value = item.get('product_id') if isinstance(item, dict) else None
+            if value is None or isinstance(value, bool):
+                continue
+            try:
+                requested.append(int(value))
+            except (TypeError, ValueError):
+                continue
+
+        products = Products.objects.in_bulk(set(requested))  # One query for every line
+        missing = sorted(set(requested) - set(products))
+        if missing:
+            raise serializers.ValidationError({
+                'product_id': [
+                    f"Invalid pk(s) {', '.join(str(pk) for pk in missing)} - product(s) do not exist."
+                ]
+            })
+
+        self.resolved_products = products
+        try:
+            return super().to_internal_value(data)  # Items now resolve products from `resolved_products`
+        finally:
+            self.resolved_products = None
+
+
 # Serializer for individual order items (OrderProduct model)
 class OrderProductSerializer(serializers.ModelSerializer):
     """
     Handles serialization/deserialization for individual order items with associated product details.
     """
-    product_id = serializers.PrimaryKeyRelatedField(
+    product_id = BatchedProductField(
         queryset=Products.objects.all(),  # Allow linking a product using its primary key
         source='product'  # Maps to the 'product' field in the OrderProduct model
     )
@@ -22,6 +81,7 @@ class OrderProductSerializer(serializers.ModelSerializer):
         model = OrderProduct  # Specifies the model this serializer is for
         fields = ['product_id', 'product_name', 'quantity', 'price_at_purchase']  # Fields to include in serialization
         read_only_fields = ['price_at_purchase', 'product_name']  # Read-only fields cannot be modified
+        list_serializer_class = OrderProductListSerializer  # Resolves all products of a list in one query
 
 
 
@@ -85,25 +145,148 @@ class OrderSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """
         Custom create method to handle the creation of an order and its associated items.
-        Uses an atomic transaction for data integrity.
+        Delegates to the bulk checkout path in `OrderService.create_order`, which validates
+        every line in memory and writes the order and its lines in a constant number of queries.
         """
-        with transaction.atomic():  # Begin a transaction block
-            # Extract order_products from the validated data and remove it from the main order data
-            products_data = validated_data.pop('order_products')
-
-            # Use `select_related` to optimize fetching the related user object during order creation
-            order = Order.objects.select_related('user').create(**validated_data)
-
-            # Create OrderProduct entries for each product in the order
-            for product_data in products_data:
-                OrderProduct.objects.create(
-                    order=order,  # Link to the newly created order
-                    product=product_data['product'],  # Assign the product
-                    quantity=product_data['quantity']  # Set the quantity
-                )
-
-            # Calculate totals for the order (subtotal, tax, discounts, etc.)
-            order.calculate_totals()
-            order.save()  # Save the updated order data
-
-            return order  # Return the created order instance
+        # Extract order_products from the validated data and remove it from the main order data
+        products_data = validated_data.pop('order_products')
+        user = validated_data.pop('user')  # The customer placing the order
+
+        return OrderService.create_order(user, products_data, **validated_data)  # Return the created order instance
+
+
+class UserOrderStatsSerializer(serializers.ModelSerializer):
+    """
+    Output-only representation of a customer's lifetime order summary.
+    """
+
+    class Meta:
+        model = UserOrderStats
+        fields = ['order_count', 'total_spent', 'last_order_at']
+        read_only_fields = fields
+
+
+# Read-only fast path for order listings
+def _decimal_formatter(field):
+    """
+    Precompile a DRF DecimalField's output format into a plain function.
+    Produces the same string as `field.to_representation`; unusual configurations fall back to it.
+    """
+    if not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING) or field.localize \
+            or field.decimal_places is None:
+        return field.to_representation
+
+    exponent = decimal.Decimal('.1') ** field.decimal_places  # e.g. 0.01 for two decimal places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def represent(value):
+        if value is None:
+            return ''
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+    return represent
+
+
+def _datetime_formatter(field):
+    """
+    Precompile a DRF DateTimeField's ISO 8601 output into a plain function.
+    Produces the same string as `field.to_representation`; other formats fall back to it.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, 'timezone'):
+        return field.to_representation
+
+    def represent(value):
+        field_timezone = field.default_timezone()  # Honors timezone.activate() like DRF does
+        if not value or field_timezone is None or timezone.is_naive(value):
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return represent
+
+
+class OrderReadSerializer:
+    """
+    Read-only serializer for order listings that skips DRF's per-field machinery.
+
+    Orders and their lines are read as `values()` rows (two queries in total) and turned into
+    dicts with formatters precompiled once from `OrderSerializer`'s own fields, so the output
+    (and the rendered JSON) is identical to `OrderSerializer(orders, many=True).data`.
+
+    Usage:
+        OrderReadSerializer(Order.objects.filter(...)).data
+        OrderReadSerializer(rows).data  # rows from `queryset.values(*OrderReadSerializer.order_values)`
+    """
+    order_values = (
+        'id', 'user_id', 'user__name', 'status', 'subtotal', 'discount',
+        'tax_amount', 'shipping_cost', 'total', 'created_at'
+    )  # Columns needed to render one order
+    line_values = ('order_id', 'product_id', 'product__name', 'quantity', 'price_at_purchase')  # Columns per line
+    _accessors = None  # Formatters compiled on first use and shared by every instance
+
+    def __init__(self, orders):
+        self.orders = orders  # Order queryset or rows already fetched with `order_values`
+
+    @classmethod
+    def compile_accessors(cls):
+        """
+        Build the per-field formatters from the DRF serializers once per process.
+        """
+        if cls._accessors is None:
+            order_fields = OrderSerializer().fields
+            line_fields = OrderProductSerializer().fields
+            cls._accessors = {
+                'money': {
+                    name: _decimal_formatter(order_fields[name])
+                    for name in ('subtotal', 'discount', 'tax_amount', 'shipping_cost', 'total')
+                },
+                'status': order_fields['status'].to_representation,
+                'created_at': _datetime_formatter(order_fields['created_at']),
+                'price_at_purchase': _decimal_formatter(line_fields['price_at_purchase']),
+            }
+        return cls._accessors
+
+    @property
+    def data(self):
+        rows = self.orders
+        if hasattr(rows, 'values') and not isinstance(rows, (list, tuple)):  # A queryset, not fetched rows
+            rows = rows.values(*self.order_values)
+        rows = list(rows)
+        if not rows:
+            return []
+
+        accessors = self.compile_accessors()
+        money = accessors['money']
+        status_repr = accessors['status']
+        created_at_repr = accessors['created_at']
+        price_repr = accessors['price_at_purchase']
+
+        # One query for every line of every order on the page
+        lines_by_order = {}
+        lines = OrderProduct.objects.filter(order_id__in=[row['id'] for row in rows]) \
+                                    .order_by('pk').values_list(*self.line_values)
+        for order_id, product_id, product_name, quantity, price in lines:
+            lines_by_order.setdefault(order_id, []).append({
+                'product_id': product_id,
+                'product_name': product_name,
+                'quantity': quantity,
+                'price_at_purchase': price_repr(price),
+            })
+
+        # Keys are emitted in the same order as OrderSerializer's readable fields
+        return [{
+            'id': row['id'],
+            'user': {'id': row['user_id'], 'username': row['user__name']},
+            'products': lines_by_order.get(row['id'], []),
+            'status': status_repr(row['status']),
+            'subtotal': money['subtotal'](row['subtotal']),
+            'discount': money['discount'](row['discount']),
+            'tax_amount': money['tax_amount'](row['tax_amount']),
+            'shipping_cost': money['shipping_cost'](row['shipping_cost']),
+            'total': money['total'](row['total']),
+            'created_at': created_at_repr(row['created_at']),
+        } for row in rows]
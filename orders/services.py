@@ -1,7 +1,13 @@
 from django.db import transaction  # Used to manage database operations as a single atomic unit
+from django.core.exceptions import ValidationError  # Raised when an order line breaks a business rule
+from django.db.models import Exists, F, OuterRef, Sum  # Set-based lookups for bulk status changes
+from django.utils import timezone  # Completion timestamps for bulk status changes
 from decimal import Decimal  # Provides support for precise decimal arithmetic (useful for monetary values)
 from .models import Order, OrderProduct  # Import the core models for orders and their related products
-from products.models import Products  # Import the Products model to fetch product information
+from .inventory import StockReservationService  # Reserves stock for new order lines
+from .signals import invalidate_order_detail, invalidate_order_details  # Cache invalidation for writes that bypass model signals
+from .events import order_lines_changed, orders_status_changed  # Lifecycle events for the bulk write paths
+from outbox.services import OutboxService  # Domain events for downstream systems
 
 
 class OrderService:
@@ -13,7 +19,13 @@ class OrderService:
     @staticmethod
     def create_order(user, products_data, **kwargs):
         """
-        Creates a new order and its associated order products.
+        Creates a new order and its associated order products in a single pass.
+        - Every line is validated in memory before anything is written.
+        - Totals are computed once from the in-memory lines.
+        - Stock for every line is reserved with a constant number of queries.
+        - The order is written with one INSERT and the lines with one `bulk_create`,
+          so the number of queries does not grow with the size of the cart.
+        - An `order.created` outbox event is recorded in the same transaction.
         Args:
             user: The user placing the order.
             products_data: A list of product and quantity details.
@@ -21,26 +33,72 @@ class OrderService:
         Returns:
             The created Order instance.
         """
+        lines = OrderService.build_order_lines(products_data)  # Validate every line before touching the database
+
         with transaction.atomic():  # Ensure all database operations within this block succeed or are rolled back.
-            # Create a new order for the specified user with any extra fields passed in kwargs
-            order = Order.objects.create(user=user, **kwargs)
-
-            # Loop through the list of products to create associated order items
-            for product_data in products_data:
-                product = product_data['product']  # Extract the product instance from the data
-                OrderProduct.objects.create(  # Create a new OrderProduct entry
-                    order=order,  # Link it to the newly created order
-                    product=product,  # Link the specific product
-                    quantity=product_data['quantity']  # Set the quantity for this order item
-                )
-
-            # Recalculate the financial totals for the order (subtotal, tax, discounts, total, etc.)
-            order.calculate_totals()
-
-            # Save the updated order with calculated totals to the database
-            order.save()
+            # Take the stock for every line up front; fails the whole checkout if any product runs short
+            StockReservationService.reserve({line.product_id: line.quantity for line in lines})
+
+            # Build the order with its totals already known so it is written exactly once
+            order = Order(user=user, **kwargs)
+            order.apply_totals(sum((line.line_total() for line in lines), Decimal('0')))
+            order.save()  # Single INSERT, no re-read of the lines
+
+            # Link every line to the new order and insert them in one statement
+            for line in lines:
+                line.order = order
+            OrderProduct.objects.bulk_create(lines)
+            order_lines_changed.send(  # `bulk_create` bypasses OrderProduct.save
+                sender=OrderProduct, order_id=order.pk, created_at=order.created_at,
+                changes={line.product_id: (line.quantity, line.line_total()) for line in lines}
+            )
+            OutboxService.publish('order', order.pk, 'order.created', {
+                'order_id': order.pk,
+                'user_id': order.user_id,
+                'status': order.status,
+                'subtotal': order.subtotal,
+                'total': order.total,
+                'created_at': order.created_at,
+                'lines': [
+                    {'product_id': line.product_id, 'quantity': line.quantity,
+                     'price_at_purchase': line.price_at_purchase}
+                    for line in lines
+                ],
+            })
+
             return order  # Return the fully created and saved order object
 
+    @staticmethod
+    def build_order_lines(products_data):
+        """
+        Builds unsaved OrderProduct instances and validates them in memory.
+        Runs the same checks as `OrderProduct.save` (field validators, stock check and
+        one line per product) without issuing a query per line.
+        Args:
+            products_data: A list of dicts holding a `product` instance and a `quantity`.
+        Returns:
+            A list of validated, unsaved OrderProduct instances with frozen prices.
+        """
+        lines = []  # Validated line items in request order
+        seen_products = set()  # Product IDs already present in this order
+        for product_data in products_data:
+            product = product_data['product']  # Extract the product instance from the data
+            line = OrderProduct(
+                product=product,  # Link the specific product
+                quantity=product_data['quantity'],  # Set the quantity for this order item
+                price_at_purchase=product.price  # Freeze the product price at purchase
+            )
+
+            # Mirror the unique_together ('order', 'product') check without querying
+            if product.pk in seen_products:
+                raise ValidationError(line.unique_error_message(OrderProduct, ('order', 'product')))
+            seen_products.add(product.pk)
+
+            # The order does not exist yet and the product is already resolved, so skip their DB lookups
+            line.full_clean(exclude=['order', 'product'], validate_unique=False)
+            lines.append(line)
+        return lines
+
     @staticmethod
     def update_order_status(order, new_status):
         """
@@ -54,6 +112,104 @@ class OrderService:
             order.full_clean()  # Validate the updated order data (e.g., ensure status is valid per model constraints)
             order.save()  # Save the updated order to the database
 
+    BULK_STATUS_CHUNK_SIZE = 1000  # Orders locked and updated per transaction in `bulk_update_status`
+
+    @staticmethod
+    def bulk_update_status(order_ids, new_status, expected_status=None):
+        """
+        Moves many orders to `new_status` with set-based UPDATEs instead of one save per order.
+        - Applies the same rules as `Order.validate_status_transition`: orders in a terminal
+          status cannot change, and terminal statuses require at least one product.
+        - Sets `completed_at` like `Order.save` and releases the stock of orders that become
+          cancelled or returned with one aggregated stock update per chunk.
+        - Orders are processed in chunks of `BULK_STATUS_CHUNK_SIZE`, each in its own transaction,
+          so a failure only affects the orders of one chunk.
+        Args:
+            order_ids: IDs of the orders to update.
+            new_status: One of `Order.OrderStatus`.
+            expected_status: Optional status the orders must still be in (checked under the row lock),
+                             e.g. so a sweeper never cancels an order that was paid in the meantime.
+        Returns:
+            A list of `{'id', 'success'[, 'error']}` dicts in request order (duplicates collapsed).
+        """
+        if new_status not in Order.OrderStatus.values:
+            raise ValidationError(f"Invalid status: {new_status}")
+
+        order_ids = list(dict.fromkeys(order_ids))  # Drop duplicates, keep the request order
+        errors = {}  # order ID -> reason the order was not updated
+        chunk_size = OrderService.BULK_STATUS_CHUNK_SIZE
+        for start in range(0, len(order_ids), chunk_size):
+            errors.update(OrderService._bulk_update_status_chunk(
+                order_ids[start:start + chunk_size], new_status, expected_status
+            ))
+
+        return [
+            {'id': pk, 'success': False, 'error': errors[pk]} if pk in errors else {'id': pk, 'success': True}
+            for pk in order_ids
+        ]
+
+    @staticmethod
+    def _bulk_update_status_chunk(order_ids, new_status, expected_status=None):
+        """
+        Validates and applies one chunk of `bulk_update_status`.
+        Returns:
+            dict of order ID -> error message for the orders that were rejected.
+        """
+        label = Order.OrderStatus(new_status).label
+        with transaction.atomic():
+            # Lock the rows in ID order and read everything the rules need in one query
+            current = {
+                pk: (status, has_lines, created_at) for pk, status, has_lines, created_at in
+                Order.objects.select_for_update()
+                .filter(pk__in=order_ids)
+                .annotate(has_lines=Exists(OrderProduct.objects.filter(order_id=OuterRef('pk'))))
+                .order_by('pk')
+                .values_list('pk', 'status', 'has_lines', 'created_at')
+            }
+
+            errors, changed = {}, []
+            for pk in order_ids:
+                if pk not in current:
+                    errors[pk] = "Order not found"
+                    continue
+                original_status, has_lines, _ = current[pk]
+                if expected_status is not None and original_status != expected_status:  # Changed since selected
+                    errors[pk] = f"Order is no longer {Order.OrderStatus(expected_status).label.lower()}"
+                elif original_status == new_status:  # Already there, nothing to write
+                    continue
+                elif original_status in Order.TERMINAL_STATUSES:  # Rule 1 of validate_status_transition
+                    errors[pk] = f"Cannot change status from {Order.OrderStatus(original_status).label}"
+                elif new_status in Order.TERMINAL_STATUSES and not has_lines:  # Rule 2
+                    errors[pk] = f"Order must include at least one product to be marked {label.lower()}"
+                else:
+                    changed.append(pk)
+
+            if not changed:
+                return errors
+
+            # Every changed order starts non-terminal, so completion is set or cleared uniformly
+            now = timezone.now()
+            Order.objects.filter(pk__in=changed).update(
+                status=new_status,
+                completed_at=now if new_status in Order.TERMINAL_STATUSES else None,
+                version=F('version') + 1,  # Copies loaded before this update must not overwrite it
+                updated_at=now  # `update()` bypasses auto_now
+            )
+
+            if new_status in Order.STOCK_RELEASE_STATUSES:  # Give the stock of all these orders back at once
+                StockReservationService.release(dict(
+                    OrderProduct.objects.filter(order_id__in=changed)
+                    .order_by()  # Group by product only
+                    .values('product_id')
+                    .annotate(units=Sum('quantity'))
+                    .values_list('product_id', 'units')
+                ))
+
+            invalidate_order_details(changed)  # `update()` does not send model signals
+            orders_status_changed.send(sender=Order, changes=[
+                (pk, current[pk][2], current[pk][0], new_status) for pk in changed
+            ])
+            return errors
 
     @staticmethod
     def add_product_to_order(order, products_data):
@@ -63,28 +219,102 @@ class OrderService:
             order: The Order instance being modified.
             products_data: A list of products and quantities to add to the order.
         """
-        with transaction.atomic():  # Ensure consistency during the update process
-            # Loop through the provided list of products and their quantities
-            for item in products_data:
-                product = item['product']  # Extract the product instance from the data
-                quantity = item['quantity']  # Extract the quantity for this product
-
-                # Check if the product is already in the order
-                existing = order.order_products.filter(product=product).first()
-                if existing:  # If the product already exists in the order
-                    existing.quantity += quantity  # Increment the quantity by the specified amount
-                    existing.save()  # Save the updated OrderProduct entry
-                else:  # If the product does not exist in the order
-                    OrderProduct.objects.create(  # Create a new OrderProduct entry
-                        order=order,  # Link it to the existing order
-                        product=product,  # Specify the product
-                        quantity=quantity  # Set the quantity for this new entry
+        OrderService.update_order_lines(order, products_data, mode=OrderService.LINES_ADD)
+
+    # Line update modes for `update_order_lines`
+    LINES_ADD = 'add'  # Increase quantities, creating lines for new products
+    LINES_SET = 'set'  # Replace the order's lines with exactly the given products and quantities
+    LINES_REMOVE = 'remove'  # Decrease quantities (or drop whole lines when no quantity is given)
+    LINE_MODES = (LINES_ADD, LINES_SET, LINES_REMOVE)
+
+    @staticmethod
+    def update_order_lines(order, products_data, mode=LINES_ADD):
+        """
+        Applies line edits to an existing order as one set operation.
+        - One query loads the affected lines, then `bulk_update`, `bulk_create` and one DELETE
+          apply the changes, stock is reserved/released for the net differences, and the order
+          totals are shifted with a single delta UPDATE.
+        - The number of queries does not depend on how many lines are edited.
+        Args:
+            order: The Order instance being modified.
+            products_data: A list of dicts with a `product` instance and a `quantity`
+                           (`quantity` is optional in remove mode: the whole line is dropped).
+            mode: One of `LINE_MODES`.
+        """
+        if mode not in OrderService.LINE_MODES:
+            raise ValidationError(f"Unknown line update mode: {mode}")
+
+        # Merge repeated products so each product is handled once
+        requested = {}  # product ID -> (product, quantity or None)
+        for item in products_data:
+            product, quantity = item['product'], item.get('quantity')
+            if quantity is not None and quantity <= 0:
+                raise ValidationError("Quantity must be positive")
+            if quantity is None and mode != OrderService.LINES_REMOVE:
+                raise ValidationError("Product data requires both product_id and quantity")
+            previous = requested.get(product.pk, (product, 0))[1]
+            requested[product.pk] = (product, None if quantity is None or previous is None else previous + quantity)
+
+        with transaction.atomic():  # Lines, stock and totals change together or not at all
+            # One query for every line the edit can touch
+            lines = order.order_products.all()
+            if mode != OrderService.LINES_SET:
+                lines = lines.filter(product_id__in=requested)
+            existing = {line.product_id: line for line in lines}
+
+            # Target quantity per product (0 means the line goes away)
+            targets = {}
+            if mode == OrderService.LINES_SET:
+                targets = {pk: 0 for pk in existing}  # Unlisted lines are removed
+                targets.update({pk: quantity for pk, (product, quantity) in requested.items()})
+            for pk, (product, quantity) in requested.items():
+                current = existing[pk].quantity if pk in existing else 0
+                if mode == OrderService.LINES_ADD:
+                    targets[pk] = current + quantity
+                elif mode == OrderService.LINES_REMOVE:
+                    targets[pk] = 0 if quantity is None else max(current - quantity, 0)
+
+            to_create, to_update, to_delete = [], [], []
+            stock_deltas, subtotal_delta, sales = {}, Decimal('0'), {}
+            for pk, target in targets.items():
+                line = existing.get(pk)
+                current = line.quantity if line else 0
+                if target == current:
+                    continue
+                stock_deltas[pk] = target - current
+                if line is None:  # New product for this order, price frozen now
+                    product = requested[pk][0]
+                    line = OrderProduct(order=order, product=product, quantity=target, price_at_purchase=product.price)
+                    to_create.append(line)
+                elif target == 0:
+                    to_delete.append(line.pk)
+                else:
+                    line.quantity = target
+                    to_update.append(line)
+                subtotal_delta += (target - current) * line.price_at_purchase
+                sales[pk] = (target - current, (target - current) * line.price_at_purchase)
+
+            if order.holds_stock:  # Cancelled/returned orders have already given their stock back
+                StockReservationService.adjust(stock_deltas)
+                if sales:  # Bulk writes bypass OrderProduct.save
+                    order_lines_changed.send(
+                        sender=OrderProduct, order_id=order.pk, created_at=order.created_at, changes=sales
                     )
+            if to_update:
+                OrderProduct.objects.bulk_update(to_update, ['quantity'])
+            if to_create:
+                OrderProduct.objects.bulk_create(to_create)
+            if to_delete:
+                OrderProduct.objects.filter(pk__in=to_delete).delete()
+            order.apply_subtotal_delta(subtotal_delta)  # Single totals write
+
+            invalidate_order_detail(order.pk)  # Bulk writes do not send model signals
 
     @staticmethod
     def calculate_order_totals(order):
         """
-        Recalculates and updates the financial totals for a given order.
+        Recalculates and updates the financial totals for a given order from all of its lines.
+        Totals are normally maintained incrementally; use this to repair an order that has drifted.
         Args:
             order: The Order instance whose totals need recalculating.
         """
@@ -0,0 +1,71 @@
+from django.db import transaction  # Invalidate only once the change is visible to other readers
+from django.db.models.signals import post_delete, post_save  # Model change hooks
+from django.dispatch import receiver  # Signal receiver decorator
+
+from .cache import OrderDetailCache  # Cached order detail responses
+from .events import order_deleted, orders_status_changed  # Status transitions and deletions
+from products.models import User  # Customers get their stats row on creation
+from .models import Order, OrderProduct, UserOrderStats  # Models whose changes affect an order's detail payload
+from .stats import UserOrderStatsService  # Per-customer order counters
+from .streams import broker  # Live status streams
+
+
+def invalidate_order_detail(order_id):
+    """
+    Drop the cached detail payload for an order after the current transaction commits.
+    Invalidating on commit (not before) guarantees a reader cannot re-cache the old state afterwards.
+    """
+    if order_id is not None:
+        transaction.on_commit(lambda: OrderDetailCache.invalidate(order_id))
+
+
+def invalidate_order_details(order_ids):
+    """
+    Same as `invalidate_order_detail` for many orders at once (used by set-based updates).
+    """
+    order_ids = list(order_ids)
+    if order_ids:
+        transaction.on_commit(lambda: OrderDetailCache.invalidate_many(order_ids))
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance, **kwargs):
+    invalidate_order_detail(instance.pk)  # Status, totals or payment progress changed
+
+
+@receiver(post_save, sender=User)
+def create_user_order_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:  # Checkouts then only ever UPDATE the row
+        UserOrderStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Order)
+def count_new_order(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:  # Fixtures are not new orders
+        UserOrderStatsService.record_order(instance.user_id, instance.created_at)  # Same transaction as the order
+
+
+@receiver(order_deleted)
+def uncount_deleted_order(sender, user_id, created_at, spent, **kwargs):
+    UserOrderStatsService.forget_order(user_id, created_at, spent)  # Same transaction as the deletion
+
+
+@receiver(orders_status_changed)
+def stream_status_changes(sender, changes, **kwargs):
+    events = [
+        {'order_id': order_id, 'status': new_status, 'old_status': old_status}
+        for order_id, created_at, old_status, new_status in changes
+        if old_status is not None  # Nobody can be watching an order that did not exist yet
+    ]
+    if events:
+        transaction.on_commit(lambda: broker.publish(events))  # Subscribers only ever see committed states
+
+
+@receiver([post_save, post_delete], sender=OrderProduct)
+def order_line_changed(sender, instance, **kwargs):
+    invalidate_order_detail(instance.order_id)  # Lines and totals are part of the detail payload
+
+
+@receiver([post_save, post_delete], sender='payments.Payment')
+def payment_changed(sender, instance, **kwargs):
+    invalidate_order_detail(instance.order_id)  # Payment creation and finalization change the order
@@ -0,0 +1,117 @@
+from decimal import Decimal  # Monetary arithmetic
+
+from django.apps import apps  # Payments live in another app that imports this one
+from django.db import IntegrityError, transaction  # Race-free upserts
+from django.db.models import Count, F, Max, Sum, Value  # Incremental counters and rebuild aggregates
+from django.db.models.functions import Coalesce, Greatest  # NULL-safe "latest order" update
+
+from .models import ArchivedOrder, Order, UserOrderStats  # Orders counted and the stats rows
+
+
+class UserOrderStatsService:
+    """
+    Keeps the per-customer `UserOrderStats` row up to date.
+
+    - New orders and successful payments shift the counters with one `UPDATE ... SET x = x + n`,
+      so concurrent checkouts by the same customer never lose an increment. Deleted orders
+      (`Order.delete`, not archiving) are subtracted the same way.
+    - The row is created with the customer; for customers without one it is created on first use,
+      and a concurrent creator is handled by retrying the update.
+    - `rebuild` recomputes the counters from live and archived orders and payments.
+    """
+
+    @staticmethod
+    def record_order(user_id, created_at):
+        """
+        Counts a newly placed order.
+        """
+        UserOrderStatsService._apply(
+            user_id,
+            updates={
+                'order_count': F('order_count') + 1,
+                # Greatest() is NULL on some backends when one side is NULL, so start from created_at
+                'last_order_at': Greatest(Coalesce(F('last_order_at'), Value(created_at)), Value(created_at)),
+            },
+            initial={'order_count': 1, 'last_order_at': created_at}
+        )
+
+    @staticmethod
+    def record_payment(user_id, amount):
+        """
+        Adds a successful payment to the customer's lifetime spend.
+        """
+        UserOrderStatsService._apply(
+            user_id,
+            updates={'total_spent': F('total_spent') + amount},
+            initial={'total_spent': amount}
+        )
+
+    @staticmethod
+    def forget_order(user_id, created_at, spent):
+        """
+        Takes a deleted order and its successful payments (`spent`) back out of the counters.
+        If it was the customer's latest order, `last_order_at` falls back to their latest remaining
+        one, live or archived.
+        """
+        UserOrderStats.objects.filter(user_id=user_id).update(
+            order_count=F('order_count') - 1, total_spent=F('total_spent') - spent
+        )
+        stale = UserOrderStats.objects.filter(user_id=user_id, last_order_at=created_at)
+        if stale.exists():  # Rare: only the customer's most recent order needs the lookup
+            latest = [model.objects.filter(user_id=user_id).aggregate(last=Max('created_at'))['last']
+                      for model in (Order, ArchivedOrder)]
+            stale.update(last_order_at=max(filter(None, latest), default=None))
+
+    @staticmethod
+    def get_stats(user_id):
+        """
+        The customer's stats row, or an unsaved all-zero row if they have not ordered yet.
+        """
+        return UserOrderStats.objects.filter(user_id=user_id).first() or UserOrderStats(user_id=user_id)
+
+    @staticmethod
+    def _apply(user_id, updates, initial):
+        """
+        Applies `updates` to the customer's row, creating it from `initial` if it does not exist yet.
+        """
+        if UserOrderStats.objects.filter(user_id=user_id).update(**updates):
+            return
+        try:
+            with transaction.atomic():  # Savepoint: a concurrent insert must not break the caller's transaction
+                UserOrderStats.objects.create(user_id=user_id, **initial)
+        except IntegrityError:  # Someone else created the row first, so it can be updated now
+            UserOrderStats.objects.filter(user_id=user_id).update(**updates)
+
+    @staticmethod
+    def rebuild(user_ids=None):
+        """
+        Recomputes the stats of `user_ids` (or of every customer) from their orders and payments,
+        including archived ones, and replaces the stored rows.
+        Returns:
+            The number of stats rows written.
+        """
+        Payment = apps.get_model('payments', 'Payment')
+        ArchivedPayment = apps.get_model('payments', 'ArchivedPayment')
+
+        def scoped(queryset, field):
+            return queryset if user_ids is None else queryset.filter(**{f'{field}__in': user_ids})
+
+        stats = {}  # user ID -> UserOrderStats
+        for model in (Order, ArchivedOrder):  # Lifetime counts include archived orders
+            rows = scoped(model.objects.order_by(), 'user_id') \
+                .values('user_id').annotate(count=Count('pk'), last=Max('created_at'))
+            for row in rows:
+                entry = stats.setdefault(row['user_id'], UserOrderStats(user_id=row['user_id']))
+                entry.order_count += row['count']
+                entry.last_order_at = max(filter(None, (entry.last_order_at, row['last'])), default=None)
+        for model in (Payment, ArchivedPayment):
+            rows = scoped(model.objects.filter(status='success').order_by(), 'order__user_id') \
+                .values('order__user_id').annotate(spent=Sum('amount'))
+            for row in rows:
+                entry = stats.setdefault(row['order__user_id'], UserOrderStats(user_id=row['order__user_id']))
+                entry.total_spent = Decimal(entry.total_spent) + row['spent']
+
+        with transaction.atomic():
+            scoped(UserOrderStats.objects.all(), 'user_id').delete()
+            UserOrderStats.objects.bulk_create(stats.values(), batch_size=1000)
+        return len(stats)
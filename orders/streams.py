@@ -0,0 +1,203 @@
+import asyncio  # Subscriber queues and the cache poller
+import json  # SSE payloads
+import logging  # Poller failures are logged, not raised
+import threading  # Publishers run in worker threads, subscribers on the event loop
+import time  # Seeds the sequence counter
+
+from django.conf import settings  # Stream tuning
+from django.core.cache import cache  # Cross-process event relay
+
+logger = logging.getLogger(__name__)
+
+EVENT_TTL = getattr(settings, 'ORDER_STREAM_EVENT_TTL', 300)  # Seconds a status event stays in the cache
+POLL_INTERVAL = getattr(settings, 'ORDER_STREAM_POLL_INTERVAL', 1.0)  # Seconds between cache polls per process
+HEARTBEAT_INTERVAL = getattr(settings, 'ORDER_STREAM_HEARTBEAT', 15)  # Seconds between keep-alive comments
+MAX_LIFETIME = getattr(settings, 'ORDER_STREAM_MAX_LIFETIME', 300)  # Seconds before a stream asks the client to reconnect
+RETRY_MS = 3000  # Client reconnect delay sent with every stream
+
+
+class OrderStatusBroker:
+    """
+    Pub/sub for order status changes, shared by every SSE connection of a process.
+
+    - `publish` (called after an order change commits) stores the latest event per order in the
+      cache and hands it straight to subscribers in this process.
+    - Events published by other processes are picked up by one poller task per event loop,
+      which reads the latest event of every watched order with a single `get_many` per tick;
+      idle connections therefore cost one queue each and no database or cache traffic of their own.
+    - Events carry a sequence number so the same change arriving both ways is delivered once.
+      Numbers come from one counter in the shared cache (an atomic INCR), so they increase across
+      every process and host regardless of their clocks; the counter is seeded from the clock only
+      when it is created, so a re-created counter starts above the numbers handed out before.
+    """
+    seq_key = 'order_status_event_seq'
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscriptions = {}  # order ID -> set of Subscription
+        self._loop_subscriptions = {}  # event loop -> set of Subscription
+        self._pollers = {}  # event loop -> poller task
+        self._last_seq = 0  # Highest sequence number this process has handed out or read
+        self._lock = threading.Lock()  # Subscriptions change on the loop, publishes come from threads
+
+    @staticmethod
+    def event_key(order_id):
+        return f"order_status_event:{order_id}"
+
+    def _next_seqs(self, count):
+        """
+        `count` consecutive sequence numbers from the shared counter. If the cache is unavailable,
+        events are only delivered in this process, so they are numbered from its own last number.
+        """
+        try:
+            try:
+                last = cache.incr(self.seq_key, count)
+            except ValueError:  # Counter missing (never used or evicted)
+                cache.add(self.seq_key, time.time_ns(), None)  # Only the first writer wins
+                last = cache.incr(self.seq_key, count)
+        except Exception:
+            logger.exception("Failed to take order status sequence numbers from the cache")
+            with self._lock:
+                last = self._last_seq + count
+        with self._lock:
+            self._last_seq = max(self._last_seq, last)
+        return range(last - count + 1, last + 1)
+
+    async def current_seq(self):
+        """
+        The latest sequence number handed out; events published afterwards have higher numbers.
+        """
+        try:
+            seq = await cache.aget(self.seq_key)
+        except Exception:
+            logger.exception("Failed to read the order status sequence from the cache")
+            seq = None
+        return seq if seq is not None else self._last_seq
+
+    def publish(self, events):
+        """
+        Publish status change events (dicts with `order_id`, `status` and `old_status`).
+        Safe to call from any thread.
+        """
+        events = [{**event, 'seq': seq} for event, seq in zip(events, self._next_seqs(len(events)))]
+        try:
+            cache.set_many({self.event_key(event['order_id']): event for event in events}, EVENT_TTL)
+        except Exception:
+            logger.exception("Failed to store order status events in the cache")
+        for event in events:
+            self._deliver(event)
+
+    def subscribe(self, order_ids, since=None):
+        """
+        Register a subscriber for `order_ids` on the running event loop.
+        Args:
+            since: Only events with a higher sequence number are delivered (e.g. the stream's start).
+        """
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(self, loop, order_ids, since)
+        with self._lock:
+            for order_id in subscription.order_ids:
+                self._subscriptions.setdefault(order_id, set()).add(subscription)
+            self._loop_subscriptions.setdefault(loop, set()).add(subscription)
+            if loop not in self._pollers or self._pollers[loop].done():
+                self._pollers[loop] = loop.create_task(self._poll(loop))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscriber; the loop's poller stops with its last subscriber.
+        """
+        with self._lock:
+            for order_id in subscription.order_ids:
+                subscribers = self._subscriptions.get(order_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[order_id]
+            on_loop = self._loop_subscriptions.get(subscription.loop, set())
+            on_loop.discard(subscription)
+            if not on_loop:
+                self._loop_subscriptions.pop(subscription.loop, None)
+                poller = self._pollers.pop(subscription.loop, None)
+                if poller is not None:
+                    subscription.loop.call_soon_threadsafe(poller.cancel)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._loop_subscriptions.values())
+
+    def _deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(event['order_id'], ()))
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    async def _poll(self, loop):
+        """
+        Relays events published by other processes to this loop's subscribers (cancelled by `unsubscribe`).
+        """
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            with self._lock:
+                order_ids = {
+                    order_id for subscription in self._loop_subscriptions.get(loop, ())
+                    for order_id in subscription.order_ids
+                }
+            if not order_ids:
+                continue
+            try:
+                events = await cache.aget_many([self.event_key(order_id) for order_id in sorted(order_ids)])
+            except Exception:
+                logger.exception("Failed to read order status events from the cache")
+                continue
+            for event in events.values():
+                self._deliver(event)
+
+
+class Subscription:
+    """
+    One SSE connection's view of the broker: a queue of events for the orders it watches.
+    """
+
+    def __init__(self, broker, loop, order_ids, since=None):
+        self.broker = broker
+        self.loop = loop
+        self.order_ids = frozenset(order_ids)
+        self.queue = asyncio.Queue()
+        self.last_seq = {order_id: since or 0 for order_id in self.order_ids}  # Newest event seen per order
+
+    def offer(self, event):
+        """
+        Queue `event` for this subscriber (from any thread); callers on the loop may await `get`.
+        """
+        self.loop.call_soon_threadsafe(self._accept, event)
+
+    def _accept(self, event):
+        if event['seq'] > self.last_seq.get(event['order_id'], 0):  # Drop duplicates and replays
+            self.last_seq[event['order_id']] = event['seq']
+            self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """
+        The next event, or None after `timeout` seconds without one.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+def format_sse(event, data, event_id=None):
+    """
+    Encode one Server-Sent Event.
+    """
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return "\n".join(lines) + "\n\n"
+
+
+broker = OrderStatusBroker()  # Process-wide broker used by the stream view and the order save hooks
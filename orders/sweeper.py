@@ -0,0 +1,96 @@
+import time  # Throughput measurements
+from datetime import timedelta  # Pending order TTL
+
+from django.conf import settings  # Pending order TTL
+from django.db.models import Q  # Keyset seek condition
+from django.utils import timezone  # Current time for the cutoff
+
+from .models import Order  # Orders being swept
+from .services import OrderService  # Set-based status transitions
+
+PENDING_ORDER_TTL_MINUTES = getattr(settings, 'PENDING_ORDER_TTL_MINUTES', 60)  # Abandoned after this long
+DEFAULT_BATCH_SIZE = 500  # Orders cancelled per batch
+
+
+class PendingOrderSweeper:
+    """
+    Cancels orders that have been waiting in PENDING for longer than the TTL.
+
+    - Candidates are read oldest first with a keyset seek on (created_at, id), which is a range
+      scan of the (status, created_at) index; orders the sweep cannot cancel are stepped over
+      instead of being read again by the next batch.
+    - Each batch is cancelled with `OrderService.bulk_update_status`, which re-checks under the
+      row lock that the order is still pending and releases the reserved stock in one update.
+    - Counters and timings are kept on the instance so callers can report throughput.
+    """
+
+    def __init__(self, ttl_minutes=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.ttl = timedelta(minutes=PENDING_ORDER_TTL_MINUTES if ttl_minutes is None else ttl_minutes)
+        self.batch_size = batch_size
+        self.batches = 0  # Batches processed
+        self.scanned = 0  # Candidate orders read
+        self.cancelled = 0  # Orders moved to CANCELLED
+        self.skipped = 0  # Candidates left alone (paid meanwhile, no lines, ...)
+        self.elapsed = 0.0  # Seconds spent sweeping
+
+    def candidates(self, cutoff, after=None):
+        """
+        The next batch of stale pending orders as (created_at, id) pairs, oldest first.
+        Args:
+            cutoff: Orders created before this moment are stale.
+            after: (created_at, id) of the last order already handled in this pass.
+        """
+        queryset = Order.objects.filter(status=Order.OrderStatus.PENDING, created_at__lt=cutoff)
+        if after is not None:
+            created_at, pk = after
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+        return list(queryset.order_by('created_at', 'pk').values_list('created_at', 'pk')[:self.batch_size])
+
+    def sweep(self, max_batches=None, on_batch=None):
+        """
+        Runs one pass over every order that is stale right now.
+        Args:
+            max_batches: Stop after this many batches (None for no limit).
+            on_batch: Optional callable receiving a dict of per-batch metrics.
+        Returns:
+            The number of orders cancelled in this pass.
+        """
+        cutoff = timezone.now() - self.ttl  # Fixed for the pass, so it always terminates
+        cancelled, batches, after = 0, 0, None
+        while max_batches is None or batches < max_batches:
+            started = time.monotonic()
+            rows = self.candidates(cutoff, after)
+            if not rows:
+                break
+            after = rows[-1]  # Seek past this batch whatever the outcome
+
+            results = OrderService.bulk_update_status(
+                [pk for _, pk in rows], Order.OrderStatus.CANCELLED, expected_status=Order.OrderStatus.PENDING
+            )
+            done = sum(result['success'] for result in results)
+            seconds = time.monotonic() - started
+
+            batches += 1
+            cancelled += done
+            self.batches += 1
+            self.scanned += len(rows)
+            self.cancelled += done
+            self.skipped += len(rows) - done
+            self.elapsed += seconds
+            if on_batch is not None:
+                on_batch({
+                    'batch': self.batches,
+                    'scanned': len(rows),
+                    'cancelled': done,
+                    'skipped': len(rows) - done,
+                    'seconds': seconds,
+                    'orders_per_second': len(rows) / seconds if seconds else 0.0,
+                })
+        return cancelled
+
+    @property
+    def throughput(self):
+        """
+        Candidate orders processed per second over the sweeper's lifetime.
+        """
+        return self.scanned / self.elapsed if self.elapsed else 0.0
@@ -1,3 +1,1140 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from payments.models import ArchivedPayment, Payment
+from payments.services import PaymentService
+from products.models import Products, User
+from .archive import OrderArchiveService
+from .cache import OrderDetailCache
+from .exceptions import InsufficientStockError, OrderConcurrencyError
+from .exports import iter_orders_ndjson
+from .idempotency import IdempotencyStore, idempotent
+from .models import ArchivedOrder, ArchivedOrderProduct, IdempotencyKey, Order, OrderProduct, UserOrderStats
+from .serializers import OrderReadSerializer, OrderSerializer
+from .services import OrderService
+from .stats import UserOrderStatsService
+from .streams import OrderStatusBroker, broker
+from .sweeper import PendingOrderSweeper
+
+
+class OrderTestMixin:
+    """Shared fixtures for order tests."""
+
+    def make_user(self, name="Customer"):
+        return User.objects.create(name=name)
+
+    def make_products(self, count, price=Decimal('10.50'), stock=100):
+        return [
+            Products.objects.create(name=f"Product {i}", price=price + i, stock_quantity=stock)
+            for i in range(count)
+        ]
+
+    def cart(self, products, quantity=2):
+        return [{'product': product, 'quantity': quantity} for product in products]
+
+
+class BulkOrderCreationTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+
+    def test_query_count_is_constant_for_any_cart_size(self):
+        counts = []
+        for size in (1, 10, 50):
+            products = self.make_products(size)
+            with CaptureQueriesContext(connection) as ctx:
+                OrderService.create_order(self.user, self.cart(products))
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_totals_match_per_line_creation(self):
+        products = self.make_products(5)
+        bulk = OrderService.create_order(
+            self.user, self.cart(products, quantity=3), discount=Decimal('4.00'), shipping_cost=Decimal('7.25')
+        )
+
+        legacy = Order.objects.create(user=self.user, discount=Decimal('4.00'), shipping_cost=Decimal('7.25'))
+        for product in products:
+            OrderProduct.objects.create(order=legacy, product=product, quantity=3)
+        legacy.refresh_from_db()
+        bulk.refresh_from_db()
+
+        self.assertEqual(bulk.subtotal, legacy.subtotal)
+        self.assertEqual(bulk.total, legacy.total)
+        self.assertEqual(
+            sorted(bulk.order_products.values_list('product_id', 'quantity', 'price_at_purchase')),
+            sorted(legacy.order_products.values_list('product_id', 'quantity', 'price_at_purchase')),
+        )
+
+    def test_duplicate_product_is_rejected(self):
+        product, = self.make_products(1)
+        with self.assertRaises(ValidationError):
+            OrderService.create_order(self.user, self.cart([product, product]))
+        self.assertFalse(Order.objects.exists())
+
+    def test_insufficient_stock_is_rejected_before_writing(self):
+        product, = self.make_products(1, stock=1)
+        with self.assertRaises(ValidationError):
+            OrderService.create_order(self.user, self.cart([product], quantity=2))
+        self.assertFalse(Order.objects.exists())
+
+    def test_api_creates_order_with_lines(self):
+        products = self.make_products(3)
+        response = APIClient().post('/api/orders/', {
+            'user_id': self.user.pk,
+            'order_products': [{'product_id': p.pk, 'quantity': 1} for p in products],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['products']), 3)
+        self.assertEqual(Decimal(response.data['total']), sum(p.price for p in products))
+
+
+class IncrementalTotalsTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.first, self.second = self.make_products(2, price=Decimal('10.00'))
+        self.order = OrderService.create_order(
+            self.user, self.cart([self.first], quantity=2), shipping_cost=Decimal('5.00')
+        )
+
+    def assertTotals(self, subtotal, total):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.subtotal, Decimal(subtotal))
+        self.assertEqual(self.order.total, Decimal(total))
+
+    def test_adding_changing_and_removing_lines_apply_deltas(self):
+        line = OrderProduct.objects.create(order=self.order, product=self.second, quantity=1)  # +11.00
+        self.assertTotals('31.00', '36.00')
+
+        line.quantity = 3  # +22.00
+        line.save()
+        self.assertTotals('53.00', '58.00')
+
+        line.delete()  # -33.00
+        self.assertTotals('20.00', '25.00')
+
+    def test_line_change_does_not_rescan_order_lines(self):
+        line = self.order.order_products.get()
+        line.quantity = 5
+        with CaptureQueriesContext(connection) as ctx:
+            line.save()
+        products_table = Products._meta.db_table
+        self.assertFalse([q for q in ctx.captured_queries if f'JOIN "{products_table}"' in q['sql']])
+        self.assertTotals('50.00', '55.00')
+
+    def test_verify_command_reports_and_repairs_drift(self):
+        Order.objects.filter(pk=self.order.pk).update(subtotal=Decimal('1.00'), total=Decimal('6.00'))
+
+        out = StringIO()
+        call_command('verify_order_totals', stdout=out)
+        self.assertIn(f"Order #{self.order.pk}", out.getvalue())
+        self.assertTotals('1.00', '6.00')
+
+        call_command('verify_order_totals', '--fix', stdout=StringIO())
+        self.assertTotals('20.00', '25.00')
+
+        out = StringIO()
+        call_command('verify_order_totals', stdout=out)
+        self.assertIn("0 with drifted totals", out.getvalue())
+
+
+class DirtyFieldTrackingTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.product, = self.make_products(1, price=Decimal('10.00'))
+        self.order = Order.objects.get(
+            pk=OrderService.create_order(self.user, self.cart([self.product])).pk
+        )
+
+    def order_queries(self, ctx, verb):
+        table = Order._meta.db_table
+        return [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(verb) and f'"{table}"' in q['sql']]
+
+    def test_status_update_does_not_reselect_order(self):
+        with CaptureQueriesContext(connection) as ctx:
+            OrderService.update_order_status(self.order, Order.OrderStatus.CONFIRMED)
+        self.assertEqual(self.order_queries(ctx, 'SELECT'), [])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.CONFIRMED)
+
+    def test_save_writes_only_changed_fields(self):
+        self.order.discount = Decimal('2.00')
+        self.assertEqual(set(self.order.get_dirty_fields()), {'discount'})
+        with CaptureQueriesContext(connection) as ctx:
+            self.order.save()
+        update, = self.order_queries(ctx, 'UPDATE')
+        self.assertIn('"discount"', update)
+        self.assertIn('"total"', update)
+        self.assertNotIn('"status"', update)
+        self.assertEqual(self.order.get_dirty_fields(), {})
+
+    def test_unchanged_save_skips_write(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.order.save()
+        self.assertEqual(self.order_queries(ctx, 'UPDATE'), [])
+
+    def test_terminal_status_uses_loaded_original_status(self):
+        OrderService.update_order_status(self.order, Order.OrderStatus.DELIVERED)
+        self.assertIsNotNone(self.order.completed_at)
+        self.assertEqual(self.order.original_status, Order.OrderStatus.DELIVERED)
+        with self.assertRaises(ValidationError):
+            OrderService.update_order_status(self.order, Order.OrderStatus.PENDING)
+
+
+class StockReservationTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.first, self.second = self.make_products(2, stock=10)
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock_quantity
+
+    def test_checkout_reserves_stock(self):
+        OrderService.create_order(self.user, [
+            {'product': self.first, 'quantity': 3}, {'product': self.second, 'quantity': 10},
+        ])
+        self.assertEqual(self.stock(self.first), 7)
+        self.assertEqual(self.stock(self.second), 0)
+
+    def test_shortfall_reserves_nothing(self):
+        Products.objects.filter(pk=self.second.pk).update(stock_quantity=1)  # Stock sold after the cart was read
+        with self.assertRaises(InsufficientStockError):
+            OrderService.create_order(self.user, [
+                {'product': self.first, 'quantity': 3}, {'product': self.second, 'quantity': 2},
+            ])
+        self.assertEqual(self.stock(self.first), 10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_line_changes_adjust_reservation(self):
+        order = OrderService.create_order(self.user, self.cart([self.first], quantity=2))
+        line = order.order_products.get()
+        line.quantity = 5
+        line.save()
+        self.assertEqual(self.stock(self.first), 5)
+        line.delete()
+        self.assertEqual(self.stock(self.first), 10)
+
+    def test_cancel_and_return_release_stock_once(self):
+        cancelled = OrderService.create_order(self.user, self.cart([self.first], quantity=4))
+        returned = OrderService.create_order(self.user, self.cart([self.first], quantity=1))
+        self.assertEqual(self.stock(self.first), 5)
+
+        OrderService.update_order_status(cancelled, Order.OrderStatus.CANCELLED)
+        OrderService.update_order_status(returned, Order.OrderStatus.RETURNED)
+        self.assertEqual(self.stock(self.first), 10)
+
+        cancelled.save()  # Saving again must not release a second time
+        self.assertEqual(self.stock(self.first), 10)
+
+    def test_deleting_an_order_releases_its_stock(self):
+        pending = OrderService.create_order(self.user, [
+            {'product': self.first, 'quantity': 3}, {'product': self.second, 'quantity': 2},
+        ])
+        cancelled = OrderService.create_order(self.user, self.cart([self.first], quantity=4))
+        OrderService.update_order_status(cancelled, Order.OrderStatus.CANCELLED)
+        self.assertEqual((self.stock(self.first), self.stock(self.second)), (7, 8))
+
+        response = APIClient().delete(f'/api/orders/{pending.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual((self.stock(self.first), self.stock(self.second)), (10, 10))
+        cancelled.delete()  # Already gave its stock back
+        self.assertEqual(self.stock(self.first), 10)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class StockReservationConcurrencyTests(OrderTestMixin, TransactionTestCase):
+    """
+    Stress test: many threads check out the same products at once.
+    Stock must never go negative and every sold unit must belong to a committed order.
+
+    Checkouts queue on the product row locks, so this needs a backend with SELECT ... FOR UPDATE
+    (SQLite refuses concurrent writes outright instead).
+    """
+    THREADS = 16
+    ATTEMPTS_PER_THREAD = 5
+
+    def test_parallel_checkouts_never_oversell(self):
+        user = self.make_user()
+        first, second = self.make_products(2, stock=20)
+        barrier = threading.Barrier(self.THREADS)
+        committed, errors = [], []
+
+        def worker(index):
+            barrier.wait()  # Start every thread at the same moment
+            try:
+                for _ in range(self.ATTEMPTS_PER_THREAD):
+                    # Alternate line order so lock ordering is exercised
+                    lines = [{'product': first, 'quantity': 2}, {'product': second, 'quantity': 1}]
+                    try:
+                        OrderService.create_order(user, lines[::-1] if index % 2 else lines)
+                        committed.append(index)
+                    except (InsufficientStockError, ValidationError):
+                        pass  # Sold out
+                    except OperationalError as e:
+                        errors.append(e)  # Lock timeouts or deadlocks mean the locking is broken
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        orders = Order.objects.count()
+        self.assertEqual(errors, [])
+        self.assertGreaterEqual(first.stock_quantity, 0)
+        self.assertGreaterEqual(second.stock_quantity, 0)
+        self.assertEqual(20 - first.stock_quantity, 2 * orders)
+        self.assertEqual(20 - second.stock_quantity, orders)
+        self.assertEqual(len(committed), orders)
+        self.assertEqual(orders, 10)  # 80 checkouts sell exactly all of the stock
+
+
+class OrderListPaginationTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.alice, self.bob = self.make_user("Alice"), self.make_user("Bob")
+        product, = self.make_products(1, stock=1000)
+        self.orders = [
+            OrderService.create_order(self.alice if i % 2 else self.bob, self.cart([product], quantity=1))
+            for i in range(25)
+        ]
+        # Force timestamp ties so the id tiebreaker is exercised
+        Order.objects.filter(pk__in=[o.pk for o in self.orders[5:15]]).update(created_at=self.orders[5].created_at)
+        self.client = APIClient()
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [row['id'] for row in response.data['results']]
+            url, pages = response.data['next'], pages + 1
+        return ids, pages
+
+    def test_pages_cover_every_order_once_in_order(self):
+        ids, pages = self.walk('/api/orders/?page_size=4')
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 7)
+
+    def test_filters(self):
+        ids, _ = self.walk(f'/api/orders/?page_size=5&user_id={self.alice.pk}')
+        self.assertEqual(set(ids), {o.pk for o in self.orders if o.user_id == self.alice.pk})
+
+        OrderService.update_order_status(self.orders[0], Order.OrderStatus.CONFIRMED)
+        ids, _ = self.walk('/api/orders/?status=confirmed')
+        self.assertEqual(ids, [self.orders[0].pk])
+
+        self.assertEqual(self.client.get('/api/orders/?status=bogus').status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/?user_id=x').status_code, 400)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/orders/?cursor=not-a-cursor').status_code, 404)
+
+    def test_query_count_does_not_depend_on_depth(self):
+        first = self.client.get('/api/orders/?page_size=3')
+        deep_url = first.data['next']
+        for _ in range(5):
+            deep_url = self.client.get(deep_url).data['next']
+
+        with CaptureQueriesContext(connection) as shallow:
+            self.client.get('/api/orders/?page_size=3')
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(deep_url)
+        self.assertEqual(len(shallow.captured_queries), len(deep.captured_queries))
+        self.assertNotIn('OFFSET', deep.captured_queries[0]['sql'])
+
+
+class OrderExportTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        user = self.make_user()
+        products = self.make_products(3, stock=1000)
+        self.orders = [OrderService.create_order(user, self.cart(products[:1 + i % 3])) for i in range(7)]
+
+    def expected_rows(self):
+        queryset = Order.objects.order_by('pk').prefetch_related('order_products__product')
+        return json.loads(json.dumps(OrderSerializer(queryset, many=True).data))
+
+    def test_endpoint_streams_serialized_orders(self):
+        response = APIClient().get('/api/orders/export/?chunk_size=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual([json.loads(line) for line in body.splitlines()], self.expected_rows())
+
+    async def test_endpoint_streams_under_asgi(self):
+        with mock.patch('orders.exports.OrderSerializer', wraps=OrderSerializer) as serializer:
+            response = await self.async_client.get('/api/orders/export/?chunk_size=3')
+            self.assertTrue(response.is_async)
+            blocks = aiter(response.streaming_content)
+            first = await anext(blocks)
+            self.assertEqual(serializer.call_count, 1)  # Only the first chunk was read so far
+            rest = [block async for block in blocks]
+        self.assertEqual(serializer.call_count, 3)
+        body = b''.join([first, *rest]).decode()
+        self.assertEqual([json.loads(line) for line in body.splitlines()],
+                         await sync_to_async(self.expected_rows)())
+
+    def test_queries_grow_with_chunks_not_orders(self):
+        with CaptureQueriesContext(connection) as ctx:
+            blocks = list(iter_orders_ndjson(chunk_size=3))
+        self.assertEqual(len(blocks), 3)  # 7 orders in chunks of 3
+        self.assertEqual(len(ctx.captured_queries), 3 * 3 + 1)  # orders, lines, products per chunk + final probe
+
+    def test_command_writes_ndjson(self):
+        out = StringIO()
+        call_command('export_orders', '--chunk-size', '2', stdout=out)
+        self.assertEqual([json.loads(line) for line in out.getvalue().splitlines()], self.expected_rows())
+
+
+class OrderReadSerializerTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        products = self.make_products(3, price=Decimal('9.99'), stock=1000)
+        for i in range(4):
+            OrderService.create_order(
+                self.make_user(f"Customer {i}"), self.cart(products[:i + 1] if i < 3 else products[:1], quantity=i + 1),
+                discount=Decimal('1.5'), tax_amount=Decimal('0.25')
+            )
+        Order.objects.create(user=self.make_user("No lines"))  # Orders without lines render an empty list
+
+    def test_output_matches_order_serializer_byte_for_byte(self):
+        queryset = Order.objects.order_by('-created_at', '-id')
+        expected = JSONRenderer().render(
+            OrderSerializer(queryset.prefetch_related('order_products__product'), many=True).data
+        )
+        self.assertEqual(JSONRenderer().render(OrderReadSerializer(queryset).data), expected)
+
+    def test_uses_two_queries(self):
+        with self.assertNumQueries(2):
+            OrderReadSerializer(Order.objects.all()).data
+
+    def test_benchmark_command_runs(self):
+        out = StringIO()
+        call_command('benchmark_order_serializers', '--orders', '5', '--lines', '2', '--repeat', '1', stdout=out)
+        self.assertIn('µs/order', out.getvalue())
+        self.assertFalse(Order.objects.filter(user__name="Benchmark customer").exists())
+
+
+class OrderDetailCacheTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product, = self.make_products(1, price=Decimal('10.00'))
+        self.order = OrderService.create_order(self.make_user(), self.cart([self.product]))
+        self.url = f'/api/orders/{self.order.pk}/'
+        self.client = APIClient()
+
+    def get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_repeated_reads_are_served_from_cache(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get()['status'], Order.OrderStatus.PENDING)
+
+    def test_status_change_invalidates(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.update_order_status(self.order, Order.OrderStatus.CONFIRMED)
+        self.assertEqual(self.get()['status'], Order.OrderStatus.CONFIRMED)
+
+    def test_line_change_invalidates(self):
+        self.get()
+        line = self.order.order_products.get()
+        line.quantity = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            line.save()
+        self.assertEqual(self.get()['total'], '30.00')
+
+    def test_payment_finalization_invalidates(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            payment = Payment.objects.create(
+                order=self.order, gateway='razorpay', method='upi', amount=Decimal('20.00'), status='success'
+            )
+            PaymentService.finalize_payment(payment)
+        self.assertEqual(self.get()['status'], Order.OrderStatus.PAID)
+
+    def test_version_counters_expire(self):
+        with mock.patch('orders.cache.cache.add', wraps=cache.add) as add:
+            self.client.get('/api/orders/999999/')  # Probing unknown IDs must not leave permanent keys
+        timeout = add.call_args.args[2]
+        self.assertIsNotNone(timeout)
+        self.assertGreater(timeout, OrderDetailCache.timeout)
+
+    def test_stale_read_cannot_be_cached_after_invalidation(self):
+        data, version = OrderDetailCache.get(self.order.pk)  # Reader misses and loads the old state...
+        OrderDetailCache.invalidate(self.order.pk)  # ...a write commits...
+        OrderDetailCache.set(self.order.pk, version, {'stale': True})  # ...then the reader caches what it read
+        self.assertNotIn('stale', self.get())
+
+
+class IdempotencyKeyTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = self.make_user()
+        self.product, = self.make_products(1, stock=100)
+        self.client = APIClient()
+        self.payload = {'user_id': self.user.pk, 'order_products': [{'product_id': self.product.pk, 'quantity': 1}]}
+
+    def post(self, key, payload=None):
+        return self.client.post('/api/orders/', payload or self.payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response(self):
+        first = self.post('abc')
+        cache.clear()  # Replay must also work from the database alone
+        second = self.post('abc')
+        third = self.post('abc')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.data, json.loads(json.dumps(first.data)))
+        self.assertEqual(third['Idempotent-Replayed'], 'true')
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.client.post('/api/orders/', self.payload, format='json')
+        self.client.post('/api/orders/', self.payload, format='json')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_reusing_key_with_different_body_is_rejected(self):
+        self.post('abc')
+        other = dict(self.payload, order_products=[{'product_id': self.product.pk, 'quantity': 2}])
+        self.assertEqual(self.post('abc', other).status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_duplicate_waits_for_in_flight_request(self):
+        store = IdempotencyStore('orders.create', 'abc', hashlib.sha256(
+            json.dumps(self.payload, separators=(',', ':')).encode()
+        ).hexdigest())
+        self.assertEqual(store.claim(), (True, None))  # Another worker is running this key
+
+        def finish():
+            time.sleep(0.2)
+            store.publish({'request_hash': store.request_hash, 'status': 201, 'body': {'id': 42}})
+        worker = threading.Thread(target=finish)
+        worker.start()
+        response = self.post('abc')
+        worker.join()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'id': 42})
+        self.assertFalse(Order.objects.exists())  # The duplicate did not run the handler
+
+    def test_server_error_releases_key(self):
+        calls = []
+
+        @idempotent('tests.unavailable')
+        def handler(view, request):
+            calls.append(request)
+            return Response({'error': 'unavailable'}, status=503)
+
+        for _ in range(2):
+            request = APIRequestFactory().post('/', {}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+            self.assertEqual(handler(None, request).status_code, 503)
+        self.assertEqual(len(calls), 2)  # The retry ran again instead of replaying the error
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_database_errors_are_not_stored(self):
+        with mock.patch.object(OrderSerializer, 'save', side_effect=OperationalError("deadlock")):
+            with self.assertRaises(OperationalError):  # A 5xx, not a stored 400
+                self.post('abc')
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post('abc').status_code, 201)
+
+    def test_validation_errors_are_stored(self):
+        invalid = dict(self.payload, order_products=[])
+        self.assertEqual(self.post('abc', invalid).status_code, 400)
+        self.assertEqual(self.post('abc', invalid)['Idempotent-Replayed'], 'true')
+
+
+class BatchedProductResolutionTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.client = APIClient()
+
+    def payload(self, products):
+        return {'user_id': self.user.pk, 'order_products': [{'product_id': p.pk, 'quantity': 1} for p in products]}
+
+    def test_validation_resolves_all_products_in_one_query(self):
+        products = self.make_products(20)
+        serializer = OrderSerializer(data=self.payload(products))
+        with self.assertNumQueries(2):  # user + one in_bulk for every product
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        resolved = [item['product'] for item in serializer.validated_data['order_products']]
+        self.assertEqual([p.pk for p in resolved], [p.pk for p in products])
+
+    def test_missing_products_reported_together(self):
+        product, = self.make_products(1)
+        payload = self.payload([product])
+        payload['order_products'] += [{'product_id': 9998, 'quantity': 1}, {'product_id': 9999, 'quantity': 1}]
+        serializer = OrderSerializer(data=payload)
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(len(serializer.errors['order_products']['product_id']), 1)
+        self.assertIn('9998, 9999', serializer.errors['order_products']['product_id'][0])
+
+    def test_checkout_query_count_is_constant(self):
+        counts = []
+        for size in (1, 10, 30):
+            products = self.make_products(size)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post('/api/orders/', self.payload(products), format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+
+class SetBasedLineUpdateTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.products = self.make_products(40, price=Decimal('10.00'), stock=100)
+        self.order = OrderService.create_order(self.user, self.cart(self.products[:2], quantity=2))
+        self.client = APIClient()
+
+    def patch(self, lines, mode=None):
+        payload = {'order_products': lines}
+        if mode:
+            payload['order_products_mode'] = mode
+        return self.client.patch(f'/api/orders/{self.order.pk}/', payload, format='json')
+
+    def lines(self):
+        return dict(self.order.order_products.values_list('product_id', 'quantity'))
+
+    def test_add_increments_and_creates(self):
+        first, second, third = self.products[:3]
+        response = self.patch([{'product_id': first.pk, 'quantity': 1}, {'product_id': third.pk, 'quantity': 4}])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.lines(), {first.pk: 3, second.pk: 2, third.pk: 4})
+        self.assertEqual(response.data['subtotal'], '100.00')  # 3×10 + 2×11 + 4×12
+        self.assertEqual(len(response.data['products']), 3)
+
+    def test_set_replaces_lines(self):
+        first, second, third = self.products[:3]
+        response = self.patch([{'product_id': second.pk, 'quantity': 5}, {'product_id': third.pk, 'quantity': 1}], 'set')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.lines(), {second.pk: 5, third.pk: 1})
+        first.refresh_from_db()
+        self.assertEqual(first.stock_quantity, 100)  # Removed line released its stock
+
+    def test_remove_drops_or_decrements(self):
+        first, second = self.products[:2]
+        response = self.patch([{'product_id': first.pk}, {'product_id': second.pk, 'quantity': 1}], 'remove')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.lines(), {second.pk: 1})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.subtotal, Decimal('11.00'))
+
+    def test_unknown_mode_and_products_are_rejected(self):
+        self.assertEqual(self.patch([{'product_id': self.products[0].pk, 'quantity': 1}], 'merge').status_code, 400)
+        self.assertEqual(self.patch([{'product_id': 9999, 'quantity': 1}]).status_code, 400)
+        self.assertEqual(self.lines(), {self.products[0].pk: 2, self.products[1].pk: 2})
+
+    def test_query_count_is_constant(self):
+        counts = []
+        for size in (3, 10, 30):  # Every request updates and creates lines
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.patch([{'product_id': p.pk, 'quantity': 1} for p in self.products[:size]])
+            self.assertEqual(response.status_code, 200, response.data)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_products_are_loaded_once(self):
+        with mock.patch.object(Products.objects, 'in_bulk', wraps=Products.objects.in_bulk) as in_bulk:
+            response = self.patch([{'product_id': p.pk, 'quantity': 1} for p in self.products[:5]])
+        self.assertEqual(response.status_code, 200, response.data)
+        in_bulk.assert_called_once()  # The serializer's lookup is reused for the line update
+
+
+class BulkStatusUpdateTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.products = self.make_products(2, price=Decimal('10.00'), stock=100)
+        self.client = APIClient()
+
+    def make_orders(self, count):
+        return [OrderService.create_order(self.user, self.cart(self.products, quantity=1)) for _ in range(count)]
+
+    def test_cancel_releases_stock_and_sets_completed_at(self):
+        orders = self.make_orders(3)
+        results = OrderService.bulk_update_status([o.pk for o in orders], Order.OrderStatus.CANCELLED)
+        self.assertTrue(all(result['success'] for result in results))
+        for order in Order.objects.filter(pk__in=[o.pk for o in orders]):
+            self.assertEqual(order.status, Order.OrderStatus.CANCELLED)
+            self.assertIsNotNone(order.completed_at)
+        self.assertEqual([p.stock_quantity for p in Products.objects.order_by('pk')], [100, 100])
+
+    def test_same_rules_as_single_updates(self):
+        delivered, pending = self.make_orders(2)
+        OrderService.update_order_status(delivered, Order.OrderStatus.DELIVERED)
+        empty = Order.objects.create(user=self.user)
+        results = OrderService.bulk_update_status(
+            [delivered.pk, pending.pk, empty.pk, 9999, pending.pk], Order.OrderStatus.CANCELLED
+        )
+        self.assertEqual([r['id'] for r in results], [delivered.pk, pending.pk, empty.pk, 9999])
+        self.assertEqual([r['success'] for r in results], [False, True, False, False])
+        self.assertEqual(results[0]['error'], "Cannot change status from Delivered")
+        delivered.refresh_from_db()
+        self.assertEqual(delivered.status, Order.OrderStatus.DELIVERED)
+        self.assertEqual(Order.objects.get(pk=empty.pk).status, Order.OrderStatus.PENDING)
+        with self.assertRaises(ValidationError):
+            OrderService.bulk_update_status([pending.pk], 'shipped')
+
+    def test_query_count_is_constant(self):
+        counts = []
+        for size in (2, 20):
+            orders = self.make_orders(size)
+            with CaptureQueriesContext(connection) as ctx:
+                OrderService.bulk_update_status([o.pk for o in orders], Order.OrderStatus.CANCELLED)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1], counts)
+
+    def test_endpoint_reports_per_order_results_and_invalidates_cache(self):
+        first, second = self.make_orders(2)
+        OrderService.update_order_status(second, Order.OrderStatus.RETURNED)
+        self.assertEqual(self.client.get(f'/api/orders/{first.pk}/').data['status'], 'pending')  # Cached
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/orders/bulk-status/', {'order_ids': [first.pk, second.pk], 'status': 'delivered'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['updated'], response.data['failed']), (1, 1))
+        self.assertEqual(self.client.get(f'/api/orders/{first.pk}/').data['status'], 'delivered')
+
+    def test_endpoint_rejects_malformed_requests(self):
+        url = '/api/orders/bulk-status/'
+        self.assertEqual(self.client.post(url, {'order_ids': [1], 'status': 'shipped'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'order_ids': [], 'status': 'paid'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'order_ids': ['1'], 'status': 'paid'}, format='json').status_code, 400)
+
+
+class OrderArchiveTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.products = self.make_products(2, price=Decimal('10.00'), stock=100)
+        self.client = APIClient()
+
+    def make_completed_order(self, days_ago, status=Order.OrderStatus.DELIVERED):
+        order = OrderService.create_order(self.user, self.cart(self.products, quantity=1))
+        Payment.objects.create(order=order, gateway='razorpay', method='upi', amount=order.total, status='success')
+        OrderService.update_order_status(order, status)
+        Order.objects.filter(pk=order.pk).update(completed_at=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def test_old_terminal_orders_move_with_lines_and_payments(self):
+        old = self.make_completed_order(400)
+        recent = self.make_completed_order(5)
+        live = OrderService.create_order(self.user, self.cart(self.products, quantity=1))
+        stock = [p.stock_quantity for p in Products.objects.order_by('pk')]
+
+        self.assertEqual(OrderArchiveService.archive_batch(OrderArchiveService.cutoff(180)), 1)
+        self.assertEqual(set(Order.objects.values_list('pk', flat=True)), {recent.pk, live.pk})
+        archived = ArchivedOrder.objects.get(pk=old.pk)
+        self.assertEqual((archived.total, archived.status, archived.created_at), (old.total, old.status, old.created_at))
+        self.assertEqual(ArchivedOrderProduct.objects.filter(order=archived).count(), 2)
+        self.assertEqual(ArchivedPayment.objects.filter(order=archived).count(), 1)
+        self.assertFalse(OrderProduct.objects.filter(order_id=old.pk).exists())
+        self.assertFalse(Payment.objects.filter(order_id=old.pk).exists())
+        self.assertEqual([p.stock_quantity for p in Products.objects.order_by('pk')], stock)  # Moving is not returning
+
+    def test_detail_view_falls_back_to_the_archive(self):
+        order = self.make_completed_order(400, status=Order.OrderStatus.CANCELLED)
+        before = self.client.get(f'/api/orders/{order.pk}/').data
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderArchiveService.archive_batch(OrderArchiveService.cutoff(180))
+        response = self.client.get(f'/api/orders/{order.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(JSONRenderer().render(response.data), JSONRenderer().render(before))
+        self.assertEqual(self.client.get('/api/orders/9999/').status_code, 404)
+
+    def test_command_is_resumable(self):
+        orders = [self.make_completed_order(400) for _ in range(5)]
+        call_command('archive_orders', batch_size=2, max_batches=1, stdout=StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+        out = StringIO()
+        call_command('archive_orders', batch_size=2, stdout=out)
+        self.assertIn("Archived 3 orders in 2 batches", out.getvalue())
+        self.assertEqual(set(ArchivedOrder.objects.values_list('pk', flat=True)), {o.pk for o in orders})
+        self.assertFalse(Order.objects.exists())
+
+
+class PendingOrderSweeperTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.products = self.make_products(2, price=Decimal('10.00'), stock=100)
+
+    def make_order(self, minutes_ago, status=Order.OrderStatus.PENDING):
+        order = OrderService.create_order(self.user, self.cart(self.products, quantity=1), status=status)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return order
+
+    def test_cancels_only_stale_pending_orders(self):
+        stale = [self.make_order(120) for _ in range(5)]
+        fresh = self.make_order(5)
+        paid = self.make_order(120, status=Order.OrderStatus.PAID)
+        empty = Order.objects.create(user=self.user)
+        Order.objects.filter(pk=empty.pk).update(created_at=timezone.now() - timedelta(minutes=120))
+
+        sweeper = PendingOrderSweeper(ttl_minutes=60, batch_size=2)
+        self.assertEqual(sweeper.sweep(), 5)
+        self.assertEqual((sweeper.batches, sweeper.scanned, sweeper.skipped), (3, 6, 1))  # Empty order stepped over
+        self.assertEqual(
+            set(Order.objects.filter(status=Order.OrderStatus.CANCELLED).values_list('pk', flat=True)),
+            {o.pk for o in stale}
+        )
+        self.assertEqual(Order.objects.get(pk=fresh.pk).status, Order.OrderStatus.PENDING)
+        self.assertEqual(Order.objects.get(pk=paid.pk).status, Order.OrderStatus.PAID)
+        self.assertEqual([p.stock_quantity for p in Products.objects.order_by('pk')], [98, 98])  # Fresh + paid hold stock
+
+    def test_order_paid_after_selection_is_not_cancelled(self):
+        order = self.make_order(120)
+        Order.objects.filter(pk=order.pk).update(status=Order.OrderStatus.PAID)
+        results = OrderService.bulk_update_status(
+            [order.pk], Order.OrderStatus.CANCELLED, expected_status=Order.OrderStatus.PENDING
+        )
+        self.assertEqual(results, [{'id': order.pk, 'success': False, 'error': "Order is no longer pending confirmation"}])
+
+    def test_command_reports_throughput(self):
+        self.make_order(120)
+        out = StringIO()
+        call_command('sweep_pending_orders', ttl_minutes=60, stdout=out)
+        self.assertIn("Cancelled 1 of 1 stale orders", out.getvalue())
+        self.assertIn("orders/s", out.getvalue())
+
+
+class OptimisticConcurrencyTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.products = self.make_products(2, price=Decimal('10.00'), stock=100)
+        self.order = OrderService.create_order(self.user, self.cart(self.products, quantity=1))
+
+    def test_stale_copy_cannot_overwrite(self):
+        first, second = Order.objects.get(pk=self.order.pk), Order.objects.get(pk=self.order.pk)
+        first.status = Order.OrderStatus.CONFIRMED
+        first.save()
+        second.discount = Decimal('5.00')
+        with self.assertRaises(OrderConcurrencyError):
+            second.save()
+        self.assertEqual(second.version, 1)  # Nothing written, loaded version kept
+        stored = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((stored.status, stored.discount, stored.version), ('confirmed', Decimal('0.00'), 2))
+
+        second.refresh_from_db()  # Retry after reloading
+        second.discount = Decimal('5.00')
+        second.save()
+        self.assertEqual(Order.objects.get(pk=self.order.pk).version, 3)
+
+    def test_set_based_writes_bump_the_version(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        OrderService.update_order_lines(self.order, [{'product': self.products[0], 'quantity': 1}])
+        self.assertEqual(Order.objects.get(pk=self.order.pk).version, self.order.version)
+        stale.discount = Decimal('1.00')
+        with self.assertRaises(OrderConcurrencyError):
+            stale.save()  # Would have written a total computed from the old subtotal
+
+        OrderService.bulk_update_status([self.order.pk], Order.OrderStatus.CONFIRMED)
+        self.order.shipping_cost = Decimal('3.00')
+        with self.assertRaises(OrderConcurrencyError):
+            self.order.save()
+
+    def test_patch_conflict_returns_409(self):
+        original = OrderService.update_order_status
+
+        def concurrent_write_then_update(order, new_status):
+            Order.objects.filter(pk=order.pk).update(version=F('version') + 1)  # Another writer gets in first
+            return original(order, new_status)
+
+        with mock.patch.object(OrderService, 'update_order_status', side_effect=concurrent_write_then_update):
+            response = APIClient().patch(f'/api/orders/{self.order.pk}/', {'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.data['retryable'])
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.OrderStatus.PENDING)
+
+    def test_finalize_payment_adds_to_the_stored_paid_amount(self):
+        payment = Payment.objects.create(
+            order=self.order, gateway='razorpay', method='upi', amount=Decimal('5.00'), status='success'
+        )
+        payment.order  # Loaded copy goes stale below
+        Order.objects.filter(pk=self.order.pk).update(paid_amount=Decimal('10.00'), version=F('version') + 1)
+        order = PaymentService.finalize_payment(payment)  # Reads the current row, no conflict
+        self.assertEqual(order.paid_amount, Decimal('15.00'))
+        self.assertEqual(Order.objects.get(pk=self.order.pk).paid_amount, Decimal('15.00'))
+
+
+class OptimisticConcurrencyStressTests(OrderTestMixin, TransactionTestCase):
+    """
+    Harness: many threads read-modify-write the same order and retry on conflict.
+    Every successful write must be reflected in the final row (no lost updates).
+    """
+    THREADS = 8
+    WRITES_PER_THREAD = 5
+    MAX_ATTEMPTS = 50
+
+    def run_concurrently(self, worker):
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def run(index):
+            barrier.wait()  # Start every thread at the same moment
+            try:
+                results.append(worker(index))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_increments_are_never_lost(self):
+        user = self.make_user()
+        order = OrderService.create_order(user, self.cart(self.make_products(1), quantity=1))
+
+        def worker(index):
+            written = conflicts = refused = 0
+            for _ in range(self.WRITES_PER_THREAD):
+                for _ in range(self.MAX_ATTEMPTS):
+                    try:
+                        copy = Order.objects.get(pk=order.pk)
+                        copy.paid_amount += Decimal('1.00')
+                        copy.save()
+                        written += 1
+                        break
+                    except OrderConcurrencyError:
+                        conflicts += 1  # Lost the race: reload and retry
+                    except OperationalError:
+                        refused += 1  # The backend refused the concurrent write outright: retry
+                        time.sleep(0.001)
+            return written, conflicts, refused
+
+        results = self.run_concurrently(worker)
+        written = sum(w for w, _, _ in results)
+        stored = Order.objects.get(pk=order.pk)
+        # Retries absorb conflicts and refused writes, so every worker commits all of its writes
+        self.assertEqual(written, self.THREADS * self.WRITES_PER_THREAD,
+                         f"{sum(r for _, _, r in results)} refused writes")
+        self.assertEqual(stored.paid_amount, Decimal(written))
+        self.assertEqual(stored.version, 1 + written)
+
+
+class UserOrderHistoryTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.other = self.make_user("Other")
+        self.products = self.make_products(2, price=Decimal('10.00'), stock=100)
+        self.client = APIClient()
+
+    def pay(self, order, amount, status='success'):
+        payment = Payment.objects.create(order=order, gateway='razorpay', method='upi', amount=amount, status=status)
+        PaymentService.finalize_payment(payment)
+
+    def test_counters_follow_orders_and_successful_payments(self):
+        first = OrderService.create_order(self.user, self.cart(self.products, quantity=1))
+        second = OrderService.create_order(self.user, self.cart(self.products[:1], quantity=1))
+        OrderService.create_order(self.other, self.cart(self.products, quantity=1))
+        self.pay(first, Decimal('21.00'))
+        self.pay(second, Decimal('5.00'), status='failed')  # Not spend
+
+        stats = UserOrderStats.objects.get(user=self.user)
+        self.assertEqual((stats.order_count, stats.total_spent), (2, Decimal('21.00')))
+        self.assertEqual(stats.last_order_at, second.created_at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.update_order_status(first, Order.OrderStatus.DELIVERED)
+        Order.objects.filter(pk=first.pk).update(completed_at=timezone.now() - timedelta(days=400))
+        OrderArchiveService.archive_batch(OrderArchiveService.cutoff(180))
+        UserOrderStats.objects.all().delete()
+        call_command('rebuild_user_order_stats', stdout=StringIO())  # Archived orders still count
+        rebuilt = UserOrderStats.objects.get(user=self.user)
+        self.assertEqual((rebuilt.order_count, rebuilt.total_spent, rebuilt.last_order_at),
+                         (2, Decimal('21.00'), second.created_at))
+
+    def test_deleted_orders_are_taken_back_out_and_archived_ones_keep_counting(self):
+        first = OrderService.create_order(self.user, self.cart(self.products, quantity=1))
+        second = OrderService.create_order(self.user, self.cart(self.products[:1], quantity=1))
+        third = OrderService.create_order(self.user, self.cart(self.products[:1], quantity=1))
+        self.pay(first, Decimal('21.00'))
+        self.pay(third, Decimal('10.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.update_order_status(first, Order.OrderStatus.DELIVERED)
+        Order.objects.filter(pk=first.pk).update(completed_at=timezone.now() - timedelta(days=400))
+        OrderArchiveService.archive_batch(OrderArchiveService.cutoff(180))
+        self.assertEqual(self.client.delete(f'/api/orders/{third.pk}/').status_code, 204)
+
+        stats = UserOrderStats.objects.get(user=self.user)
+        self.assertEqual((stats.order_count, stats.total_spent, stats.last_order_at),
+                         (2, Decimal('21.00'), second.created_at))
+        UserOrderStatsService.rebuild([self.user.pk])
+        rebuilt = UserOrderStats.objects.get(user=self.user)
+        self.assertEqual((rebuilt.order_count, rebuilt.total_spent, rebuilt.last_order_at),
+                         (stats.order_count, stats.total_spent, stats.last_order_at))
+
+        Order.objects.get(pk=second.pk).delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.order_count, stats.last_order_at), (1, first.created_at))  # Archived one remains
+
+    def test_endpoint_pages_through_one_users_orders(self):
+        orders = [OrderService.create_order(self.user, self.cart(self.products, quantity=1)) for _ in range(5)]
+        OrderService.create_order(self.other, self.cart(self.products, quantity=1))
+
+        response = self.client.get(f'/api/orders/users/{self.user.pk}/?page_size=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user'], {'id': self.user.pk, 'username': self.user.name})
+        self.assertEqual(response.data['summary']['order_count'], 5)
+        self.assertEqual(response.data['summary']['total_spent'], '0.00')
+        ids = [row['id'] for row in response.data['results']]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(response.data['next'])
+        ids += [row['id'] for row in response.data['results']]
+        self.assertEqual(ids, [o.pk for o in reversed(orders)])
+        self.assertIsNone(response.data['next'])
+        self.assertLessEqual(len(ctx.captured_queries), 4)  # User, page, lines, stats
+
+    def test_endpoint_handles_new_and_unknown_users(self):
+        response = self.client.get(f'/api/orders/users/{self.other.pk}/')
+        self.assertEqual(response.data['summary'], {'order_count': 0, 'total_spent': '0.00', 'last_order_at': None})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(self.client.get('/api/orders/users/9999/').status_code, 404)
+
+
+class OrderStatusStreamTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = self.make_user()
+        self.products = self.make_products(1, price=Decimal('10.00'), stock=100)
+        self.order = OrderService.create_order(self.user, self.cart(self.products, quantity=1))
+
+    @staticmethod
+    def parse(chunk):
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        return dict(line.split(': ', 1) for line in chunk.strip().splitlines())
+
+    def test_committed_status_changes_are_published(self):
+        with mock.patch.object(broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                OrderService.update_order_status(self.order, Order.OrderStatus.PAID)
+            publish.assert_not_called()  # Nothing is pushed before the commit
+            for callback in callbacks:
+                callback()
+        publish.assert_called_once_with([
+            {'order_id': self.order.pk, 'status': Order.OrderStatus.PAID, 'old_status': Order.OrderStatus.PENDING}
+        ])
+
+    async def test_stream_sends_snapshot_then_changes_until_terminal(self):
+        response = await self.async_client.get(f'/api/orders/stream/?ids={self.order.pk}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 3000\n\n')
+        snapshot = self.parse(await anext(events))
+        self.assertEqual((snapshot['event'], json.loads(snapshot['data'])),
+                         ('status', {'order_id': self.order.pk, 'status': 'pending', 'old_status': None}))
+        self.assertEqual(broker.subscriber_count, 1)
+
+        broker.publish([{'order_id': self.order.pk, 'status': 'paid', 'old_status': 'pending'}])
+        event = self.parse(await anext(events))
+        self.assertEqual(json.loads(event['data']), {'order_id': self.order.pk, 'status': 'paid', 'old_status': 'pending'})
+        self.assertIn('id', event)  # Live events carry the sequence number
+
+        broker.publish([{'order_id': self.order.pk, 'status': 'cancelled', 'old_status': 'paid'}])
+        self.assertEqual(json.loads(self.parse(await anext(events))['data'])['status'], 'cancelled')
+        with self.assertRaises(StopAsyncIteration):  # Nothing left to watch
+            await anext(events)
+        self.assertEqual(broker.subscriber_count, 0)
+
+    async def test_idle_stream_sends_heartbeats_and_releases_subscription_on_disconnect(self):
+        with mock.patch('orders.views.OrderStatusStreamView.heartbeat_interval', 0.01):
+            response = await self.async_client.get(f'/api/orders/stream/?ids={self.order.pk}')
+            events = aiter(response.streaming_content)
+            await anext(events)
+            await anext(events)
+            self.assertEqual(await anext(events), b': keep-alive\n\n')
+
+        waiting = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0.05)
+        waiting.cancel()  # What the ASGI handler does when the client goes away
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(broker.subscriber_count, 0)
+
+    async def test_events_from_other_processes_arrive_once(self):
+        local = OrderStatusBroker(poll_interval=0.01)
+        subscription = local.subscribe([self.order.pk], since=1)
+        event = {'order_id': self.order.pk, 'status': 'paid', 'old_status': 'pending', 'seq': 2}
+        await cache.aset(local.event_key(self.order.pk), event)  # As stored by another process
+        try:
+            self.assertEqual(await subscription.get(1), event)
+            subscription.offer(event)  # Same event again, e.g. delivered locally and by the poller
+            self.assertIsNone(await subscription.get(0.05))
+        finally:
+            subscription.close()
+            await cache.adelete(local.event_key(self.order.pk))
+
+    def test_sequence_numbers_do_not_follow_the_clock(self):
+        local = OrderStatusBroker()
+        event = {'order_id': self.order.pk, 'status': 'paid', 'old_status': 'pending'}
+        with mock.patch.object(local, '_deliver') as deliver:
+            local.publish([event, event])
+            with mock.patch('orders.streams.time.time_ns', return_value=1):  # Clock stepped back
+                local.publish([event])
+        seqs = [call.args[0]['seq'] for call in deliver.call_args_list]
+        self.assertEqual(seqs, [seqs[0], seqs[0] + 1, seqs[0] + 2])
+        self.assertEqual(asyncio.run(local.current_seq()), seqs[-1])
+
+    async def test_terminal_orders_only_get_a_snapshot(self):
+        await Order.objects.filter(pk=self.order.pk).aupdate(status=Order.OrderStatus.CANCELLED)
+        response = await self.async_client.get(f'/api/orders/stream/?ids={self.order.pk},9999')
+        chunks = [chunk async for chunk in response.streaming_content]  # Ends right after the snapshot
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(json.loads(self.parse(chunks[1])['data'])['status'], 'cancelled')
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/orders/stream/?ids=9999').status_code, 404)
+        self.assertEqual(self.client.get('/api/orders/stream/?ids=a').status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/stream/').status_code, 400)
+        too_many = ','.join(map(str, range(1, 52)))
+        self.assertEqual(self.client.get(f'/api/orders/stream/?ids={too_many}').status_code, 400)
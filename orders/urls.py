@@ -1,9 +1,18 @@
 from django.urls import path
-from .views import OrderListCreateView, OrderDetailView
+from .views import OrderListCreateView, OrderDetailView, OrderExportView, OrderBulkStatusView, UserOrderHistoryView, \
+    OrderStatusStreamView
 
 urlpatterns = [
     # Order collection endpoints
     path('', OrderListCreateView.as_view(), name='order-list-create'),
+    # Streaming NDJSON export of all orders
+    path('export/', OrderExportView.as_view(), name='order-export'),
+    # Move many orders to one status
+    path('bulk-status/', OrderBulkStatusView.as_view(), name='order-bulk-status'),
+    # Server-Sent Events with status changes of `?ids=`
+    path('stream/', OrderStatusStreamView.as_view(), name='order-status-stream'),
+    # A customer's order history with lifetime summary
+    path('users/<int:user_id>/', UserOrderHistoryView.as_view(), name='user-order-history'),
     # Order detail endpoints
     path('<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
 ]
\ No newline at end of file
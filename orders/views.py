@@ -2,18 +2,37 @@ from rest_framework.exceptions import ValidationError  # Handles validation erro
 from rest_framework.views import APIView  # Base class for creating class-based views in Django REST Framework.
 from rest_framework.response import Response  # Used for creating HTTP responses with JSON data.
 from rest_framework import status  # Provides HTTP status codes like 200, 400, 404, etc.
-from django.http import Http404  # Exception class for raising "Not Found" errors.
+from django.core.exceptions import ValidationError as DjangoValidationError  # Model/service validation errors.
+from django.http import Http404, JsonResponse, StreamingHttpResponse  # 404 errors and incremental responses.
+from django.views import View  # Plain async view for the status stream (DRF views are sync only).
 from django.db import transaction  # Provides atomic transactions to ensure consistent database updates.
-from .models import Order  # Imports the Order model representing customer orders.
-from .serializers import OrderSerializer  # Imports the serializer for handling Order data.
+from .models import ArchivedOrder, Order  # Imports the live and archived order models.
+from .serializers import OrderSerializer, OrderReadSerializer, UserOrderStatsSerializer  # Order serializers.
 from .services import OrderService  # Imports service layer encapsulating business logic.
-from .exceptions import OrderValidationError  # Imports custom exception for validation-specific errors.
-from products.models import Products  # Imports the Products model for fetching product details.
+from .exceptions import OrderConcurrencyError, OrderValidationError  # Custom exceptions for conflicts and validation errors.
+from .pagination import KeysetPagination  # Cursor pagination that seeks by index instead of OFFSET.
+from .exports import DEFAULT_CHUNK_SIZE, aiter_orders_ndjson, iter_orders_ndjson  # Chunked NDJSON export of orders.
+from .cache import OrderDetailCache  # Versioned cache for order detail responses.
+from .archive import OrderArchiveService  # Read fallback for archived orders.
+from .stats import UserOrderStatsService  # Precomputed per-customer summaries.
+from .idempotency import idempotent  # Replays responses for retried requests with an Idempotency-Key.
+from . import streams  # Pub/sub and SSE encoding for live order status.
+from products.models import Products, User  # Imports the Products and User models.
+import asyncio  # Stream deadlines.
 import logging  # Used to log information, warnings, and errors for debugging.
 
 logger = logging.getLogger(__name__)  # Configures a logger instance for logging output in this module.
 
 
+class OrderCursorPagination(KeysetPagination):
+    """
+    Cursor pagination for order listings, newest first.
+    """
+    ordering = ('-created_at', '-id')  # Matches the created_at and (user, created_at) indexes
+    page_size = 20  # Default number of orders per page
+    max_page_size = 100  # Upper bound for `page_size`
+
+
 class OrderListCreateView(APIView):
     """
     Handles listing and creating orders with full CRUD functionality.
@@ -30,34 +49,235 @@ class OrderListCreateView(APIView):
 
     def get(self, request):
         """
-        Handles GET requests to retrieve a list of all orders.
-        - Fetches the optimized queryset.
-        - Serializes the queryset into JSON data.
-        - Returns the serialized data in an HTTP response.
+        Handles GET requests to retrieve a page of orders, newest first.
+        - Uses keyset pagination on (created_at, id), so every page is an index range scan
+          and response time does not grow with how deep the client pages.
+        - Optional filters: `user_id` (served by the (user, created_at) index) and `status`.
+        - Returns `{"next": <url or null>, "results": [...]}`; follow `next` for the following page.
         """
-        queryset = self.get_queryset()  # Fetch all orders with preloaded relationships.
-        serializer = OrderSerializer(queryset, many=True)  # Serialize multiple orders into JSON format.
-        return Response(serializer.data)  # Return serialized data with HTTP 200 status.
+        queryset = Order.objects.all()  # Rows are read with values(), so no prefetching is needed.
+
+        user_id = request.query_params.get('user_id')
+        if user_id is not None:
+            if not user_id.isdigit():
+                return Response({'error': 'user_id must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(user_id=int(user_id))
+
+        order_status = request.query_params.get('status')
+        if order_status is not None:
+            if order_status not in Order.OrderStatus.values:
+                return Response({'error': f'Invalid status: {order_status}'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(status=order_status)
+
+        paginator = OrderCursorPagination()
+        page = paginator.paginate_queryset(  # Only this page is loaded, as plain rows.
+            queryset.values(*OrderReadSerializer.order_values), request, view=self
+        )
+        data = OrderReadSerializer(page).data  # Fast read path, same output as OrderSerializer.
+        return paginator.get_paginated_response(data)  # Return the page with its `next` cursor.
 
+    @idempotent('orders.create')
     @transaction.atomic
     def post(self, request):
         """
         Handles POST requests to create a new order.
         - Wraps creation logic in an atomic transaction to prevent partial saves on failure.
+        - Honours the `Idempotency-Key` header: retries replay the first response instead of creating duplicates.
         """
         try:
             serializer = OrderSerializer(data=request.data)  # Deserialize request data for order creation.
             serializer.is_valid(raise_exception=True)  # Validate the input data and raise errors if invalid.
             order = serializer.save()  # Save the validated data into the database as a new Order object.
             logger.info(f"Order {order.id} created successfully")  # Log the success message.
+            order = self.get_queryset().get(pk=order.pk)  # Reload with lines and products prefetched for the response.
             return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)  # Return created order with HTTP 201.
-        except Exception as e:
+        except (ValidationError, DjangoValidationError, OrderValidationError) as e:
+            # Only invalid input is a 400; anything else (deadlocks, lock timeouts) surfaces as a 5xx, which
+            # releases the Idempotency-Key instead of storing a failure the client could never retry past.
             logger.error(f"Order creation failed: {str(e)}", exc_info=True)  # Log the error message and traceback.
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)  # Return error with HTTP 400.
 
 
 
 
+class UserOrderHistoryView(APIView):
+    """
+    A customer's orders, newest first, with their lifetime order summary.
+    """
+
+    def get(self, request, user_id):
+        """
+        Handles GET requests for one customer's order history.
+        - Orders are read with keyset pagination on the (user, created_at) index.
+        - `summary` comes from the customer's precomputed stats row (one primary key lookup),
+          not from aggregating their orders.
+        - Returns `{"user", "summary", "next", "results"}`; follow `next` for older orders.
+        """
+        user = User.objects.filter(pk=user_id).values('id', 'name').first()
+        if user is None:
+            raise Http404("User not found")  # Raise a 404 error if the customer does not exist.
+
+        paginator = OrderCursorPagination()
+        page = paginator.paginate_queryset(  # Only this page is loaded, as plain rows.
+            Order.objects.filter(user_id=user_id).values(*OrderReadSerializer.order_values), request, view=self
+        )
+        return Response({
+            'user': {'id': user['id'], 'username': user['name']},
+            'summary': UserOrderStatsSerializer(UserOrderStatsService.get_stats(user_id)).data,
+            'next': paginator.get_next_link(),  # None on the last page
+            'results': OrderReadSerializer(page).data  # Fast read path, same output as OrderSerializer.
+        })
+
+
+class OrderExportView(APIView):
+    """
+    Streams every order with its lines as newline-delimited JSON (one order per line).
+    Orders are loaded and serialized chunk by chunk, so memory stays flat however many orders exist.
+    """
+
+    def get(self, request):
+        """
+        Handles GET requests for the full order export.
+        - Optional `status` filter and `chunk_size` (orders per database round trip, max 5000).
+        """
+        queryset = Order.objects.all()
+
+        order_status = request.query_params.get('status')
+        if order_status is not None:
+            if order_status not in Order.OrderStatus.values:
+                return Response({'error': f'Invalid status: {order_status}'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(status=order_status)
+
+        try:
+            chunk_size = min(int(request.query_params.get('chunk_size', DEFAULT_CHUNK_SIZE)), 5000)
+        except ValueError:
+            return Response({'error': 'chunk_size must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        if chunk_size < 1:
+            return Response({'error': 'chunk_size must be positive.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Rows are produced lazily while the response is sent. ASGI servers need an async iterator to
+        # stream (a sync one is read completely first); WSGI servers iterate synchronously.
+        is_asgi = hasattr(request._request, 'scope')
+        response = StreamingHttpResponse(
+            (aiter_orders_ndjson if is_asgi else iter_orders_ndjson)(queryset, chunk_size),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = 'attachment; filename="orders.ndjson"'
+        return response
+
+
+class OrderBulkStatusView(APIView):
+    """
+    Moves many orders to the same status in one request.
+    """
+    max_orders = 10000  # Upper bound for `order_ids` per request
+
+    def post(self, request):
+        """
+        Handles POST requests with `{"order_ids": [...], "status": "<status>"}`.
+        - Same transition rules as PATCHing each order, applied with set-based updates.
+        - Always answers 200 with a per-order result; only a malformed request is a 400.
+        """
+        order_ids = request.data.get('order_ids')
+        new_status = request.data.get('status')
+        if new_status not in Order.OrderStatus.values:
+            return Response({'error': f'Invalid status: {new_status}'}, status=status.HTTP_400_BAD_REQUEST)
+        if (not isinstance(order_ids, list) or not order_ids or
+                not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in order_ids)):
+            return Response({'error': 'order_ids must be a non-empty list of integers.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(order_ids) > self.max_orders:
+            return Response({'error': f'At most {self.max_orders} orders can be updated per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = OrderService.bulk_update_status(order_ids, new_status)  # Chunked set-based updates.
+        updated = sum(result['success'] for result in results)
+        return Response({
+            'status': new_status,
+            'updated': updated,  # Orders now in `status` (including ones that already were)
+            'failed': len(results) - updated,
+            'results': results
+        })
+
+
+class OrderStatusStreamView(View):
+    """
+    Pushes status changes of one or more orders as Server-Sent Events, replacing detail polling.
+    Async, so under the ASGI server each idle connection is a suspended coroutine and a queue
+    rather than a worker thread; status changes arrive through `streams.broker`.
+    """
+    max_orders = 50  # Upper bound for `ids` per stream
+    heartbeat_interval = streams.HEARTBEAT_INTERVAL  # Keep-alive comment keeps proxies from closing idle streams
+    max_lifetime = streams.MAX_LIFETIME  # Streams end after this long and the client reconnects
+
+    async def get(self, request):
+        """
+        Handles GET requests for `?ids=1,2,3`.
+        - Sends the current status of every order found, then one `status` event per change.
+        - Ends once every watched order is in a terminal status, or after `max_lifetime`.
+        """
+        try:
+            order_ids = {int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip()}
+        except ValueError:
+            return JsonResponse({'error': 'ids must be a comma-separated list of integers.'}, status=400)
+        if not order_ids:
+            return JsonResponse({'error': 'ids is required.'}, status=400)
+        if len(order_ids) > self.max_orders:
+            return JsonResponse({'error': f'At most {self.max_orders} orders can be watched per stream.'},
+                                status=400)
+
+        since = await streams.broker.current_seq()  # Changes published after this are delivered, even before subscribing
+        snapshot = {
+            pk: order_status
+            async for pk, order_status in Order.objects.filter(pk__in=order_ids).values_list('pk', 'status')
+        }
+        missing = order_ids - snapshot.keys()
+        if missing:  # Archived orders are terminal, so they only ever get a snapshot
+            snapshot.update({
+                pk: order_status async for pk, order_status in
+                ArchivedOrder.objects.filter(pk__in=missing).values_list('pk', 'status')
+            })
+        if not snapshot:
+            return JsonResponse({'error': 'Order not found'}, status=404)
+
+        response = StreamingHttpResponse(self.stream(snapshot, since), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering events
+        return response
+
+    async def stream(self, snapshot, since):
+        """
+        The event stream; the subscription is released when the client disconnects or the stream ends.
+        """
+        watching = {pk for pk, order_status in snapshot.items() if order_status not in Order.TERMINAL_STATUSES}
+        subscription = streams.broker.subscribe(watching, since=since) if watching else None
+        try:
+            yield f"retry: {streams.RETRY_MS}\n\n"
+            for pk, order_status in snapshot.items():
+                yield streams.format_sse('status', {'order_id': pk, 'status': order_status, 'old_status': None})
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.max_lifetime
+            while watching:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                event = await subscription.get(min(self.heartbeat_interval, remaining))
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield streams.format_sse(
+                    'status',
+                    {'order_id': event['order_id'], 'status': event['status'], 'old_status': event['old_status']},
+                    event_id=event['seq']
+                )
+                if event['status'] in Order.TERMINAL_STATUSES:
+                    watching.discard(event['order_id'])
+        finally:
+            if subscription is not None:
+                subscription.close()
+
+
 class OrderDetailView(APIView):
     """
     Handles detailed operations for an order, including retrieval, update, and deletion.
@@ -79,9 +299,22 @@ class OrderDetailView(APIView):
     def get(self, request, pk):
         """
         Handles GET requests to retrieve the details of a specific order.
+        - Served from the cache when possible; save/delete signals on orders, lines and
+          payments invalidate the entry, so a cached order is never stale after a change.
+        - Orders moved to the archive are served from there with the same representation.
         """
-        order = self.get_object(pk)  # Fetch the order or raise a 404 if not found.
-        return Response(OrderSerializer(order).data)  # Serialize and return the order data in the response.
+        data, version = OrderDetailCache.get(pk)  # Version read before the database, see OrderDetailCache.
+        if data is None:
+            try:
+                order = self.get_object(pk)  # Fetch the live order.
+            except Http404:
+                try:
+                    order = OrderArchiveService.get_archived_order(pk)  # Old terminal orders live in the archive.
+                except ArchivedOrder.DoesNotExist:
+                    raise Http404("Order not found")  # Raise a 404 error if the order is in neither table.
+            data = OrderSerializer(order).data  # Serialize the order data.
+            OrderDetailCache.set(pk, version, data)  # Cache it for subsequent polls.
+        return Response(data)  # Return the order data in the response.
 
     @transaction.atomic
     def patch(self, request, pk):
@@ -89,24 +322,34 @@ class OrderDetailView(APIView):
         Handles PATCH requests to update specific fields of an order.
         - Allows partial updates.
         - Uses atomic transactions to ensure consistent updates.
+        - Answers 409 when the order was changed concurrently; the client should re-read and retry.
         """
         order = self.get_object(pk)  # Fetch the order or raise a 404 if not found.
         try:
             serializer = OrderSerializer(order, data=request.data, partial=True)  # Deserialize data for partial updates.
             serializer.is_valid(raise_exception=True)  # Validate the input data and raise errors if invalid.
 
-            self._process_order_updates(order, request.data)  # Handle updates for status, products, or other fields.
-            OrderService.calculate_order_totals(order)  # Recalculate totals for the updated order.
+            # Handle updates for status, products, or other fields.
+            self._process_order_updates(order, request.data, serializer.validated_data)
+            # Totals are kept current by the line deltas and the order save, no full recomputation needed.
 
+            order = self.get_object(pk)  # Reload so the response shows the lines as they are now.
             return Response(OrderSerializer(order).data)  # Serialize and return the updated order data.
+        except OrderConcurrencyError as e:
+            logger.info(f"Order update conflict: {str(e)}")  # Expected under contention, not an error.
+            transaction.set_rollback(True)  # Undo partial line and stock changes made before the conflict.
+            return Response({'error': str(e), 'retryable': True}, status=status.HTTP_409_CONFLICT)
         except OrderValidationError as e:
             logger.warning(f"Order validation failed: {str(e)}")  # Log validation error.
+            transaction.set_rollback(True)  # Undo partial line and stock changes made before the failure.
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)  # Return error with HTTP 400.
         except Products.DoesNotExist as e:
             logger.error(f"Invalid product ID: {str(e)}")  # Log invalid product error.
+            transaction.set_rollback(True)  # Undo partial line and stock changes made before the failure.
             return Response({'error': 'Invalid product ID'}, status=status.HTTP_400_BAD_REQUEST)  # Return error for invalid product.
         except Exception as e:
             logger.error(f"Order update failed: {str(e)}", exc_info=True)  # Log unexpected error.
+            transaction.set_rollback(True)  # Undo partial line and stock changes made before the failure.
             return Response({'error': f'Update failed: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)  # Return generic error response.
 
     def delete(self, request, pk):
@@ -123,10 +366,11 @@ class OrderDetailView(APIView):
 
 
     #Helper Methods ::::: ::::::Handles specific update logic for orders and products.
-    def _process_order_updates(self, order, update_data):
+    def _process_order_updates(self, order, update_data, validated_data):
         """
         Processes updates for the order atomically.
         Handles status updates, product updates, and direct field changes.
+        Product lines are taken from `validated_data` (the serializer's output) with their products resolved.
         """
         try:
             # Update order status
@@ -135,8 +379,10 @@ class OrderDetailView(APIView):
 
             # Update order products
             if 'order_products' in update_data:
-                self._handle_products_update(order, update_data[
-                    'order_products'])  # Delegate product updates to helper method.
+                self._handle_products_update(  # Delegate product updates to helper method.
+                    order, validated_data['order_products'],
+                    update_data.get('order_products_mode', OrderService.LINES_ADD)
+                )
 
             # Update other fields directly
             updatable_fields = ['discount', 'tax_amount', 'shipping_cost']  # Define which fields can be updated.
@@ -152,26 +398,24 @@ class OrderDetailView(APIView):
         except ValidationError as e:
             raise OrderValidationError(str(e))  # Raise validation error for invalid data.
 
-    def _handle_products_update(self, order, products_data):
+    def _handle_products_update(self, order, products_data, mode):
         """
-        Handles validation and updates for order products.
+        Handles validation and updates for order products as one set operation.
+        - `mode` is "add" (default: increase quantities), "set" (replace all lines) or
+          "remove" (decrease quantities, or drop the line when no quantity is given).
+        - `products_data` are the lines validated by `OrderSerializer`, whose products were all
+          fetched with a single query, so no further product lookups are needed.
         """
+        if mode not in OrderService.LINE_MODES:
+            raise OrderValidationError(f"order_products_mode must be one of: {', '.join(OrderService.LINE_MODES)}")
+
+        quantity_required = mode != OrderService.LINES_REMOVE
+        for product_data in products_data:  # Partial validation skips missing fields, so check them here
+            if 'product' not in product_data or (quantity_required and 'quantity' not in product_data):
+                raise OrderValidationError(
+                    "Product data requires both product_id and quantity")  # Validate required fields.
+
         try:
-            validated_products = []  # List to hold validated product data.
-            for product_data in products_data:
-                if 'product_id' not in product_data or 'quantity' not in product_data:
-                    raise OrderValidationError(
-                        "Product data requires both product_id and quantity")  # Validate required fields.
-
-                product = Products.objects.get(pk=product_data['product_id'])  # Fetch product by ID.
-                if product_data['quantity'] <= 0:
-                    raise OrderValidationError("Quantity must be positive")  # Validate quantity.
-
-                validated_products.append({
-                    'product': product,
-                    'quantity': product_data['quantity']
-                })  # Append validated product to the list.
-
-            OrderService.add_product_to_order(order, validated_products)  # Add/update products using service layer.
-        except Products.DoesNotExist:
-            raise OrderValidationError("One or more products do not exist")  # Raise error if a product doesn't exist.
+            OrderService.update_order_lines(order, products_data, mode)  # Apply the edits with bulk writes.
+        except DjangoValidationError as e:
+            raise OrderValidationError(' '.join(e.messages))
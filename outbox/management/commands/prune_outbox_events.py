@@ -0,0 +1,27 @@
+from datetime import timedelta  # Retention window
+
+from django.core.management.base import BaseCommand  # Base class for custom manage.py commands
+from django.utils import timezone  # Current time for the cutoff
+
+from outbox.services import OutboxRelay  # Batched pruning
+
+
+class Command(BaseCommand):
+    """
+    Deletes outbox events that were delivered more than --older-than-hours ago.
+    Pending events are never deleted.
+
+    Usage:
+        python manage.py prune_outbox_events [--older-than-hours 168] [--batch-size 1000]
+    """
+    help = "Delete delivered outbox events in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=float, default=7 * 24,
+                            help="Delete events delivered before this many hours ago")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows deleted per statement")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+        deleted = OutboxRelay.prune(cutoff, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} delivered outbox events"))
@@ -0,0 +1,41 @@
+import time  # Pause between polls
+
+from django.core.management.base import BaseCommand  # Base class for custom manage.py commands
+
+from outbox.services import OutboxRelay  # Batch delivery
+from outbox.sinks import get_sink  # Configured sink
+
+
+class Command(BaseCommand):
+    """
+    Delivers pending outbox events to the sink configured by OUTBOX_SINK.
+    Drains the outbox once by default; with --loop it keeps polling every --interval seconds.
+    Several relays can run at once on databases with SKIP LOCKED support.
+
+    Usage:
+        python manage.py relay_outbox [--batch-size 100] [--loop] [--interval 1]
+    """
+    help = "Deliver pending outbox events in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Events claimed per transaction")
+        parser.add_argument('--loop', action='store_true', help="Keep polling until interrupted")
+        parser.add_argument('--interval', type=float, default=1, help="Seconds to wait when the outbox is empty")
+
+    def handle(self, *args, **options):
+        relay = OutboxRelay(get_sink(), options['batch_size'])
+        delivered = failed = 0
+        try:
+            while True:
+                sent, errors = relay.relay_batch()
+                delivered += sent
+                failed += errors
+                if errors or not sent:  # Outbox drained, or the sink is failing and needs a break
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:  # Stopping the loop is the normal way to end it
+            self.stdout.write("Interrupted")
+
+        summary = f"Delivered {delivered} events, {failed} failed delivery attempts"
+        self.stdout.write(self.style.WARNING(summary) if failed else self.style.SUCCESS(summary))
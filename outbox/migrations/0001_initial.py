@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 23:34
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('aggregate_type', models.CharField(help_text='Kind of object the event is about', max_length=30)),
+                ('aggregate_id', models.CharField(help_text='ID of the object the event is about', max_length=64)),
+                ('event_type', models.CharField(help_text='What happened', max_length=50)),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Event data as sent to the sink')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the event was recorded')),
+                ('delivered_at', models.DateTimeField(blank=True, help_text='When the relay handed the event to the sink', null=True)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Failed delivery attempts so far')),
+                ('last_error', models.TextField(blank=True, default='', help_text='Error of the last failed delivery attempt')),
+            ],
+            options={
+                'verbose_name': 'Outbox Event',
+                'verbose_name_plural': 'Outbox Events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['delivered_at', 'id'], name='outbox_outb_deliver_b802b1_idx'), models.Index(fields=['aggregate_type', 'aggregate_id'], name='outbox_outb_aggrega_acea5e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.core.serializers.json import DjangoJSONEncoder  # Decimals, datetimes and UUIDs in payloads
+from django.db import models  # Django's ORM library for defining and managing database models
+
+
+class OutboxEvent(models.Model):
+    """
+    A domain event written in the same transaction as the change it describes.
+    The relay (`relay_outbox`) delivers pending events to the configured sink and marks them
+    delivered; delivered rows are pruned after a retention period.
+    Delivery is at least once: consumers should de-duplicate on `id`.
+    """
+    aggregate_type = models.CharField(
+        max_length=30,  # e.g. "order" or "payment"
+        help_text="Kind of object the event is about"
+    )
+    aggregate_id = models.CharField(
+        max_length=64,  # Order IDs and payment UUIDs
+        help_text="ID of the object the event is about"
+    )
+    event_type = models.CharField(
+        max_length=50,  # e.g. "order.created", "order.delivered", "payment.succeeded"
+        help_text="What happened"
+    )
+    payload = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,  # Amounts are stored as strings, timestamps as ISO 8601
+        help_text="Event data as sent to the sink"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,  # Time of the change
+        help_text="When the event was recorded"
+    )
+    delivered_at = models.DateTimeField(
+        null=True,  # Pending until the relay delivers it
+        blank=True,
+        help_text="When the relay handed the event to the sink"
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Failed delivery attempts so far"
+    )
+    last_error = models.TextField(
+        blank=True,
+        default='',
+        help_text="Error of the last failed delivery attempt"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delivered_at', 'id']),  # Relay: pending rows in order; pruning by age
+            models.Index(fields=['aggregate_type', 'aggregate_id']),  # History of one order or payment
+        ]
+        ordering = ['id']  # Delivery order
+        verbose_name = "Outbox Event"
+        verbose_name_plural = "Outbox Events"
+
+    def __str__(self):
+        return f"#{self.id} {self.event_type} {self.aggregate_type}:{self.aggregate_id}"
+
+    def to_message(self):
+        """
+        The representation handed to sinks.
+        """
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'aggregate_type': self.aggregate_type,
+            'aggregate_id': self.aggregate_id,
+            'created_at': self.created_at.isoformat(),
+            'payload': self.payload,
+        }
@@ -0,0 +1,104 @@
+import logging  # Delivery failures are logged, not raised
+
+from django.db import connection, transaction  # Same-transaction writes and row locking
+from django.utils import timezone  # Delivery timestamps and pruning cutoff
+
+from .models import OutboxEvent  # Outbox rows
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxService:
+    """
+    Records domain events in the outbox table.
+    Must be called inside the transaction that makes the change, so the event is committed
+    (or rolled back) together with it and never published for a change that did not happen.
+    """
+
+    @staticmethod
+    def publish(aggregate_type, aggregate_id, event_type, payload):
+        """
+        Records one event.
+        """
+        return OutboxEvent.objects.create(
+            aggregate_type=aggregate_type, aggregate_id=str(aggregate_id), event_type=event_type, payload=payload
+        )
+
+    @staticmethod
+    def publish_many(events):
+        """
+        Records many events with one INSERT.
+        Args:
+            events: iterable of (aggregate_type, aggregate_id, event_type, payload).
+        """
+        return OutboxEvent.objects.bulk_create([
+            OutboxEvent(aggregate_type=aggregate_type, aggregate_id=str(aggregate_id),
+                        event_type=event_type, payload=payload)
+            for aggregate_type, aggregate_id, event_type, payload in events
+        ])
+
+
+class OutboxRelay:
+    """
+    Moves pending outbox events to a sink in batches.
+
+    - A batch is claimed with `SELECT ... FOR UPDATE SKIP LOCKED` where the database supports it,
+      so several relays can run side by side without delivering the same rows; elsewhere the
+      plain row lock (or none, on SQLite) is used and a single relay should run.
+    - The rows stay locked while the sink is called and are marked delivered in the same
+      transaction, so a crash before the commit just redelivers the batch (at least once).
+    - A failing sink leaves the batch pending with its attempt count and error recorded.
+    """
+
+    def __init__(self, sink, batch_size=100):
+        self.sink = sink  # BaseEventSink instance
+        self.batch_size = batch_size  # Events claimed per transaction
+
+    def relay_batch(self):
+        """
+        Delivers up to `batch_size` pending events.
+        Returns:
+            (delivered, failed) event counts for this batch.
+        """
+        with transaction.atomic():
+            events = list(self.pending()[:self.batch_size])
+            if not events:
+                return 0, 0
+
+            ids = [event.id for event in events]
+            try:
+                self.sink.deliver([event.to_message() for event in events])
+            except Exception as e:
+                logger.warning(f"Outbox delivery of {len(ids)} events failed: {e}")
+                for event in events:
+                    event.attempts += 1
+                    event.last_error = str(e)
+                OutboxEvent.objects.bulk_update(events, ['attempts', 'last_error'])
+                return 0, len(ids)
+
+            OutboxEvent.objects.filter(id__in=ids).update(delivered_at=timezone.now())
+            return len(ids), 0
+
+    def pending(self):
+        """
+        Pending events in delivery order, locked for this transaction.
+        """
+        queryset = OutboxEvent.objects.filter(delivered_at__isnull=True).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            return queryset.select_for_update(skip_locked=True)  # Other relays skip rows claimed here
+        return queryset.select_for_update()
+
+    @staticmethod
+    def prune(older_than, batch_size=1000):
+        """
+        Deletes events delivered before `older_than`, in batches.
+        Returns:
+            The number of rows deleted.
+        """
+        deleted = 0
+        while True:
+            ids = list(OutboxEvent.objects.filter(delivered_at__lt=older_than)
+                       .values_list('id', flat=True)[:batch_size])  # Uses the (delivered_at, id) index
+            if not ids:
+                return deleted
+            deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,18 @@
+from django.dispatch import receiver  # Signal receiver decorator
+
+from orders.events import orders_status_changed  # Order status transitions (model saves and bulk updates)
+from .services import OutboxService  # Same-transaction event rows
+
+
+@receiver(orders_status_changed)
+def record_order_status_events(sender, changes, **kwargs):
+    # New orders are published by OrderService.create_order with their lines; transitions are recorded here
+    OutboxService.publish_many([
+        ('order', order_id, f'order.{new_status}', {
+            'order_id': order_id,
+            'old_status': old_status,
+            'new_status': new_status,
+        })
+        for order_id, created_at, old_status, new_status in changes
+        if old_status is not None
+    ])
@@ -0,0 +1,52 @@
+import json  # NDJSON encoding for the file sink
+import os  # fsync for durable file delivery
+import threading  # Guards the in-memory sink
+
+from abc import ABC, abstractmethod  # Base class for sink interface
+from django.conf import settings  # Sink configuration
+from django.utils.module_loading import import_string  # Sink class from a dotted path
+
+
+class BaseEventSink(ABC):
+    @abstractmethod
+    def deliver(self, messages): pass  # Hand over a batch of event dicts; raise to have the batch retried
+
+
+class FileEventSink(BaseEventSink):
+    """
+    Appends events to a local file as newline-delimited JSON (one event per line).
+    """
+
+    def __init__(self, path='outbox_events.ndjson', fsync=True):
+        self.path = path  # Target file, created on first delivery
+        self.fsync = fsync  # Flush to disk before the batch counts as delivered
+
+    def deliver(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(''.join(json.dumps(message, separators=(',', ':')) + '\n' for message in messages))
+            handle.flush()
+            if self.fsync:
+                os.fsync(handle.fileno())
+
+
+class InMemoryEventSink(BaseEventSink):
+    """
+    Keeps delivered events in memory, for tests and local development.
+    """
+
+    def __init__(self):
+        self.messages = []  # Every delivered event, in delivery order
+        self._lock = threading.Lock()
+
+    def deliver(self, messages):
+        with self._lock:
+            self.messages.extend(messages)
+
+
+def get_sink():
+    """
+    Builds the sink configured by `OUTBOX_SINK` (dotted class path) and `OUTBOX_SINK_OPTIONS` (kwargs).
+    Defaults to a `FileEventSink` writing `outbox_events.ndjson` in the working directory.
+    """
+    sink_class = import_string(getattr(settings, 'OUTBOX_SINK', 'outbox.sinks.FileEventSink'))
+    return sink_class(**getattr(settings, 'OUTBOX_SINK_OPTIONS', {}))
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from orders.models import Order
+from orders.services import OrderService
+from payments.models import Payment
+from payments.services import PaymentService
+from products.models import Products, User
+from .models import OutboxEvent
+from .services import OutboxRelay
+from .sinks import BaseEventSink, InMemoryEventSink
+
+
+class FailingSink(BaseEventSink):
+
+    def deliver(self, messages):
+        raise ConnectionError("warehouse unavailable")
+
+
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(name="Customer")
+        self.product = Products.objects.create(name="Product", price=Decimal('10.00'), stock_quantity=100)
+
+    def checkout(self):
+        return OrderService.create_order(self.user, [{'product': self.product, 'quantity': 2}])
+
+    def event_types(self):
+        return list(OutboxEvent.objects.values_list('event_type', flat=True))
+
+    def test_order_and_payment_changes_record_events(self):
+        order = self.checkout()
+        payment = Payment.objects.create(order=order, gateway='razorpay', method='upi',
+                                         amount=Decimal('20.00'), status='success')
+        PaymentService.finalize_payment(payment)
+        OrderService.update_order_status(Order.objects.get(pk=order.pk), Order.OrderStatus.DELIVERED)
+        OrderService.bulk_update_status([self.checkout().pk], Order.OrderStatus.CANCELLED)
+
+        self.assertEqual(self.event_types(), [
+            'order.created', 'order.paid', 'payment.succeeded', 'order.delivered', 'order.created', 'order.cancelled'
+        ])
+        created = OutboxEvent.objects.first()
+        self.assertEqual((created.aggregate_type, created.aggregate_id), ('order', str(order.pk)))
+        self.assertEqual(created.payload['total'], '20.00')
+        self.assertEqual(created.payload['lines'], [
+            {'product_id': self.product.pk, 'quantity': 2, 'price_at_purchase': '10.00'}
+        ])
+
+    def test_rolled_back_changes_record_nothing(self):
+        with transaction.atomic():
+            self.checkout()
+            transaction.set_rollback(True)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_relay_delivers_in_batches_and_marks_rows(self):
+        for _ in range(5):
+            self.checkout()
+        sink = InMemoryEventSink()
+        relay = OutboxRelay(sink, batch_size=2)
+        self.assertEqual([relay.relay_batch() for _ in range(4)], [(2, 0), (2, 0), (1, 0), (0, 0)])
+        self.assertEqual([m['id'] for m in sink.messages], list(OutboxEvent.objects.values_list('id', flat=True)))
+        self.assertFalse(OutboxEvent.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_failed_delivery_stays_pending(self):
+        self.checkout()
+        self.assertEqual(OutboxRelay(FailingSink()).relay_batch(), (0, 1))
+        event = OutboxEvent.objects.get()
+        self.assertIsNone(event.delivered_at)
+        self.assertEqual((event.attempts, event.last_error), (1, "warehouse unavailable"))
+        self.assertEqual(OutboxRelay(InMemoryEventSink()).relay_batch(), (1, 0))
+
+    def test_prune_removes_only_old_delivered_rows(self):
+        for _ in range(3):
+            self.checkout()
+        old, recent, pending = OutboxEvent.objects.all()
+        OutboxEvent.objects.filter(pk=old.pk).update(delivered_at=timezone.now() - timedelta(days=30))
+        OutboxEvent.objects.filter(pk=recent.pk).update(delivered_at=timezone.now())
+        call_command('prune_outbox_events', stdout=StringIO())
+        self.assertEqual(set(OutboxEvent.objects.values_list('pk', flat=True)), {recent.pk, pending.pk})
+
+    def test_relay_command_writes_ndjson_file(self):
+        self.checkout()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.ndjson')
+            with override_settings(OUTBOX_SINK='outbox.sinks.FileEventSink', OUTBOX_SINK_OPTIONS={'path': path}):
+                call_command('relay_outbox', stdout=StringIO())
+            with open(path) as handle:
+                lines = [json.loads(line) for line in handle]
+        self.assertEqual([line['type'] for line in lines], ['order.created'])
+        self.assertIsNotNone(OutboxEvent.objects.get().delivered_at)
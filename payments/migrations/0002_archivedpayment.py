@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 23:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_archivedorder'),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('gateway', models.CharField(max_length=50)),
+                ('method', models.CharField(choices=[('wallet', 'Wallet'), ('upi', 'UPI'), ('card', 'Credit/Debit Card')], max_length=20)),
+                ('transaction_id', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(default='INR', max_length=3)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('failed', 'Failed')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('raw_response', models.JSONField(default=dict)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='orders.archivedorder')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
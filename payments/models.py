@@ -1,7 +1,7 @@
 import uuid  # For generating unique unique identifiers for each payment
 from django.db import models  # Django ORM models base
 from django.core.validators import MinValueValidator  # Ensures positive amounts
-from orders.models import Order  # Import related Order model
+from orders.models import ArchivedOrder, Order  # Import related Order models
 
 class Payment(models.Model):  # Main Payment model
     PAYMENT_STATUS = [  # Choices for payment state
@@ -86,4 +86,39 @@ class Payment(models.Model):  # Main Payment model
     @property
     def is_success(self):
         # Convenience property to check if payment succeeded
-        return self.status == 'success'
\ No newline at end of file
+        return self.status == 'success'
+
+
+class ArchivedPayment(models.Model):  # Cold copy of a payment whose order was archived
+    id = models.UUIDField(
+        primary_key=True,         # Same UUID the payment had while it was live
+        editable=False
+    )
+    order = models.ForeignKey(
+        ArchivedOrder,            # Payments follow their order into the archive
+        on_delete=models.CASCADE,
+        related_name='payments'   # Same accessor as live orders
+    )
+    gateway = models.CharField(max_length=50)
+    method = models.CharField(max_length=20, choices=Payment.PAYMENT_METHODS)
+    transaction_id = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        db_index=True             # Still looked up by gateway reference, uniqueness was enforced while live
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default="INR")
+    status = models.CharField(max_length=20, choices=Payment.PAYMENT_STATUS)
+    created_at = models.DateTimeField()   # Original timestamps, not reset on archiving
+    updated_at = models.DateTimeField()
+    raw_response = models.JSONField(default=dict)
+    archived_at = models.DateTimeField(
+        auto_now_add=True         # When the payment was moved out of the hot table
+    )
+
+    class Meta:
+        ordering = ['-created_at']  # Same default ordering as live payments
+
+    def __str__(self):
+        return f"Archived {self.get_status_display().lower()} payment {self.transaction_id or self.id}"
@@ -1,5 +1,11 @@
 from abc import ABC, abstractmethod  # Base class for gateway interface
 
+
+class PaymentGatewayError(Exception):
+    """Raised when the gateway could not be reached or failed; the request can be retried later"""
+    pass
+
+
 class BasePaymentGateway(ABC):
     @abstractmethod
     def create_payment_order(self, amount, currency, payment_id): pass  # Create order in gateway
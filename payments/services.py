@@ -1,7 +1,10 @@
 import logging  # Logging for debugging & tracing issues
 from django.conf import settings  # Access project-wide settings
 from django.db import transaction  # Ensure atomic operations
+from django.db.models import F  # Payments are added to the stored paid amount
 from orders.models import Order  # Import Order model for lookups
+from orders.stats import UserOrderStatsService  # Customer lifetime spend
+from outbox.services import OutboxService  # Domain events for downstream systems
 from .models import Payment  # Import Payment model
 from .paymentGateway.razorpay import RazorpayGateway  # Import specific gateway class
 
@@ -13,7 +16,6 @@ class PaymentService:
     """
     Service layer handling payment initialization and finalization logic.
     """
-
     @staticmethod
     def initiate_payment(order_id, amount, method):
         """
@@ -57,18 +59,40 @@ class PaymentService:
         Finalizes a payment and updates the linked order.
 
         - Ensures atomic transaction to prevent race conditions.
-        - Adjusts the paid amount for the order.
-        - Updates order status ('paid' if fully settled, else 'partial').
+        - Locks the order row, so concurrent finalizations of the same order queue up instead of
+          conflicting, and reads its current state even inside an outer transaction's snapshot.
+        - For successful payments only:
+          - Adds the amount in the database (`paid_amount = paid_amount + amount`), never on top of
+            a value read earlier.
+          - Updates order status ('paid' if fully settled, else 'partial').
+          - Adds the amount to the customer's lifetime spend.
+        - Records a `payment.succeeded` / `payment.failed` outbox event in the same transaction.
+
+        Callers must make sure a payment is finalized only once (see `PaymentCallbackView`, which
+        locks the payment row and re-checks its status first).
 
         Returns the updated order instance.
         """
-        order = payment.order
-
         with transaction.atomic():  # Ensure consistency in payment updates
-            order.paid_amount += payment.amount  # Increase paid amount
-            order.status = 'paid' if order.paid_amount >= order.total else 'partial'
-            order.save()  # Persist updates in the database
-
+            order = payment.order
+            order.refresh_from_db(from_queryset=Order.objects.select_for_update())  # Current row, held until commit
+            if payment.is_success:  # Failed payments leave the order as it is
+                order.status = 'paid' if order.paid_amount + payment.amount >= order.total else 'partial'
+                order.paid_amount = F('paid_amount') + payment.amount  # Increase paid amount
+                order.save()  # Persist updates in the database (the lock rules out version conflicts)
+                order.refresh_from_db(fields=['paid_amount'])  # Resolve the expression for the caller and the event
+                UserOrderStatsService.record_payment(order.user_id, payment.amount)
+            event_type = 'payment.succeeded' if payment.is_success else 'payment.failed'
+            OutboxService.publish('payment', payment.id, event_type, {
+                'payment_id': payment.id,
+                'order_id': order.pk,
+                'amount': payment.amount,
+                'currency': payment.currency,
+                'method': payment.method,
+                'transaction_id': payment.transaction_id,
+                'order_status': order.status,
+                'order_paid_amount': order.paid_amount,
+            })
         return order  # Return updated order instance
 
     @staticmethod
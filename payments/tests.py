@@ -1,3 +1,110 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from orders.models import Order, UserOrderStats
+from orders.services import OrderService
+from outbox.models import OutboxEvent
+from products.models import Products, User
+from .models import Payment
+
+
+class CreatePaymentIdempotencyTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        product = Products.objects.create(name="Phone", price=Decimal('100.00'), stock_quantity=5)
+        self.order = OrderService.create_order(User.objects.create(name="Customer"), [{'product': product, 'quantity': 1}])
+        self.gateway = mock.Mock()
+        self.gateway.create_payment_order.side_effect = lambda **kwargs: {
+            'id': f"plink_{kwargs['payment_id']}", 'short_url': 'https://rzp.io/x'
+        }
+
+    def test_retry_does_not_create_second_payment_link(self):
+        payload = {'order': self.order.pk, 'gateway': 'razorpay', 'method': 'upi', 'amount': '100.00'}
+        with mock.patch('payments.views.PaymentService.get_gateway', return_value=self.gateway):
+            first = APIClient().post('/api/payments/create/', payload, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+            second = APIClient().post('/api/payments/create/', payload, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+
+        self.assertEqual(first.status_code, 201, first.data)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.data['payment_id'], first.data['payment_id'])
+        self.assertEqual(Payment.objects.count(), 1)
+        self.gateway.create_payment_order.assert_called_once()
+
+    def test_gateway_failure_is_not_replayed(self):
+        payload = {'order': self.order.pk, 'gateway': 'razorpay', 'method': 'upi', 'amount': '100.00'}
+        create, calls = self.gateway.create_payment_order.side_effect, []
+
+        def down_once(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise ConnectionError("gateway down")
+            return create(**kwargs)
+        self.gateway.create_payment_order.side_effect = down_once
+        with mock.patch('payments.views.PaymentService.get_gateway', return_value=self.gateway):
+            first = APIClient().post('/api/payments/create/', payload, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+            second = APIClient().post('/api/payments/create/', payload, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+
+        self.assertEqual(first.status_code, 502)
+        self.assertEqual(second.status_code, 201, second.data)  # The retry ran instead of replaying the outage
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_invalid_request_is_stored_and_replayed(self):
+        payload = {'order': self.order.pk, 'gateway': 'razorpay', 'method': 'upi', 'amount': 'abc'}
+        with mock.patch('payments.views.PaymentService.get_gateway', return_value=self.gateway):
+            first = APIClient().post('/api/payments/create/', payload, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+            second = APIClient().post('/api/payments/create/', payload, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+
+        self.assertEqual(first.status_code, 400)
+        self.assertIn('amount', first.data)
+        self.assertEqual((second.status_code, second.data), (400, first.data))
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Payment.objects.count(), 0)
+
+
+class PaymentCallbackTests(TestCase):
+
+    def setUp(self):
+        product = Products.objects.create(name="Phone", price=Decimal('100.00'), stock_quantity=5)
+        self.user = User.objects.create(name="Customer")
+        self.order = OrderService.create_order(self.user, [{'product': product, 'quantity': 1}])
+        self.payment = Payment.objects.create(order=self.order, gateway='razorpay', method='upi',
+                                              amount=self.order.total, transaction_id='pay_1')
+        self.gateway = mock.Mock()
+        self.gateway.verify_payment.return_value = True
+        self.gateway.client.payment.fetch.return_value = {'status': 'captured'}
+
+    def callback(self):
+        with mock.patch('payments.views.PaymentService.get_gateway', return_value=self.gateway):
+            return APIClient().post('/api/payments/callback/', {
+                'razorpay_payment_id': 'pay_1', 'razorpay_order_id': 'order_1', 'razorpay_signature': 'sig'
+            }, format='json')
+
+    def test_duplicate_delivery_credits_the_payment_once(self):
+        self.assertEqual(self.callback().data, {'status': 'success'})
+        stale = Payment.objects.get(pk=self.payment.pk)
+        stale.status = 'pending'  # A concurrent delivery passed the early check before the first committed
+        with mock.patch('payments.views.Payment.objects.get', return_value=stale):
+            self.assertEqual(self.callback().data, {'status': 'already processed'})
+
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.status, order.paid_amount), ('paid', self.order.total))
+        self.assertEqual(UserOrderStats.objects.get(user=self.user).total_spent, self.order.total)
+        self.assertEqual(OutboxEvent.objects.filter(event_type='payment.succeeded').count(), 1)
+
+    def test_duplicate_failed_delivery_is_processed_once_and_credits_nothing(self):
+        self.gateway.client.payment.fetch.return_value = {'status': 'failed'}
+        self.assertEqual(self.callback().data, {'status': 'failed'})
+        self.assertEqual(self.callback().data, {'status': 'already processed'})
+        stale = Payment.objects.get(pk=self.payment.pk)
+        stale.status = 'pending'  # A concurrent delivery passed the early check before the first committed
+        with mock.patch('payments.views.Payment.objects.get', return_value=stale):
+            self.assertEqual(self.callback().data, {'status': 'already processed'})
 
-# Create your tests here.
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.status, order.paid_amount), (self.order.status, Decimal('0.00')))
+        self.assertEqual(OutboxEvent.objects.filter(event_type='payment.failed').count(), 1)
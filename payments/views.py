@@ -12,6 +12,10 @@ from .models import Payment                     # Payment model
 
 # ✅ Import service layer responsible for handling payment interactions
 from .services import PaymentService            # Service layer for payments
+from .paymentGateway.base import PaymentGatewayError  # Gateway outages (retryable)
+
+# ✅ Import idempotency support so client retries do not create duplicate payment links
+from orders.idempotency import idempotent      # Idempotency-Key handling
 
 # ✅ Import logging for debugging and tracing API activity
 import logging                                   # Logging for debugging & tracing
@@ -19,6 +23,7 @@ import logging                                   # Logging for debugging & traci
 logger = logging.getLogger(__name__)  # Configure module-level logger
 
 class CreatePaymentView(APIView):  # API endpoint to initiate payments
+    @idempotent('payments.create')  # ✅ Retries with the same Idempotency-Key reuse the first payment link
     def post(self, request):
         """
         Handles payment creation:
@@ -31,7 +36,8 @@ class CreatePaymentView(APIView):  # API endpoint to initiate payments
         data = request.data  # Extract webhook payload
         logger.info(f"Webhook received: {data}")  # ✅ Print for debugging
         serializer = PaymentSerializer(data=request.data)  # Deserialize input data
-        serializer.is_valid(raise_exception=True)  # Validate or return 400 response
+        if not serializer.is_valid():  # Returned, not raised, so the 400 is stored for the Idempotency-Key
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             with transaction.atomic():  # Ensure atomic DB and gateway operations
@@ -48,7 +54,7 @@ class CreatePaymentView(APIView):  # API endpoint to initiate payments
                     logger.info(f"Razorpay Response at Payment Creation: {gateway_order}")
                 except Exception as e:
                     logger.error(f"Payment gateway error: {str(e)}")  # Log gateway failure
-                    raise ValueError("Payment gateway error. Please try again later.")
+                    raise PaymentGatewayError("Payment gateway error. Please try again later.") from e
 
                 # ✅ Store Razorpay's response in the database
                 payment.transaction_id = gateway_order.get('id')
@@ -68,6 +74,9 @@ class CreatePaymentView(APIView):  # API endpoint to initiate payments
             logger.error("Database integrity error during payment creation.")  # Log DB issues
             return Response({"error": "Database integrity error."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        except PaymentGatewayError as e:  # Not final: 502 releases the Idempotency-Key so the client can retry
+            return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+
         except ValueError as e:
             logger.warning(f"Payment processing issue: {str(e)}")  # Log business logic error
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -78,7 +87,7 @@ class PaymentCallbackView(APIView):
     Webhook endpoint for Razorpay payment callbacks:
     - Receives payment confirmation updates from Razorpay.
     - Validates payment authenticity using signature verification.
-    - Ensures payment hasn’t already been processed.
+    - Ensures payment hasn’t already been processed (only pending payments are updated).
     - Updates payment status and stores transaction metadata.
     - Calls `finalize_payment()` to complete associated order processing.
     """
@@ -109,9 +118,9 @@ class PaymentCallbackView(APIView):
             logger.warning(f"Invalid payment ID received: {payment_id}")
             return Response({"error": "Invalid payment ID."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # ✅ Prevent duplicate processing
-        if payment.status == 'success':
-            logger.info(f"Payment {payment_id} already marked as success.")
+        # ✅ Prevent duplicate processing (cheap early exit; re-checked under a lock below)
+        if payment.status != 'pending':
+            logger.info(f"Payment {payment_id} already marked as {payment.status}.")
             return Response({"status": "already processed"}, status=status.HTTP_200_OK)
 
         # ✅ Verify Razorpay signature
@@ -131,16 +140,23 @@ class PaymentCallbackView(APIView):
         payment_details = gateway.client.payment.fetch(payment_id)
         payment_status = payment_details.get("status", "failed")
 
-        # ✅ Update payment record with final status (Captured = Success)
-        payment.status = 'success' if payment_status == "captured" else 'failed'
-        payment.transaction_id = payment_id  # ✅ Ensure transaction_id matches Razorpay's actual payment ID
-        payment.raw_response = data  # ✅ Store webhook payload for reference
-        payment.save()  # ✅ Commit changes to database
-
-        logger.info(f"Payment {payment.id} status updated to {payment.status}")
-
-        # ✅ Trigger order finalization
-        PaymentService.finalize_payment(payment)
+        with transaction.atomic():  # ✅ Payment and order are updated together
+            # ✅ Lock the payment and re-check: a duplicate delivery waits here and then sees it processed,
+            # whether it succeeded or failed
+            payment = Payment.objects.select_for_update().get(pk=payment.pk)
+            if payment.status != 'pending':
+                logger.info(f"Payment {payment_id} already marked as {payment.status}.")
+                return Response({"status": "already processed"}, status=status.HTTP_200_OK)
+
+            # ✅ Update payment record with final status (Captured = Success)
+            payment.status = 'success' if payment_status == "captured" else 'failed'
+            payment.transaction_id = payment_id  # ✅ Ensure transaction_id matches Razorpay's actual payment ID
+            payment.raw_response = data  # ✅ Store webhook payload for reference
+            payment.save()  # ✅ Commit changes to database
+            logger.info(f"Payment {payment.id} status updated to {payment.status}")
+
+            # ✅ Trigger order finalization
+            PaymentService.finalize_payment(payment)
 
         return Response({"status": payment.status}, status=status.HTTP_200_OK)
 
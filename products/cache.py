@@ -0,0 +1,430 @@
+import logging  # Cache outages are logged, never raised to the caller
+import random  # TTL jitter
+import threading  # The in-process tier is shared by a worker's threads
+import time  # Version seeds, lock waits and local expiry
+import zlib  # Stable generation buckets across workers
+from collections import OrderedDict  # LRU order of the in-process tier
+
+from django.conf import settings  # Optional timeout overrides
+from django.core.cache import cache  # Configured Django cache (Redis in production)
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRUCache:
+    """
+    Small in-process cache with LRU eviction, a per-entry TTL and hit/miss counters.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires at, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns (found, value).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard(self, predicate):
+        """
+        Removes every entry whose key matches `predicate`.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def hit_rate(hits, misses):
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+class ProductCache:
+    """
+    Caches serialized product payloads for `get_product` in two tiers.
+
+    - Keys carry `SCHEMA_VERSION`; bump it whenever the cached payload changes shape, so old
+      entries are simply never read again.
+    - Every product has a version counter next to its entry, and an entry only counts as a hit
+      when it was stored under the current version. Both are read with one `get_many`.
+    - Saves, deletes and stock reservations bump the version after commit, and the next reader
+      reloads the row. A reader that loaded the old row just before the write committed can only
+      store it under the old version, so it is never served. The new state is deliberately not
+      written through: the after-commit callbacks of concurrent writes can run in any order, so a
+      written payload could be older than the version it ends up stored under.
+    - Concurrent misses for the same product are collapsed: one caller takes a short lock with
+      `cache.add` and queries the database, the others wait briefly for its entry.
+    - TTLs are jittered so entries filled together do not expire together, and unknown IDs are
+      cached for a short time so they cannot be used to hammer the database.
+    - In front of the shared cache, every worker keeps the hottest payloads in a bounded LRU for
+      a few seconds, so most hits cost no network round trip. Products are spread over
+      `generation_buckets` generation counters in the shared cache, and every product write
+      (including stock reservations) bumps the counter of its bucket. Workers read all counters
+      with one `get_many` at most once per `generation_check_interval` and drop only the local
+      entries of buckets that moved, so a checkout does not empty every worker's local tier and a
+      changed product is served from a local copy for no longer than the local TTL.
+
+    The cache is an optimization only: if it is unavailable, reads fall through to the database
+    and invalidations are logged.
+    """
+    SCHEMA_VERSION = 1  # Shape of the cached payload (ProductSerializer fields)
+    timeout = getattr(settings, 'PRODUCT_CACHE_TIMEOUT', 300)  # Seconds a payload may be served
+    negative_timeout = getattr(settings, 'PRODUCT_CACHE_NEGATIVE_TIMEOUT', 30)  # Seconds an unknown ID stays cached
+    # Version counters outlive every entry stored under them, but do expire, so counters for IDs probed
+    # once (including unknown ones) do not pile up; a re-created counter just means a miss
+    version_timeout = getattr(settings, 'PRODUCT_CACHE_VERSION_TIMEOUT', max(timeout, negative_timeout) * 12)
+    jitter = 0.1  # TTLs vary by +/- 10%
+    lock_timeout = 5  # Seconds a fill lock is held at most (the filler may have died)
+    lock_wait = 2.0  # Seconds a caller waits for another caller's fill before querying itself
+    lock_poll_interval = 0.05  # Seconds between checks while waiting
+
+    MISSING = '__missing__'  # Stored for product IDs that do not exist
+
+    local = LocalLRUCache(
+        max_size=getattr(settings, 'PRODUCT_LOCAL_CACHE_SIZE', 1000),  # Products kept per worker
+        ttl=getattr(settings, 'PRODUCT_LOCAL_CACHE_TIMEOUT', 5)  # Seconds a local copy may be served
+    )
+    generation_check_interval = getattr(settings, 'PRODUCT_CACHE_GENERATION_CHECK', 1.0)  # Seconds
+    generation_buckets = getattr(settings, 'PRODUCT_CACHE_GENERATION_BUCKETS', 64)  # Counters products are spread over
+    shared_hits = 0  # Shared-tier lookups answered by this worker's cache reads
+    shared_misses = 0
+    _generations = {}  # Bucket -> last generation seen by this worker
+    _generation_checked_at = 0.0  # time.monotonic() of that read
+    _stats_lock = threading.Lock()
+
+    @classmethod
+    def data_key(cls, pk):
+        return f'product:v{cls.SCHEMA_VERSION}:{pk}'
+
+    @classmethod
+    def version_key(cls, pk):
+        return f'product:v{cls.SCHEMA_VERSION}:{pk}:version'
+
+    @classmethod
+    def generation_key(cls, bucket):
+        return f'product:v{cls.SCHEMA_VERSION}:generation:{bucket}'
+
+    @classmethod
+    def bucket(cls, pk):
+        """
+        Generation bucket of a product, the same in every worker (unlike `hash()` of a string).
+        """
+        return zlib.crc32(str(pk).encode()) % cls.generation_buckets
+
+    @classmethod
+    def lock_key(cls, pk):
+        return f'product:v{cls.SCHEMA_VERSION}:{pk}:lock'
+
+    @classmethod
+    def ttl(cls, seconds):
+        """
+        `seconds` with random jitter applied.
+        """
+        return max(1, round(seconds * random.uniform(1 - cls.jitter, 1 + cls.jitter)))
+
+    @classmethod
+    def get(cls, pk):
+        """
+        Looks a product up in the cache.
+        Returns:
+            (hit, payload, version): payload is None for a cached unknown ID; version is the one
+            a fresh payload must be stored under (None when the cache is unavailable).
+        """
+        try:
+            values = cache.get_many([cls.version_key(pk), cls.data_key(pk)])
+            version = values.get(cls.version_key(pk))
+            if version is None:
+                cache.add(cls.version_key(pk), time.time_ns(), cls.version_timeout)  # Only the first writer wins
+                return False, None, cache.get(cls.version_key(pk))
+            entry = values.get(cls.data_key(pk))
+            if entry is not None and entry[0] == version:
+                return True, None if entry[1] == cls.MISSING else entry[1], version
+            return False, None, version
+        except Exception:
+            logger.warning(f"Product cache unavailable for product {pk}", exc_info=True)
+            return False, None, None
+
+    @classmethod
+    def set(cls, pk, version, payload):
+        """
+        Store a payload (None for an unknown ID) under the version read before loading it.
+        """
+        if version is None:  # Cache was unavailable when reading
+            return
+        timeout = cls.ttl(cls.timeout if payload is not None else cls.negative_timeout)
+        try:
+            cache.set(cls.data_key(pk), (version, cls.MISSING if payload is None else payload), timeout)
+        except Exception:
+            logger.warning(f"Could not cache product {pk}", exc_info=True)
+
+    @classmethod
+    def fetch(cls, pk, load):
+        """
+        Cached payload for a product, loading it with `load(pk)` on a miss.
+        Args:
+            load: Callable returning the serialized product, or None if it does not exist.
+        Returns:
+            The payload, or None if the product does not exist.
+        """
+        cls._sync_generation()
+        found, payload = cls.local.get(pk)
+        if found:
+            return payload
+        payload = cls._fetch_shared(pk, load)
+        cls.local.set(pk, payload, None if payload is not None else min(cls.local.ttl, cls.negative_timeout))
+        return payload
+
+    @classmethod
+    def fetch_many(cls, pks, load_many):
+        """
+        Cached payloads for many products with one shared-cache read, one `load_many` call for the
+        misses and one write per kind of entry to back-fill them (no fill lock: a batch is one request).
+        Args:
+            load_many: Callable taking a list of IDs and returning {pk: payload} for those that exist.
+        Returns:
+            {pk: payload or None} for every requested ID.
+        """
+        cls._sync_generation()
+        found = {}
+        for pk in pks:
+            hit, payload = cls.local.get(pk)
+            if hit:
+                found[pk] = payload
+        remaining = [pk for pk in pks if pk not in found]
+        if not remaining:
+            return found
+
+        versions = {}  # pk -> version a fresh payload must be stored under
+        try:
+            values = cache.get_many([key for pk in remaining for key in (cls.version_key(pk), cls.data_key(pk))])
+            unversioned = []
+            for pk in remaining:
+                version, entry = values.get(cls.version_key(pk)), values.get(cls.data_key(pk))
+                if version is None:
+                    unversioned.append(pk)
+                elif entry is not None and entry[0] == version:
+                    found[pk] = None if entry[1] == cls.MISSING else entry[1]
+                else:
+                    versions[pk] = version
+            if unversioned:  # Cold counters: created once per product, then read back together
+                for pk in unversioned:
+                    cache.add(cls.version_key(pk), time.time_ns(), cls.version_timeout)
+                created = cache.get_many([cls.version_key(pk) for pk in unversioned])
+                versions.update({
+                    pk: created[cls.version_key(pk)] for pk in unversioned if cls.version_key(pk) in created
+                })
+        except Exception:
+            logger.warning("Product cache unavailable for a batch lookup", exc_info=True)
+            versions = {}
+        for pk in remaining:
+            cls._count(pk in found)
+
+        misses = [pk for pk in remaining if pk not in found]
+        if misses:
+            loaded = load_many(misses)
+            cls._store_many({pk: (versions[pk], loaded.get(pk)) for pk in misses if pk in versions})
+            found.update({pk: loaded.get(pk) for pk in misses})
+
+        for pk in remaining:
+            payload = found[pk]
+            cls.local.set(pk, payload, None if payload is not None else min(cls.local.ttl, cls.negative_timeout))
+        return found
+
+    @classmethod
+    def _store_many(cls, entries):
+        """
+        `set` for many products: {pk: (version, payload or None)}, one `set_many` per timeout.
+        """
+        present, missing = {}, {}
+        for pk, (version, payload) in entries.items():
+            if payload is None:
+                missing[cls.data_key(pk)] = (version, cls.MISSING)
+            else:
+                present[cls.data_key(pk)] = (version, payload)
+        try:
+            if present:
+                cache.set_many(present, cls.ttl(cls.timeout))
+            if missing:
+                cache.set_many(missing, cls.ttl(cls.negative_timeout))
+        except Exception:
+            logger.warning("Could not cache a batch of products", exc_info=True)
+
+    @classmethod
+    def _fetch_shared(cls, pk, load):
+        hit, payload, version = cls.get(pk)
+        cls._count(hit)
+        if hit:
+            return payload
+        if version is None:
+            return load(pk)
+
+        if not cls._acquire(pk):  # Someone else is loading it: wait for their entry
+            deadline = time.monotonic() + cls.lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(cls.lock_poll_interval)
+                hit, payload, version = cls.get(pk)
+                if hit:
+                    return payload
+                if version is None:
+                    break
+            return cls._load(pk, version, load)  # The filler is slow or gone; do not wait any longer
+
+        try:
+            return cls._load(pk, version, load)
+        finally:
+            cls._release(pk)
+
+    @classmethod
+    def _count(cls, hit):
+        with cls._stats_lock:
+            if hit:
+                cls.shared_hits += 1
+            else:
+                cls.shared_misses += 1
+
+    @classmethod
+    def stats(cls):
+        """
+        This worker's hit rates for both tiers.
+        """
+        return {
+            'local': {
+                'hits': cls.local.hits, 'misses': cls.local.misses,
+                'hit_rate': hit_rate(cls.local.hits, cls.local.misses),
+                'size': len(cls.local), 'max_size': cls.local.max_size,
+            },
+            'shared': {
+                'hits': cls.shared_hits, 'misses': cls.shared_misses,
+                'hit_rate': hit_rate(cls.shared_hits, cls.shared_misses),
+            },
+        }
+
+    @classmethod
+    def _sync_generation(cls):
+        """
+        Drops the local entries of buckets in which another worker changed a product since the last check.
+        """
+        now = time.monotonic()
+        if now - cls._generation_checked_at < cls.generation_check_interval:
+            return
+        cls._generation_checked_at = now
+        keys = {cls.generation_key(bucket): bucket for bucket in range(cls.generation_buckets)}
+        try:
+            current = cache.get_many(list(keys))
+            missing = [key for key in keys if key not in current]
+            if missing:  # Never bumped or evicted: start them, so they are not seen as changed every time
+                for key in missing:
+                    cache.add(key, time.time_ns(), None)  # Only the first writer wins
+                current.update(cache.get_many(missing))
+        except Exception:
+            logger.warning("Product cache generations unavailable", exc_info=True)
+            current = {}
+        generations = {bucket: current.get(key) for key, bucket in keys.items()}
+        changed = {
+            bucket for bucket, generation in generations.items()
+            if generation is None or generation != cls._generations.get(bucket)  # Unknown counts as changed
+        }
+        if len(changed) == cls.generation_buckets:
+            cls.local.clear()
+        elif changed:
+            cls.local.discard(lambda pk: cls.bucket(pk) in changed)
+        cls._generations = generations
+
+    @classmethod
+    def _bump_generation(cls, pks=None):
+        """
+        Bumps the generations of the buckets holding `pks`, or of every bucket (catalog-wide changes).
+        """
+        buckets = range(cls.generation_buckets) if pks is None else {cls.bucket(pk) for pk in pks}
+        try:
+            for bucket in buckets:
+                try:
+                    cache.incr(cls.generation_key(bucket))
+                except ValueError:  # Counter missing (never written or evicted)
+                    cache.set(cls.generation_key(bucket), time.time_ns(), None)
+        except Exception:
+            logger.error("Could not bump the product cache generations", exc_info=True)
+
+    @classmethod
+    def _load(cls, pk, version, load):
+        payload = load(pk)
+        cls.set(pk, version, payload)
+        return payload
+
+    @classmethod
+    def _acquire(cls, pk):
+        try:
+            return cache.add(cls.lock_key(pk), 1, cls.lock_timeout)
+        except Exception:
+            return True  # No cache means nothing to coordinate on
+
+    @classmethod
+    def _release(cls, pk):
+        try:
+            cache.delete(cls.lock_key(pk))
+        except Exception:
+            pass  # The lock expires on its own
+
+    @classmethod
+    def invalidate(cls, pk):
+        """
+        Make every cached payload for the product unreachable.
+        Returns:
+            The new version, or None if the cache is unavailable.
+        """
+        version = cls._invalidate_shared(pk)
+        cls.local.delete(pk)
+        cls._bump_generation([pk])  # After the shared entry is unreachable, so other workers cannot re-read it
+        return version
+
+    @classmethod
+    def _invalidate_shared(cls, pk):
+        try:
+            try:
+                return cache.incr(cls.version_key(pk))
+            except ValueError:  # Counter missing (never read or evicted)
+                version = time.time_ns()
+                cache.set(cls.version_key(pk), version, cls.version_timeout)
+                return version
+        except Exception:
+            logger.error(f"Could not invalidate cached product {pk}", exc_info=True)
+            return None
+
+    @classmethod
+    def invalidate_many(cls, pks):
+        pks = list(pks)
+        for pk in pks:
+            cls._invalidate_shared(pk)
+            cls.local.delete(pk)
+        cls._bump_generation(pks)  # Once per affected bucket, not for the whole catalog
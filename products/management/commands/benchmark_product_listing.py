@@ -0,0 +1,76 @@
+from decimal import Decimal  # Prices for the synthetic catalog
+
+from django.core.management.base import BaseCommand, CommandError  # Base classes for manage.py commands
+from rest_framework.renderers import JSONRenderer  # Render the payloads the way the API does
+from rest_framework.test import APIRequestFactory  # Requests for the listing view
+
+from orders.benchmarking import best_of, rolled_back  # Shared timing and rollback helpers
+from products.models import Products  # Synthetic catalog
+from products.serializers import ProductSerializer  # Full listing serializer
+from products.views import create_r_get_products  # Listing view being measured
+
+
+class Command(BaseCommand):
+    """
+    Benchmark of the product listing: the old unpaginated full listing versus keyset pages,
+    with all fields and with a sparse `?fields=` fieldset.
+
+    Creates synthetic products (with long descriptions, as real catalog entries have) inside a
+    transaction that is rolled back afterwards and reports response size and latency per variant.
+
+    Usage:
+        python manage.py benchmark_product_listing [--products 5000] [--description-length 2000]
+                                                   [--page-size 20] [--fields id,name] [--repeat 5]
+    """
+    help = "Compare payload size and latency of full, paginated and sparse product listings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000, help="Number of synthetic products")
+        parser.add_argument('--description-length', type=int, default=2000, help="Characters per description")
+        parser.add_argument('--page-size', type=int, default=20, help="Products per page")
+        parser.add_argument('--fields', default='id,name', help="Sparse fieldset to compare")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per variant; the best run is reported")
+
+    def handle(self, *args, **options):
+        if min(options['products'], options['page_size'], options['repeat']) < 1:
+            raise CommandError("--products, --page-size and --repeat must be positive")
+        with rolled_back():  # Leave the database as we found it
+            self.run(options)
+
+    def run(self, options):
+        Products.objects.bulk_create([
+            Products(name=f"Benchmark product {i}", price=Decimal('9.99') + i % 100, stock_quantity=i % 50,
+                     description='x' * options['description_length'])
+            for i in range(options['products'])
+        ], batch_size=1000)
+        factory = APIRequestFactory()
+        renderer = JSONRenderer()
+
+        def full():  # What GET /api/products/ returned before pagination
+            return renderer.render(ProductSerializer(Products.objects.all(), many=True).data)
+
+        def page(query):
+            def render():
+                response = create_r_get_products(factory.get('/api/products/', query))
+                if response.status_code != 200:
+                    raise CommandError(f"Listing failed: {response.data}")
+                return response.render().content
+            return render
+
+        variants = (
+            ('full listing', full),
+            ('page, all fields', page({'page_size': options['page_size']})),
+            (f"page, ?fields={options['fields']}", page({'page_size': options['page_size'], 'fields': options['fields']})),
+        )
+        self.stdout.write(f"{options['products']} products, {options['description_length']}-character descriptions, "
+                          f"best of {options['repeat']} runs")
+        baseline = None
+        for name, variant in variants:
+            size = len(variant())
+            seconds = best_of(variant, options['repeat'])
+            line = f"  {name:<28} {size / 1024:10.1f} KiB  {seconds * 1000:9.2f} ms"
+            if baseline is None:
+                baseline = (size, seconds)
+            else:
+                line += f"  ({baseline[0] / size:.0f}x smaller, {baseline[1] / seconds:.0f}x faster)"
+            self.stdout.write(line)
@@ -0,0 +1,74 @@
+from decimal import Decimal  # Prices for the synthetic catalog
+
+from django.core.management.base import BaseCommand, CommandError  # Base classes for manage.py commands
+from django.db.models import Q  # The LIKE scan being replaced
+
+from orders.benchmarking import best_of, rolled_back  # Shared timing and rollback helpers
+from products.models import Products  # Synthetic catalog
+from products.search import get_search_backend  # Configured search backend
+
+WORDS = ['steel', 'lamp', 'wooden', 'desk', 'cotton', 'shirt', 'leather', 'wallet', 'ceramic', 'mug',
+         'wireless', 'mouse', 'garden', 'chair', 'travel', 'bottle', 'yoga', 'mat', 'kitchen', 'knife']
+
+
+class Command(BaseCommand):
+    """
+    Benchmark of product search against the `icontains` scan it replaces, at growing catalog sizes.
+
+    Grows a synthetic catalog step by step inside a transaction that is rolled back afterwards,
+    indexes it with the configured backend and reports the best latency of one page of results
+    for a rare and a common query. For selective queries the index stays flat while the scan
+    grows with the catalog. Ranking a term that most products contain still reads all of its
+    postings, while the unranked scan stops at the first page of matches; that case grows with the
+    number of matches for every backend.
+
+    Usage:
+        python manage.py benchmark_product_search [--sizes 10000,50000,100000] [--page-size 20] [--repeat 5]
+    """
+    help = "Compare product search latency with icontains scans as the catalog grows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,50000,100000', help="Comma-separated catalog sizes")
+        parser.add_argument('--page-size', type=int, default=20, help="Results per search")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query; the best run is reported")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers")
+        if min(sizes + [options['page_size'], options['repeat']]) < 1:
+            raise CommandError("--sizes, --page-size and --repeat must be positive")
+        if get_search_backend().create_schema():  # Native index of the configured backend (kept afterwards)
+            self.stdout.write(f"Created the {type(get_search_backend()).__name__} structures")
+        with rolled_back():  # Leave the database as we found it
+            self.run(sizes, options['page_size'], options['repeat'])
+
+    def run(self, sizes, page_size, repeat):
+        backend = get_search_backend()
+        queries = {'rare': 'unicorn', 'common': 'steel'}
+        created = 0
+        self.stdout.write(f"{type(backend).__name__}, {page_size} results per search, best of {repeat} runs")
+        for size in sizes:
+            Products.objects.bulk_create([  # Bulk inserts bypass save signals, so index explicitly below
+                Products(
+                    name=f"{WORDS[i % len(WORDS)]} {WORDS[(i * 7 + 3) % len(WORDS)]} {i}",
+                    description=' '.join(WORDS[(i + k) % len(WORDS)] for k in range(12)) +
+                                (' unicorn' if i % 5000 == 0 else ''),  # One product in 5000 is rare
+                    price=Decimal('9.99'), stock_quantity=1,
+                )
+                for i in range(created, size)
+            ], batch_size=1000)
+            created = size
+            backend.rebuild()
+
+            for label, query in queries.items():
+                indexed = best_of(lambda: backend.search(query, limit=page_size), repeat)
+                scan = best_of(lambda: list(
+                    Products.objects.filter(Q(name__icontains=query) | Q(description__icontains=query))
+                    .values_list('id', flat=True)[:page_size]
+                ), repeat)
+                self.stdout.write(
+                    f"  {size:>9} products, {label:<6} query: index {indexed * 1000:8.2f} ms, "
+                    f"icontains {scan * 1000:8.2f} ms"
+                )
@@ -0,0 +1,47 @@
+import time  # Rebuild duration
+
+from django.core.management.base import BaseCommand, CommandError  # Base classes for manage.py commands
+from django.db import connection  # Vendor of the native full-text structures
+
+from products.search import get_search_backend  # Configured search backend
+from products.search.mysql import MySQLFullTextBackend  # Native backends whose structures can be dropped
+from products.search.sqlite import SQLiteFTS5Backend
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the product search index of the configured backend from the product table.
+    Use it after switching backends, loading fixtures or bulk imports that bypass model saves.
+
+    Native backends (SQLite FTS5, MySQL FULLTEXT) get their structures created first if they are
+    missing. `--drop-unused` removes those of native backends that are no longer configured, so
+    their triggers or indexes stop costing on every product write.
+
+    Usage:
+        python manage.py rebuild_product_search_index [--batch-size 1000] [--drop-unused]
+    """
+    help = "Rebuild the product full-text search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Products indexed per batch")
+        parser.add_argument('--drop-unused', action='store_true',
+                            help="Drop native full-text structures of backends that are not configured")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+        backend = get_search_backend()
+        if options['drop_unused']:
+            for backend_class in (SQLiteFTS5Backend, MySQLFullTextBackend):
+                if backend_class.vendor == connection.vendor and not isinstance(backend, backend_class):
+                    backend_class().drop_schema()
+                    self.stdout.write(f"Dropped the {backend_class.__name__} structures")
+        if backend.vendor is not None and backend.vendor != connection.vendor:
+            raise CommandError(f"{type(backend).__name__} needs a {backend.vendor} database")
+        if backend.create_schema():
+            self.stdout.write(f"Created the {type(backend).__name__} structures")
+        started = time.monotonic()
+        indexed = backend.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} products with {type(backend).__name__} in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,72 @@
+# Generated by Django 5.2 on 2026-10-17 23:46
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Product search moves from `icontains` substring matching to word-prefix matching over this
+# token index: a query term matches words that start with it, and terms shorter than
+# MIN_TOKEN_LENGTH (2) are ignored, so a one-character query returns no products.
+
+# Frozen copy of the indexing rules of products.search at the time of this migration, so the
+# backfill keeps working whatever later changes are made to the live search code
+TOKEN_PATTERN = re.compile(r'\w+')
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+SEARCH_FIELDS = {'name': 3, 'description': 1}
+BATCH_SIZE = 1000
+
+
+def tokenize(text):
+    return [
+        word[:MAX_TOKEN_LENGTH] for word in TOKEN_PATTERN.findall((text or '').lower())
+        if len(word) >= MIN_TOKEN_LENGTH
+    ]
+
+
+def index_existing_products(apps, schema_editor):
+    """
+    Index the existing catalog, a batch of products at a time (keyset over the primary key).
+    """
+    Products = apps.get_model('products', 'Products')
+    ProductSearchToken = apps.get_model('products', 'ProductSearchToken')
+    db = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        batch = list(Products.objects.using(db).filter(pk__gt=last_pk).order_by('pk')
+                     .only('id', *SEARCH_FIELDS)[:BATCH_SIZE])
+        if not batch:
+            return
+        ProductSearchToken.objects.using(db).bulk_create([
+            ProductSearchToken(product_id=product.pk, field=field, token=token, weight=count * boost)
+            for product in batch
+            for field, boost in SEARCH_FIELDS.items()
+            for token, count in Counter(tokenize(getattr(product, field))).items()
+        ], batch_size=BATCH_SIZE)
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_products_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(help_text='Lower-cased word from the product text', max_length=64)),
+                ('field', models.CharField(help_text='Product field the token was found in', max_length=20)),
+                ('weight', models.PositiveIntegerField(default=1, help_text='Relevance contribution of the token to the product')),
+                ('product', models.ForeignKey(help_text='Product containing the token', on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='products.products')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('token', 'product', 'field'), name='unique_product_search_token')],
+            },
+        ),
+        migrations.RunPython(index_existing_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured  # SQLite built without FTS5
+from django.db import migrations
+
+# Native full-text structures for the SQLite FTS5 and MySQL FULLTEXT search backends
+# (products.search). Created only when the configured PRODUCT_SEARCH_BACKEND uses the database's
+# native index: installs on the default inverted token index (0006) pay no extra write or
+# table-rebuild cost. After switching backends, `rebuild_product_search_index` creates them.
+# The statements are a frozen copy of the backends' `create_schema`, so this migration does not
+# depend on the live search code.
+
+SQLITE_BACKEND = 'products.search.sqlite.SQLiteFTS5Backend'
+MYSQL_BACKEND = 'products.search.mysql.MySQLFullTextBackend'
+
+SQLITE_FORWARD = [
+    # External-content FTS5 table over the product rows; rowid is the product ID
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, description, content='products_products', content_rowid='id', tokenize='unicode61')",
+    # Triggers keep it in step with every write, including bulk and queryset operations
+    "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products_products BEGIN "
+    "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products_products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products_products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",  # Index the existing rows
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS products_fts_insert",
+    "DROP TRIGGER IF EXISTS products_fts_delete",
+    "DROP TRIGGER IF EXISTS products_fts_update",
+    "DROP TABLE IF EXISTS products_fts",
+]
+
+# MATCH() needs an index on exactly the columns it searches
+MYSQL_INDEXES = {
+    'products_text_ft': ('name', 'description'),
+    'products_name_ft': ('name',),
+    'products_description_ft': ('description',),
+}
+
+
+def mysql_indexes(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'products_products'"
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def create_fulltext_schema(apps, schema_editor):
+    backend = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite' and backend == SQLITE_BACKEND:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                raise ImproperlyConfigured("SQLiteFTS5Backend needs SQLite built with FTS5")
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+    elif vendor == 'mysql' and backend == MYSQL_BACKEND:
+        existing = mysql_indexes(schema_editor)
+        for name, columns in MYSQL_INDEXES.items():  # One per statement: InnoDB builds one FULLTEXT index at a time
+            if name not in existing:
+                schema_editor.execute(f"ALTER TABLE products_products ADD FULLTEXT INDEX {name} ({', '.join(columns)})")
+
+
+def drop_fulltext_schema(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_BACKWARD:
+            schema_editor.execute(statement)
+    elif vendor == 'mysql':
+        for name in mysql_indexes(schema_editor) & set(MYSQL_INDEXES):
+            schema_editor.execute(f"ALTER TABLE products_products DROP INDEX {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_productsearchtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_schema, drop_fulltext_schema),
+    ]
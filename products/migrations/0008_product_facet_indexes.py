@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-17 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_fulltext_schema'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['category', 'is_available', 'price'], name='products_facet_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['is_available', 'price'], name='products_available_price_idx'),
+        ),
+    ]
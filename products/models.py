@@ -83,7 +83,51 @@ class Products(AuditData):
 
     class Meta:
         ordering = ['-created_at']  # Displays newest products first in query results
+        indexes = [
+            # Keyset pagination of the listing seeks on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='products_created_id_idx'),
+            # Facet counts group by these columns and storefront filters narrow by them, without row reads
+            models.Index(fields=['category', 'is_available', 'price'], name='products_facet_idx'),
+            # Availability and price filters without a category
+            models.Index(fields=['is_available', 'price'], name='products_available_price_idx'),
+        ]
 
     def __str__(self):
         # Returns a meaningful representation of the product for admin or debugging
         return f"{self.name} (₹{self.price})"
+
+
+class ProductSearchToken(models.Model):
+    """
+    Inverted index entry: one token of a product's name or description.
+    Search reads the postings of the query tokens through the (token, product) index, so its cost
+    follows the number of matching postings, not the size of the catalog.
+    Maintained by `products.search.InvertedIndexBackend` whenever a product is saved.
+    """
+    token = models.CharField(
+        max_length=64,  # Longer words are truncated when tokenized
+        help_text="Lower-cased word from the product text"
+    )
+    product = models.ForeignKey(
+        Products,
+        on_delete=models.CASCADE,  # Postings disappear with their product
+        related_name='search_tokens',
+        help_text="Product containing the token"
+    )
+    field = models.CharField(
+        max_length=20,  # 'name' or 'description'
+        help_text="Product field the token was found in"
+    )
+    weight = models.PositiveIntegerField(
+        default=1,  # Occurrences times the field's boost
+        help_text="Relevance contribution of the token to the product"
+    )
+
+    class Meta:
+        constraints = [
+            # Also the lookup index: every search is a (prefix) range scan on the leading token column
+            models.UniqueConstraint(fields=['token', 'product', 'field'], name='unique_product_search_token'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.product_id} ({self.field})"
@@ -0,0 +1,18 @@
+from django.conf import settings  # Backend selection
+from django.utils.module_loading import import_string  # Backend class from a dotted path
+
+from .base import BaseSearchBackend, SearchPage, tokenize  # noqa: F401  Public search API
+
+
+def get_search_backend():
+    """
+    Builds the backend configured by `PRODUCT_SEARCH_BACKEND` (dotted class path) and
+    `PRODUCT_SEARCH_BACKEND_OPTIONS` (kwargs). Defaults to the portable inverted token index;
+    `products.search.sqlite.SQLiteFTS5Backend` and `products.search.mysql.MySQLFullTextBackend`
+    use the database's native full-text index instead; their structures are created by migration
+    0007 when the backend is configured, or by `rebuild_product_search_index` after switching.
+    """
+    backend_class = import_string(
+        getattr(settings, 'PRODUCT_SEARCH_BACKEND', 'products.search.inverted.InvertedIndexBackend')
+    )
+    return backend_class(**getattr(settings, 'PRODUCT_SEARCH_BACKEND_OPTIONS', {}))
@@ -0,0 +1,102 @@
+import re  # Word splitting
+from abc import ABC, abstractmethod  # Backend interface
+from collections import namedtuple  # Search result page
+
+TOKEN_PATTERN = re.compile(r'\w+')  # Unicode words
+MIN_TOKEN_LENGTH = 2  # Shorter words are too common to be worth indexing
+MAX_TOKEN_LENGTH = 64  # Matches ProductSearchToken.token
+MAX_QUERY_TERMS = 8  # Longer queries are cut, bounding the work per search
+
+SEARCH_FIELDS = {'name': 3, 'description': 1}  # Searchable product fields and their relevance boost
+
+# One page of ranked product IDs, best match first; has_more tells if a further page exists
+SearchPage = namedtuple('SearchPage', ['ids', 'has_more'])
+
+
+def tokenize(text):
+    """
+    Lower-cased words of `text` that are long enough to index, in order of appearance.
+    """
+    return [
+        word[:MAX_TOKEN_LENGTH] for word in TOKEN_PATTERN.findall((text or '').lower())
+        if len(word) >= MIN_TOKEN_LENGTH
+    ]
+
+
+def query_terms(query):
+    """
+    Distinct search terms of a user query.
+    """
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+class BaseSearchBackend(ABC):
+    """
+    Product full-text search.
+
+    - A product matches when every query term is a prefix of one of its words
+      ("lap sta" finds "Laptop stand"), in any of the searched fields.
+    - Results are ordered by relevance (matches in the name count more than in the description),
+      then newest product first, and returned one page at a time.
+    - Backends built on a database's native full-text index set `vendor` and create the structures
+      they need with `create_schema` (migration 0007 and `rebuild_product_search_index` call it for
+      the configured backend only, so other installs never pay for them).
+    """
+    vendor = None  # Database vendor whose native index the backend uses (None: portable)
+
+    @abstractmethod
+    def search(self, query, fields=None, offset=0, limit=None):
+        """
+        Ranked IDs of the products matching `query`.
+        Args:
+            fields: Subset of SEARCH_FIELDS to search (default: all).
+            offset: Matches to skip.
+            limit: Page size (None for every match).
+        Returns:
+            SearchPage.
+        """
+
+    def index(self, products):
+        """
+        (Re)index saved products. Backends whose index the database maintains do nothing.
+        """
+
+    def remove(self, product_ids):
+        """
+        Drop deleted products from the index. Backends whose index the database maintains do nothing.
+        """
+
+    def rebuild(self, batch_size=1000):
+        """
+        Rebuild the whole index from the product table. Returns the number of products indexed.
+        """
+        return 0
+
+    def create_schema(self, connection=None):
+        """
+        Create the native index structures this backend searches, if missing.
+        Returns True if anything was created.
+        """
+        return False
+
+    def drop_schema(self, connection=None):
+        """
+        Drop the native index structures of this backend, if present.
+        """
+
+    @staticmethod
+    def page(ids, limit):
+        """
+        SearchPage from up to `limit + 1` ranked IDs.
+        """
+        ids = list(ids)
+        if limit is None:
+            return SearchPage(ids, False)
+        return SearchPage(ids[:limit], len(ids) > limit)
+
+    @staticmethod
+    def fields_or_default(fields):
+        fields = list(SEARCH_FIELDS) if fields is None else [name for name in SEARCH_FIELDS if name in fields]
+        if not fields:
+            raise ValueError(f"fields must be a subset of: {', '.join(SEARCH_FIELDS)}")
+        return fields
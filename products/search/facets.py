@@ -0,0 +1,192 @@
+import hashlib  # Compact cache keys for normalized queries
+import json  # Canonical form of a normalized query
+import logging  # Cache outages are logged, never raised to the caller
+import time  # Generation seeds
+
+from django.conf import settings  # Optional timeout and bucket overrides
+from django.core.cache import cache  # Facet counts and the catalog generation
+from django.db.models import Case, CharField, Count, Q, Value, When  # Single grouped count query
+
+from products.models import Category, Products  # Counted products and category names
+from . import get_search_backend  # Query matches
+from .base import query_terms  # Query normalization
+
+logger = logging.getLogger(__name__)
+
+# Price ranges (₹) as (key, lower bound inclusive, upper bound exclusive); None means unbounded
+PRICE_BUCKETS = getattr(settings, 'PRODUCT_PRICE_BUCKETS', (
+    ('under_500', None, 500),
+    ('500_1000', 500, 1000),
+    ('1000_5000', 1000, 5000),
+    ('5000_plus', 5000, None),
+))
+
+
+class ProductFacets:
+    """
+    Category, price range and availability counts for a product search.
+
+    - All three facets come from one GROUP BY over (category, is_available, price bucket), which the
+      (category, is_available, price) index answers without reading the product rows.
+    - Facets are disjunctive: each one is counted with the other facets' filters applied but not its
+      own, so a selected category still shows how many matches the other categories have. The
+      grouped rows carry all three dimensions, so this needs no query per facet.
+    - Counts are cached under the normalized query (distinct search terms in sorted order plus
+      the filters) and the catalog generation. Every product or category write bumps the generation
+      after commit, which retires all cached counts at once; stock changes do not affect facets
+      and leave it alone.
+    - Queries are counted over their first `max_matches` search matches; `truncated` in the result
+      says when a query had more (the counts are then lower bounds).
+    """
+    timeout = getattr(settings, 'PRODUCT_FACET_CACHE_TIMEOUT', 600)  # Seconds counts may be served
+    max_matches = getattr(settings, 'PRODUCT_FACET_MAX_MATCHES', 10000)  # Search matches counted per query
+    generation_key = 'product_catalog_generation'
+
+    @staticmethod
+    def parse_filters(data):
+        """
+        Facet filters from a request body: `category` (ID), `is_available` (bool) and `price` (bucket key).
+        Raises:
+            ValueError: For malformed values.
+        """
+        filters = {}
+        if data.get('category') is not None:
+            filters['category'] = int(data['category'])
+        if data.get('is_available') is not None:
+            if not isinstance(data['is_available'], bool):
+                raise ValueError("is_available must be true or false.")
+            filters['is_available'] = data['is_available']
+        if data.get('price') is not None:
+            if data['price'] not in {key for key, _, _ in PRICE_BUCKETS}:
+                raise ValueError(f"price must be one of: {', '.join(key for key, _, _ in PRICE_BUCKETS)}.")
+            filters['price'] = data['price']
+        return filters
+
+    @staticmethod
+    def apply_filters(queryset, filters):
+        if 'category' in filters:
+            queryset = queryset.filter(category_id=filters['category'])
+        if 'is_available' in filters:
+            queryset = queryset.filter(is_available=filters['is_available'])
+        if 'price' in filters:
+            _, low, high = next(bucket for bucket in PRICE_BUCKETS if bucket[0] == filters['price'])
+            queryset = queryset.filter(ProductFacets.price_range(low, high))
+        return queryset
+
+    @staticmethod
+    def price_range(low, high):
+        condition = Q()
+        if low is not None:
+            condition &= Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        return condition
+
+    @classmethod
+    def normalize(cls, query, filters):
+        """
+        Canonical form of a search: queries with the same terms in any order or case share counts.
+        """
+        return json.dumps({'terms': sorted(query_terms(query)), 'filters': filters}, sort_keys=True)
+
+    @classmethod
+    def cache_key(cls, normalized, generation):
+        digest = hashlib.sha1(normalized.encode()).hexdigest()
+        return f'product_facets:{generation}:{digest}'
+
+    @classmethod
+    def generation(cls):
+        """
+        Current catalog generation, creating the counter if needed (None if the cache is unavailable).
+        """
+        try:
+            generation = cache.get(cls.generation_key)
+            if generation is None:
+                cache.add(cls.generation_key, time.time_ns(), None)  # Only the first writer wins
+                generation = cache.get(cls.generation_key)
+            return generation
+        except Exception:
+            logger.warning("Product facet cache unavailable", exc_info=True)
+            return None
+
+    @classmethod
+    def bump_generation(cls):
+        """
+        Retire every cached facet count (after a catalog change commits).
+        """
+        try:
+            try:
+                cache.incr(cls.generation_key)
+            except ValueError:  # Counter missing (never read or evicted)
+                cache.set(cls.generation_key, time.time_ns(), None)
+        except Exception:
+            logger.error("Could not bump the product catalog generation", exc_info=True)
+
+    @classmethod
+    def get(cls, query, filters):
+        """
+        Facet counts for `query` (may be empty) narrowed by `filters`, from the cache when possible.
+        """
+        generation = cls.generation()
+        key = cls.cache_key(cls.normalize(query, filters), generation)
+        if generation is not None:
+            try:
+                facets = cache.get(key)
+            except Exception:
+                logger.warning("Product facet cache unavailable", exc_info=True)
+                facets = None
+            if facets is not None:
+                return facets
+
+        queryset, truncated = Products.objects.all(), False  # Filters are applied per facet by `compute`
+        if query_terms(query):
+            ids, truncated = get_search_backend().search(query, limit=cls.max_matches)
+            queryset = queryset.filter(pk__in=ids)
+        facets = dict(cls.compute(queryset, filters), truncated=truncated)
+        if generation is not None:  # Stored under the generation read before counting
+            try:
+                cache.set(key, facets, cls.timeout)
+            except Exception:
+                logger.warning("Could not cache product facets", exc_info=True)
+        return facets
+
+    @classmethod
+    def compute(cls, queryset, filters=None):
+        """
+        Counts per category, price bucket and availability with a single grouped query.
+        Each facet counts the groups that pass every filter in `filters` except its own.
+        """
+        filters = filters or {}
+        bucket = Case(
+            *[When(cls.price_range(low, high), then=Value(key)) for key, low, high in PRICE_BUCKETS],
+            default=Value(''), output_field=CharField()
+        )
+        rows = queryset.order_by() \
+                       .values('category_id', 'is_available', bucket=bucket) \
+                       .annotate(count=Count('pk')) \
+                       .values_list('category_id', 'is_available', 'bucket', 'count')
+
+        categories, prices, availability = {}, {key: 0 for key, _, _ in PRICE_BUCKETS}, {True: 0, False: 0}
+        for category_id, is_available, key, count in rows:
+            values = {'category': category_id, 'is_available': is_available, 'price': key}
+            failed = {name for name, wanted in filters.items() if values[name] != wanted}
+            # A group counts for a facet if at most that facet's own filter rejects it
+            if failed <= {'category'}:
+                categories[category_id] = categories.get(category_id, 0) + count
+            if failed <= {'price'} and key in prices:
+                prices[key] += count
+            if failed <= {'is_available'}:
+                availability[is_available] += count
+
+        names = dict(Category.objects.filter(pk__in=[pk for pk in categories if pk is not None])
+                     .values_list('pk', 'name'))
+        return {
+            'category': sorted(
+                [{'id': pk, 'name': names.get(pk), 'count': count} for pk, count in categories.items()],
+                key=lambda item: (-item['count'], item['id'] is None, item['id'] or 0)
+            ),
+            'price': [
+                {'key': key, 'min': low, 'max': high, 'count': prices[key]} for key, low, high in PRICE_BUCKETS
+            ],
+            'is_available': {'true': availability[True], 'false': availability[False]},
+        }
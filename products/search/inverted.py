@@ -0,0 +1,90 @@
+from collections import Counter  # Token frequencies
+from functools import reduce  # OR of the term conditions
+from operator import or_  # OR of the term conditions
+
+from django.db import connection, transaction  # Prefix condition per vendor; index updates are all or nothing
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When  # Ranking aggregates
+
+from products.models import Products, ProductSearchToken  # Indexed products and their postings
+from .base import SEARCH_FIELDS, BaseSearchBackend, query_terms, tokenize  # Shared search behaviour
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """
+    Portable search over the `ProductSearchToken` inverted index.
+
+    - Saving a product replaces its postings (one delete and one bulk insert), in the same
+      transaction as the save.
+    - A search reads only the postings whose token starts with one of the query terms, through
+      the index on the token column, and groups them per product in the same query: the score
+      is the sum of the matching postings' weights, and a product must match every term.
+      The work grows with the number of matching postings, not with the catalog.
+    """
+
+    @staticmethod
+    def prefix(term):
+        """
+        Condition matching tokens that start with `term`, in a form the token index can serve.
+        SQLite never uses an index for LIKE on a case-sensitive column, so there the prefix is
+        expressed as a range (tokens are lower case; U+10FFFF sorts after every other character).
+        """
+        if connection.vendor == 'sqlite':
+            return Q(token__gte=term, token__lt=term + chr(0x10FFFF))
+        return Q(token__startswith=term)  # LIKE 'term%' is an index range scan on MySQL and others
+
+    def search(self, query, fields=None, offset=0, limit=None):
+        fields = self.fields_or_default(fields)
+        terms = query_terms(query)
+        if not terms:
+            return self.page([], limit)
+
+        matched = {  # 1 when the product has a word starting with the term
+            f'term_{index}': Max(Case(When(self.prefix(term), then=Value(1)), default=Value(0),
+                                      output_field=IntegerField()))
+            for index, term in enumerate(terms)
+        }
+        postings = ProductSearchToken.objects.filter(reduce(or_, (self.prefix(term) for term in terms)))
+        if len(fields) < len(SEARCH_FIELDS):
+            postings = postings.filter(field__in=fields)
+        ranked = postings.values('product_id') \
+                         .annotate(score=Sum('weight'), **matched) \
+                         .filter(**{name: 1 for name in matched}) \
+                         .order_by('-score', '-product_id') \
+                         .values_list('product_id', flat=True)
+        if limit is None:
+            return self.page(ranked[offset:], None)
+        return self.page(ranked[offset:offset + limit + 1], limit)
+
+    @staticmethod
+    def postings(product):
+        """
+        Unsaved index entries for one product.
+        """
+        return [
+            ProductSearchToken(product_id=product.pk, field=field, token=token, weight=count * boost)
+            for field, boost in SEARCH_FIELDS.items()
+            for token, count in Counter(tokenize(getattr(product, field))).items()
+        ]
+
+    def index(self, products):
+        products = list(products)
+        with transaction.atomic():
+            ProductSearchToken.objects.filter(product_id__in=[product.pk for product in products]).delete()
+            ProductSearchToken.objects.bulk_create(
+                [posting for product in products for posting in self.postings(product)], batch_size=1000
+            )
+
+    def remove(self, product_ids):
+        ProductSearchToken.objects.filter(product_id__in=list(product_ids)).delete()
+
+    def rebuild(self, batch_size=1000):
+        ProductSearchToken.objects.all().delete()
+        indexed, last_pk = 0, 0
+        while True:  # Keyset over the primary key, one batch of products in memory at a time
+            batch = list(Products.objects.filter(pk__gt=last_pk).order_by('pk')
+                         .only('id', *SEARCH_FIELDS)[:batch_size])
+            if not batch:
+                return indexed
+            self.index(batch)
+            indexed += len(batch)
+            last_pk = batch[-1].pk
@@ -0,0 +1,69 @@
+from django.db import connection as default_connection  # Index management
+from django.db.models.expressions import RawSQL  # MATCH ... AGAINST scores
+
+from products.models import Products  # Searched rows
+from .base import SEARCH_FIELDS, BaseSearchBackend, query_terms  # Shared search behaviour
+
+
+class MySQLFullTextBackend(BaseSearchBackend):
+    """
+    Search through InnoDB FULLTEXT indexes (created by `create_schema`).
+
+    MySQL maintains the indexes itself, so `index` and `remove` do nothing. Queries run in
+    boolean mode with every term required as a prefix; the score adds up one MATCH per searched
+    field, weighted by SEARCH_FIELDS. Note that InnoDB ignores words shorter than
+    `innodb_ft_min_token_size` (3 by default) and its stopwords.
+    """
+    vendor = 'mysql'
+
+    # MATCH() needs an index on exactly the columns it searches. Adding the first FULLTEXT index
+    # rebuilds the table, so they are only created for installs that use this backend
+    INDEXES = {
+        'products_text_ft': ('name', 'description'),
+        'products_name_ft': ('name',),
+        'products_description_ft': ('description',),
+    }
+
+    def search(self, query, fields=None, offset=0, limit=None):
+        fields = self.fields_or_default(fields)
+        terms = query_terms(query)
+        if not terms:
+            return self.page([], limit)
+
+        against = ' '.join(f'+{term}*' for term in terms)
+        # The filter uses the index over exactly the searched columns; the score weights each field
+        matches = RawSQL(f"MATCH ({', '.join(fields)}) AGAINST (%s IN BOOLEAN MODE)", [against])
+        score = ' + '.join(f"{SEARCH_FIELDS[field]} * MATCH ({field}) AGAINST (%s IN BOOLEAN MODE)" for field in fields)
+        ranked = Products.objects.annotate(matches=matches, score=RawSQL(score, [against] * len(fields))) \
+                                 .filter(matches__gt=0) \
+                                 .order_by('-score', '-id') \
+                                 .values_list('id', flat=True)
+        if limit is None:
+            return self.page(ranked[offset:], None)
+        return self.page(ranked[offset:offset + limit + 1], limit)
+
+    def create_schema(self, connection=None):
+        connection = connection or default_connection
+        table = Products._meta.db_table
+        missing = [name for name in self.INDEXES if name not in self.existing_indexes(connection)]
+        with connection.cursor() as cursor:
+            for name in missing:  # One per statement: InnoDB builds a single FULLTEXT index at a time
+                cursor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} ({', '.join(self.INDEXES[name])})")
+        return bool(missing)
+
+    def drop_schema(self, connection=None):
+        connection = connection or default_connection
+        table = Products._meta.db_table
+        with connection.cursor() as cursor:
+            for name in self.existing_indexes(connection) & set(self.INDEXES):
+                cursor.execute(f"ALTER TABLE {table} DROP INDEX {name}")
+
+    @staticmethod
+    def existing_indexes(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT index_name FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = %s",
+                [Products._meta.db_table]
+            )
+            return {row[0] for row in cursor.fetchall()}
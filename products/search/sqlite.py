@@ -0,0 +1,81 @@
+from django.core.exceptions import ImproperlyConfigured  # SQLite built without FTS5
+from django.db import connection as default_connection  # Raw FTS5 queries
+
+from .base import SEARCH_FIELDS, BaseSearchBackend, query_terms  # Shared search behaviour
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    Search through SQLite's FTS5 extension (the `products_fts` table, created by `create_schema`).
+
+    Triggers on the product table keep the index current, so `index` and `remove` do nothing.
+    Matches are ranked with bm25, weighting the fields by SEARCH_FIELDS.
+    """
+    vendor = 'sqlite'
+    table = 'products_fts'
+
+    SCHEMA = [
+        # External-content FTS5 table over the product rows; rowid is the product ID
+        "CREATE VIRTUAL TABLE products_fts USING fts5("
+        "name, description, content='products_products', content_rowid='id', tokenize='unicode61')",
+        # Triggers keep it in step with every write, including bulk and queryset operations
+        "CREATE TRIGGER products_fts_insert AFTER INSERT ON products_products BEGIN "
+        "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        "CREATE TRIGGER products_fts_delete AFTER DELETE ON products_products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END",
+        "CREATE TRIGGER products_fts_update AFTER UPDATE OF name, description ON products_products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",  # Index the existing rows
+    ]
+    DROP_SCHEMA = [
+        "DROP TRIGGER IF EXISTS products_fts_insert",
+        "DROP TRIGGER IF EXISTS products_fts_delete",
+        "DROP TRIGGER IF EXISTS products_fts_update",
+        "DROP TABLE IF EXISTS products_fts",
+    ]
+
+    def search(self, query, fields=None, offset=0, limit=None):
+        fields = self.fields_or_default(fields)
+        terms = query_terms(query)
+        if not terms:
+            return self.page([], limit)
+
+        # Every term as a prefix query; terms only contain word characters, so quoting is safe
+        match = ' '.join(f'"{term}"*' for term in terms)
+        if len(fields) < len(SEARCH_FIELDS):
+            match = f"{{{' '.join(fields)}}} : ({match})"
+        weights = ', '.join(str(float(boost)) for boost in SEARCH_FIELDS.values())
+        with default_connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}, {weights}), rowid DESC LIMIT %s OFFSET %s",
+                [match, -1 if limit is None else limit + 1, offset]
+            )
+            return self.page((row[0] for row in cursor.fetchall()), limit)
+
+    def rebuild(self, batch_size=1000):
+        with default_connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+            return cursor.fetchone()[0]
+
+    def create_schema(self, connection=None):
+        connection = connection or default_connection
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                raise ImproperlyConfigured("SQLiteFTS5Backend needs SQLite built with FTS5")
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.table])
+            if cursor.fetchone():
+                return False
+            for statement in self.SCHEMA:
+                cursor.execute(statement)
+        return True
+
+    def drop_schema(self, connection=None):
+        with (connection or default_connection).cursor() as cursor:
+            for statement in self.DROP_SCHEMA:
+                cursor.execute(statement)
@@ -9,6 +9,13 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Products
         fields = ['id', 'name', 'price', 'stock_quantity']  # Only essential fields needed in order view
 
+    def __init__(self, *args, fields=None, **kwargs):
+        # `fields` limits the output to a subset of Meta.fields (sparse fieldsets in listings)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 # # Serializer for each Product inside an Order (with quantity)
 # class OrderProductSerializer(serializers.ModelSerializer):
 #     product = ProductSerializer()  # Nested product details inside each ordered item
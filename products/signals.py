@@ -0,0 +1,34 @@
+from django.db import transaction  # Invalidate only once the change is visible to other readers
+from django.db.models.signals import post_delete, post_save  # Model change hooks
+from django.dispatch import receiver  # Signal receiver decorator
+
+from .cache import ProductCache  # Cached product payloads
+from .models import Category, Products  # Catalog models whose changes affect caches and facets
+from .search import get_search_backend  # Full-text index of product names and descriptions
+from .search.base import SEARCH_FIELDS  # Fields whose changes require reindexing
+from .search.facets import ProductFacets  # Cached facet counts
+
+
+@receiver(post_save, sender=Products)
+def product_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:  # Fixtures: run rebuild_product_search_index afterwards
+        return
+    if update_fields is None or set(update_fields) & set(SEARCH_FIELDS):
+        get_search_backend().index([instance])  # Same transaction as the save
+    pk = instance.pk
+    transaction.on_commit(lambda: ProductCache.invalidate(pk))  # The next reader loads the new state
+    transaction.on_commit(ProductFacets.bump_generation)  # Category, price or availability may have changed
+
+
+@receiver(post_delete, sender=Products)
+def product_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    get_search_backend().remove([pk])
+    transaction.on_commit(lambda: ProductCache.invalidate(pk))  # The next reader caches it as unknown
+    transaction.on_commit(ProductFacets.bump_generation)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(ProductFacets.bump_generation)  # Names in the category facet
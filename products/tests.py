@@ -1,3 +1,460 @@
-from django.test import TestCase
+import importlib
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from orders.services import OrderService
+from .cache import LocalLRUCache, ProductCache
+from .models import Category, Products, ProductSearchToken, User
+from .search import get_search_backend
+from .search.sqlite import SQLiteFTS5Backend
+from .search.facets import ProductFacets
+
+
+class ProductCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        ProductCache.local.clear()
+        self.client = APIClient()
+        self.product = Products.objects.create(name="Lamp", price=Decimal('25.00'), stock_quantity=10)
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').data['price'], '25.00')
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/products/{self.product.pk}/')
+        self.assertEqual(response.data['name'], "Lamp")
+
+    def test_version_counters_expire(self):
+        with mock.patch('products.cache.cache.add', wraps=cache.add) as add:
+            self.client.get('/api/products/999999/')  # Unknown IDs get a counter too, so it must expire
+        timeout = next(call.args[2] for call in add.call_args_list if call.args[0] == ProductCache.version_key(999999))
+        self.assertGreater(timeout, max(ProductCache.timeout, ProductCache.negative_timeout))
+
+    def test_updates_and_deletes_invalidate_the_entry(self):
+        self.client.get(f'/api/products/{self.product.pk}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/products/update_product/{self.product.pk}', {'price': '30.00'}, format='json')
+        with self.assertNumQueries(1):  # Reloaded once...
+            self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').data['price'], '30.00')
+        with self.assertNumQueries(0):  # ...then cached again
+            self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').data['price'], '30.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/products/delete_product/{self.product.pk}/')
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').status_code, 404)
+
+    def test_unknown_ids_are_cached_until_the_product_exists(self):
+        self.assertEqual(self.client.get('/api/products/9999/').status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/products/9999/').status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            Products.objects.create(id=9999, name="Late", price=Decimal('1.00'))
+        self.assertEqual(self.client.get('/api/products/9999/').data['name'], "Late")
+
+    def test_stock_changes_invalidate_the_entry(self):
+        self.client.get(f'/api/products/{self.product.pk}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.create_order(User.objects.create(name="Customer"), [{'product': self.product, 'quantity': 3}])
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').data['stock_quantity'], 7)
+
+    def test_payload_loaded_before_a_write_is_never_served(self):
+        hit, _, version = ProductCache.get(self.product.pk)
+        self.assertFalse(hit)
+        ProductCache.invalidate(self.product.pk)  # Write commits meanwhile
+        ProductCache.set(self.product.pk, version, {'id': self.product.pk, 'price': '25.00'})  # Slow reader
+        self.assertEqual(ProductCache.get(self.product.pk)[:2], (False, None))
+
+    def test_out_of_order_commit_callbacks_never_serve_an_older_state(self):
+        self.client.get(f'/api/products/{self.product.pk}/')
+        callbacks = []
+        for price in ('30.00', '35.00'):  # Two writes commit one after the other...
+            with self.captureOnCommitCallbacks() as captured:
+                self.product.price = Decimal(price)
+                self.product.save()
+            callbacks.append(captured)
+        for captured in reversed(callbacks):  # ...but their callbacks run in the opposite order
+            for callback in captured:
+                callback()
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').data['price'], '35.00')
+
+    def test_concurrent_misses_share_one_load(self):
+        loads = []
+
+        def load(pk):
+            loads.append(pk)
+            time.sleep(0.2)  # Slow query; every other caller arrives meanwhile
+            return {'id': pk}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(ProductCache.fetch(self.product.pk, load)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(loads, [self.product.pk])
+        self.assertEqual(results, [{'id': self.product.pk}] * 8)
+
+    def test_ttls_are_jittered(self):
+        ttls = {ProductCache.ttl(300) for _ in range(50)}
+        self.assertGreater(len(ttls), 1)
+        self.assertTrue(all(270 <= ttl <= 330 for ttl in ttls))
+
+
+class LocalProductCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        ProductCache.local.clear()
+        self.client = APIClient()
+        self.product = Products.objects.create(name="Lamp", price=Decimal('25.00'), stock_quantity=10)
+
+    def test_local_hits_skip_the_shared_cache(self):
+        self.client.get(f'/api/products/{self.product.pk}/')
+        with mock.patch.object(cache, 'get_many') as get_many, self.assertNumQueries(0):
+            self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').data['name'], "Lamp")
+        get_many.assert_not_called()
+
+    def test_writes_in_other_workers_clear_the_local_tier(self):
+        self.client.get(f'/api/products/{self.product.pk}/')
+        Products.objects.filter(pk=self.product.pk).update(price=Decimal('30.00'))  # Bypasses this worker...
+        ProductCache._invalidate_shared(self.product.pk)  # ...as another worker's write would
+        ProductCache._bump_generation([self.product.pk])
+
+        with mock.patch.object(ProductCache, '_generation_checked_at', time.monotonic()):  # Checked just now
+            self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').data['price'], '25.00')
+        with mock.patch.object(ProductCache, '_generation_checked_at', 0.0):
+            self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').data['price'], '30.00')
+
+    def test_stock_changes_only_drop_their_own_bucket(self):
+        others = [Products.objects.create(name=f"Other {i}", price=Decimal('5.00'), stock_quantity=10)
+                  for i in range(5)]
+        other = next(p for p in others if ProductCache.bucket(p.pk) != ProductCache.bucket(self.product.pk))
+        with mock.patch.object(ProductCache, '_generation_checked_at', 0.0):
+            ProductCache._sync_generation()  # Baseline generations for this worker
+        with mock.patch.object(ProductCache, '_generation_checked_at', time.monotonic()):
+            for product in (self.product, other):
+                self.client.get(f'/api/products/{product.pk}/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.create_order(User.objects.create(name="Customer"), [{'product': other, 'quantity': 1}])
+        ProductCache.local.set(other.pk, {'stale': True})  # Still held here; another worker's checkout moved it
+        with mock.patch.object(ProductCache, '_generation_checked_at', 0.0):
+            ProductCache._sync_generation()
+        self.assertEqual(ProductCache.local.get(self.product.pk)[0], True)  # Unrelated bucket kept
+        self.assertEqual(ProductCache.local.get(other.pk), (False, None))
+
+    def test_lru_eviction_and_expiry(self):
+        lru = LocalLRUCache(max_size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')  # 'b' is now least recently used
+        lru.set('c', 3)
+        self.assertEqual([lru.get(key) for key in 'abc'], [(True, 1), (False, None), (True, 3)])
+        lru.set('d', 4, ttl=0)
+        self.assertEqual(lru.get('d'), (False, None))
+
+    def test_stats_report_both_tiers(self):
+        ProductCache.local.hits = ProductCache.local.misses = 0
+        with mock.patch.multiple(ProductCache, shared_hits=0, shared_misses=0):
+            self.client.get(f'/api/products/{self.product.pk}/')  # Misses both tiers
+            self.client.get(f'/api/products/{self.product.pk}/')  # Local hit
+            ProductCache.local.clear()
+            self.client.get(f'/api/products/{self.product.pk}/')  # Shared hit
+            stats = self.client.get('/api/products/cache_stats/').data
+        self.assertEqual((stats['local']['hits'], stats['local']['misses']), (1, 2))
+        self.assertEqual((stats['shared']['hits'], stats['shared']['misses']), (1, 1))
+        self.assertAlmostEqual(stats['shared']['hit_rate'], 0.5)
+
+
+class ProductBatchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        ProductCache.local.clear()
+        self.client = APIClient()
+        self.products = [
+            Products.objects.create(name=f"Product {i}", price=Decimal('5.00') + i, stock_quantity=10)
+            for i in range(4)
+        ]
+
+    def batch(self, ids):
+        return self.client.get('/api/products/batch', {'ids': ','.join(map(str, ids))})
+
+    def test_results_keep_the_requested_order_and_flag_missing_ids(self):
+        ids = [self.products[2].pk, 9999, self.products[0].pk, self.products[2].pk]
+        with self.assertNumQueries(1):  # One in_bulk for every miss
+            response = self.batch(ids)
+        self.assertEqual([item and item['id'] for item in response.data['results']],
+                         [self.products[2].pk, None, self.products[0].pk])  # Duplicates collapsed
+        self.assertEqual(response.data['missing'], [9999])
+
+    def test_cached_entries_are_read_with_one_get_many(self):
+        ids = [product.pk for product in self.products]
+        self.batch(ids)  # Back-fills the shared cache
+        ProductCache.invalidate_many([self.products[2].pk, self.products[3].pk])  # e.g. stock changed
+        ProductCache.local.clear()
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(Products.objects, 'in_bulk', wraps=Products.objects.in_bulk) as in_bulk:
+            response = self.batch(ids)
+        self.assertEqual(get_many.call_count, 1)
+        in_bulk.assert_called_once_with([self.products[2].pk, self.products[3].pk])  # Only the misses
+        self.assertEqual([item['id'] for item in response.data['results']], ids)
+
+        ProductCache.local.clear()
+        with self.assertNumQueries(0):
+            self.batch(ids)
+
+    def test_batch_entries_are_invalidated_like_single_ones(self):
+        self.batch([self.products[0].pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/products/update_product/{self.products[0].pk}', {'price': '9.99'}, format='json')
+        ProductCache.local.clear()
+        self.assertEqual(self.batch([self.products[0].pk]).data['results'][0]['price'], '9.99')
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/products/batch').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/batch', {'ids': '1,x'}).status_code, 400)
+        self.assertEqual(self.batch(range(1, 102)).status_code, 400)
+
+
+class ProductListingTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.products = [
+            Products.objects.create(name=f"Product {i}", price=Decimal('5.00'), description="Long text " * 50)
+            for i in range(5)
+        ]
+
+    def test_listing_is_paginated_newest_first(self):
+        response = self.client.get('/api/products/', {'page_size': 2})
+        seen = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [item['id'] for item in response.data['results']]
+        self.assertEqual(seen, [product.pk for product in reversed(self.products)])
+
+    def test_fieldset_limits_output_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/products/', {'fields': 'id,name'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+        self.assertNotIn('description', queries.captured_queries[0]['sql'])
+        self.assertNotIn('price', queries.captured_queries[0]['sql'])
+        self.assertEqual(set(self.client.get('/api/products/').data['results'][0]),
+                         {'id', 'name', 'price', 'stock_quantity'})
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self.client.get('/api/products/', {'fields': 'id,description'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/products/', {'fields': ','}).status_code, 400)
+
+    def test_benchmark_command_reports_each_variant(self):
+        out = StringIO()
+        call_command('benchmark_product_listing', products=30, page_size=5, repeat=1, stdout=out)
+        self.assertIn('?fields=id,name', out.getvalue())
+        self.assertEqual(Products.objects.count(), 5)  # Synthetic products are rolled back
+
+
+class ProductSearchTestMixin:
+    """Behaviour every search backend must have."""
+    backend_path = None
+
+    def setUp(self):
+        self.client = APIClient()
+        self.stand = Products.objects.create(name="Laptop stand", price=Decimal('30.00'),
+                                             description="Aluminium stand for any laptop")
+        self.sleeve = Products.objects.create(name="Sleeve", price=Decimal('15.00'),
+                                              description="Padded laptop sleeve")
+        self.lamp = Products.objects.create(name="Desk lamp", price=Decimal('25.00'), description="Warm light")
+
+    def search(self, query, **kwargs):
+        with override_settings(PRODUCT_SEARCH_BACKEND=self.backend_path):
+            return get_search_backend().search(query, **kwargs)
+
+    def test_ranks_name_matches_first_and_requires_every_term(self):
+        self.assertEqual(self.search("laptop").ids, [self.stand.pk, self.sleeve.pk])
+        self.assertEqual(self.search("LAP sta").ids, [self.stand.pk])  # Prefixes, any case, all terms
+        self.assertEqual(self.search("laptop", fields=['description']).ids, [self.sleeve.pk, self.stand.pk])
+        self.assertEqual(self.search("chair").ids, [])
+        self.assertEqual(self.search("  ").ids, [])
+
+    def test_pages(self):
+        first = self.search("laptop", limit=1)
+        second = self.search("laptop", offset=1, limit=1)
+        self.assertEqual((first.ids, first.has_more), ([self.stand.pk], True))
+        self.assertEqual((second.ids, second.has_more), ([self.sleeve.pk], False))
+
+    def test_index_follows_saves_and_deletes(self):
+        with override_settings(PRODUCT_SEARCH_BACKEND=self.backend_path):
+            self.lamp.name = "Laptop lamp"
+            self.lamp.save()
+            self.assertIn(self.lamp.pk, self.search("laptop").ids)
+            self.sleeve.delete()
+            self.assertEqual(self.search("sleeve").ids, [])
+
+    def test_views_use_the_index(self):
+        with override_settings(PRODUCT_SEARCH_BACKEND=self.backend_path):
+            response = self.client.get('/api/products/filter_products/', {'name': 'laptop'})
+            self.assertEqual([item['id'] for item in response.data], [self.stand.pk])
+            response = self.client.get('/api/products/filter_products/', {'description': 'laptop', 'max_price': 20})
+            self.assertEqual([item['id'] for item in response.data], [self.sleeve.pk])
+
+            response = self.client.post('/api/products/filter_products_wth_pagination/?page_size=1',
+                                        {'query': 'laptop'}, format='json')
+            self.assertEqual([item['id'] for item in response.data['results']], [self.stand.pk])
+            response = self.client.post(response.data['next'], {'query': 'laptop'}, format='json')
+            self.assertEqual([item['id'] for item in response.data['results']], [self.sleeve.pk])
+            self.assertIsNone(response.data['next'])
+
+    def test_truncated_matches_are_flagged(self):
+        with override_settings(PRODUCT_SEARCH_BACKEND=self.backend_path):
+            response = self.client.get('/api/products/filter_products/', {'description': 'laptop'})
+            self.assertNotIn('X-Search-Truncated', response)
+            with mock.patch('products.views.MAX_SEARCH_RESULTS', 1):
+                response = self.client.get('/api/products/filter_products/', {'description': 'laptop'})
+            self.assertEqual(len(response.data), 1)
+            self.assertEqual(response['X-Search-Truncated'], 'true')
+            with mock.patch.object(ProductFacets, 'max_matches', 1):
+                self.assertTrue(ProductFacets.get("laptop", {})['truncated'])
+            self.assertFalse(ProductFacets.get("lamp", {})['truncated'])
+
+
+class InvertedIndexSearchTests(ProductSearchTestMixin, TestCase):
+    backend_path = 'products.search.inverted.InvertedIndexBackend'
+
+    def test_postings_are_weighted_by_field_and_searched_in_one_query(self):
+        postings = ProductSearchToken.objects.filter(product=self.stand, token='laptop')
+        weights = dict(postings.values_list('field', 'weight'))
+        self.assertEqual(weights, {'name': 3, 'description': 1})
+        with self.assertNumQueries(1):
+            self.search("laptop stand", limit=20)
+
+    def test_rebuild_restores_the_index(self):
+        ProductSearchToken.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_product_search_index', stdout=out)
+        self.assertIn("Indexed 3 products", out.getvalue())
+        self.assertEqual(self.search("laptop").ids, [self.stand.pk, self.sleeve.pk])
+
+    def test_migration_backfills_existing_products_in_batches(self):
+        migration = importlib.import_module('products.migrations.0006_productsearchtoken')
+        expected = set(ProductSearchToken.objects.values_list('product_id', 'field', 'token', 'weight'))
+        ProductSearchToken.objects.all().delete()
+        schema_editor = mock.Mock(connection=connection)  # Only its connection is used
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            migration.index_existing_products(apps, schema_editor)
+        self.assertEqual(set(ProductSearchToken.objects.values_list('product_id', 'field', 'token', 'weight')),
+                         expected)
+
+
+class SQLiteFTS5SearchTests(ProductSearchTestMixin, TestCase):
+    backend_path = 'products.search.sqlite.SQLiteFTS5Backend'
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("FTS5 is only available on SQLite")
+        SQLiteFTS5Backend().create_schema()  # Not configured for the test run, so not migrated
+        super().setUp()
+
+    def test_schema_is_created_only_for_the_configured_backend(self):
+        with connection.cursor() as cursor:
+            SQLiteFTS5Backend().drop_schema()
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'products_fts%%'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+            call_command('rebuild_product_search_index', stdout=StringIO())  # Default backend: nothing native
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'products_fts%%'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+            out = StringIO()
+            with override_settings(PRODUCT_SEARCH_BACKEND=self.backend_path):
+                call_command('rebuild_product_search_index', stdout=out)
+                self.assertEqual(self.search("laptop").ids, [self.stand.pk, self.sleeve.pk])
+            self.assertIn("Created the SQLiteFTS5Backend structures", out.getvalue())
+            call_command('rebuild_product_search_index', '--drop-unused', stdout=StringIO())
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'products_fts%%'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class ProductFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.desks = Category.objects.create(name="Desks")
+        self.lights = Category.objects.create(name="Lights")
+        self.stand = Products.objects.create(name="Laptop stand", price=Decimal('300.00'), category=self.desks,
+                                             description="Aluminium stand for any laptop")
+        self.table = Products.objects.create(name="Laptop table", price=Decimal('6500.00'), category=self.desks,
+                                             is_available=False)
+        self.lamp = Products.objects.create(name="Desk lamp", price=Decimal('750.00'), category=self.lights)
+
+    def post(self, body, query_string=''):
+        return self.client.post(f'/api/products/filter_products_wth_pagination/{query_string}', body, format='json')
+
+    def test_counts_categories_price_buckets_and_availability(self):
+        facets = ProductFacets.get("", {})
+        self.assertEqual(facets['category'], [
+            {'id': self.desks.pk, 'name': "Desks", 'count': 2},
+            {'id': self.lights.pk, 'name': "Lights", 'count': 1},
+        ])
+        self.assertEqual({bucket['key']: bucket['count'] for bucket in facets['price']},
+                         {'under_500': 1, '500_1000': 1, '1000_5000': 0, '5000_plus': 1})
+        self.assertEqual(facets['is_available'], {'true': 2, 'false': 1})
+
+        facets = ProductFacets.get("LAPTOP", {'is_available': True})
+        self.assertEqual(facets['category'], [{'id': self.desks.pk, 'name': "Desks", 'count': 1}])
+
+    def test_each_facet_ignores_its_own_filter(self):
+        facets = ProductFacets.get("", {'category': self.desks.pk, 'price': '500_1000'})
+        # Categories are counted within the selected price range, prices within the selected category
+        self.assertEqual(facets['category'], [{'id': self.lights.pk, 'name': "Lights", 'count': 1}])
+        self.assertEqual({bucket['key']: bucket['count'] for bucket in facets['price']},
+                         {'under_500': 1, '500_1000': 0, '1000_5000': 0, '5000_plus': 1})
+        self.assertEqual(facets['is_available'], {'true': 0, 'false': 0})  # Both filters apply
+
+        facets = ProductFacets.get("", {'category': self.lights.pk})  # Selecting one keeps the others visible
+        self.assertEqual([(item['id'], item['count']) for item in facets['category']],
+                         [(self.desks.pk, 2), (self.lights.pk, 1)])
+
+    def test_cached_per_normalized_query_until_the_catalog_changes(self):
+        ProductFacets.get("laptop stand", {})
+        with self.assertNumQueries(0):
+            ProductFacets.get("Stand  LAPTOP", {})  # Same terms, another order and case
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.category = self.desks
+            self.lamp.save()
+        facets = ProductFacets.get("", {})
+        self.assertEqual(facets['category'], [{'id': self.desks.pk, 'name': "Desks", 'count': 3}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.desks.name = "Workspace"
+            self.desks.save()
+        self.assertEqual(ProductFacets.get("", {})['category'][0]['name'], "Workspace")
+
+    def test_view_filters_results_and_returns_facets(self):
+        response = self.post({'price': '5000_plus'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.table.pk])
+        self.assertEqual(response.data['facets']['is_available'], {'true': 0, 'false': 1})
+
+        response = self.post({'query': 'laptop', 'category': self.desks.pk, 'is_available': True})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.stand.pk])
+        self.assertEqual(response.data['facets']['category'], [{'id': self.desks.pk, 'name': "Desks", 'count': 1}])
+
+        self.assertEqual(self.post({'price': 'cheap'}).status_code, 400)
+        self.assertEqual(self.post({'is_available': 'yes'}).status_code, 400)
+        self.assertEqual(self.post({'category': 'desks'}).status_code, 400)
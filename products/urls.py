@@ -12,6 +12,10 @@ urlpatterns = [
     path('', views.create_r_get_products),
     # Maps the 'get_product' view to retrieve a specific product based on its ID.
     path('<int:id>/', views.get_product, name="get_product"),
+    # Many products by ID in one request (?ids=1,2,3)
+    path("batch", views.get_products_batch, name="get_products_batch"),
+    # Hit rates of the product cache tiers in the worker serving the request
+    path("cache_stats/", views.product_cache_stats, name="product_cache_stats"),
     path("filter_products/", views.filter_products, name="filter_products"),
     path("update_product/<int:id>", views.update_product, name="update_product"),
     path("delete_product/<int:id>/", views.delete_product, name="delete_product"),
@@ -1,5 +1,3 @@
-from Demos.mmapfile_demo import page_size
-from django.core.cache import cache
 from django.shortcuts import render
 from django.http import  HttpResponse
 from django.views.generic import DeleteView
@@ -7,15 +5,25 @@ from rest_framework.decorators import api_view
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework import status
+from orders.pagination import KeysetPagination
+from products.cache import ProductCache
 from products.models import Products
+from products.search import get_search_backend
+from products.search.facets import ProductFacets
 from products.serializers import ProductSerializer
 # from products.serializers import OrderSerializer
 from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Q  # To handle complex filters
+from django.conf import settings  # Optional search limits
 import logging
 logger = logging.getLogger(__name__)  # Logger for debugging errors
 
+MAX_BATCH_IDS = 100  # Upper bound for `ids` in the batch lookup
+# Upper bound for search matches in filter_products; responses cut at it carry `X-Search-Truncated: true`
+MAX_SEARCH_RESULTS = getattr(settings, 'PRODUCT_SEARCH_MAX_RESULTS', 1000)
+
 from django.db import transaction
 
 def greet(request):
@@ -37,11 +45,23 @@ def greet(request):
 @api_view(['GET', 'POST'])
 def create_r_get_products(request):
     if request.method == 'GET':
-        # Fetch all products from the database
-        data = Products.objects.all()
-        # Serialize the data for JSON response
-        serialized_products = ProductSerializer(data, many=True)
-        return Response(serialized_products.data)  # Return the serialized data
+        # One page of products, newest first, as {"next": <url or null>, "results": [...]}.
+        # `?fields=id,name` returns only those fields and loads only those columns (plus the cursor ones)
+        fields = request.query_params.get('fields')
+        if fields:
+            fields = list(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+            unknown = [name for name in fields if name not in ProductSerializer.Meta.fields]
+            if unknown or not fields:
+                return Response({'error': f"fields must be a subset of: {', '.join(ProductSerializer.Meta.fields)}."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        else:
+            fields = list(ProductSerializer.Meta.fields)
+
+        paginator = ProductCursorPagination()
+        # Keyset pagination seeks on the (created_at, id) index instead of reading every row
+        page = paginator.paginate_queryset(Products.objects.only(*fields, *paginator.field_names), request)
+        serialized_products = ProductSerializer(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serialized_products.data)
 
     elif request.method == 'POST':
         # Deserialize and validate the incoming JSON data
@@ -52,26 +72,52 @@ def create_r_get_products(request):
         return Response(serialized_products.errors, status=status.HTTP_400_BAD_REQUEST)  # Error response
 
 
+def load_product(id):
+    # Serialized product straight from the DB, or None if it does not exist
+    product = Products.objects.filter(id=id).first()
+    return ProductSerializer(product).data if product is not None else None
+
+
 @api_view(['GET'])
 def get_product(request, id):
-    try:
-        #first checking the cache before retrieving data from the db
-        cache_key = f'products_{id}'
-        data = cache.get(cache_key)
-        if data:
-            return Response(data, status=status.HTTP_200_OK)
-
-        # Retrieves a single product based on the provided ID from the DB
-        data = Products.objects.get(id=id)
-        # Serializes the specific product data into a format suitable for JSON responses.
-        serialized_products = ProductSerializer(data)
-        # Extracts the serialized product data (in JSON format).
-        serialized_data = serialized_products.data
-        #setting the serialized data as the value of the cache key
-        cache.set(cache_key, serialized_data)
-        return Response(serialized_data) ## Sends the serialized product data as an API response.
-    except Products.DoesNotExist:
+    # Served from the product cache; saves, deletes and stock changes invalidate the
+    # entry, concurrent misses share one DB query and unknown IDs are cached briefly as well
+    data = ProductCache.fetch(id, load_product)
+    if data is None:
         return Response({'error': f'Product with ID {id} does not exist.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(data, status=status.HTTP_200_OK)
+
+
+def load_products(ids):
+    # Serialized products for the IDs that exist, with a single DB query
+    return {pk: ProductSerializer(product).data for pk, product in Products.objects.in_bulk(ids).items()}
+
+
+@api_view(['GET'])
+def get_products_batch(request):
+    # Many products in one request: one cache read for all of them, one DB query for the misses.
+    # Results keep the order of `ids` (null where a product does not exist) and `missing` lists those IDs
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()))
+    except ValueError:
+        return Response({'error': 'ids must be a comma-separated list of integers.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not ids:
+        return Response({'error': 'ids is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > MAX_BATCH_IDS:
+        return Response({'error': f'At most {MAX_BATCH_IDS} products can be fetched per request.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    products = ProductCache.fetch_many(ids, load_products)
+    return Response({
+        'results': [products[pk] for pk in ids],
+        'missing': [pk for pk in ids if products[pk] is None],
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def product_cache_stats(request):
+    # Hit rates of the in-process and shared product cache tiers, for the worker that answers
+    return Response(ProductCache.stats(), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -96,13 +142,20 @@ def filter_products(request):
     if min_price and max_price and min_price > max_price: #validation for the Prices
         return Response({'error': 'Minimum price cannot be greater than maximum price.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Initialize an empty filter using Q objects to dynamically combine conditions
+    # Name and description are matched through the search index (word prefixes, best match first)
+    # instead of leading-wildcard LIKE scans; at most MAX_SEARCH_RESULTS matches are considered
+    backend = get_search_backend()
+    ranked, truncated = None, False
+    for field, text in (('name', name), ('description', description)):
+        if text and text.strip():
+            ids, has_more = backend.search(text, fields=[field], limit=MAX_SEARCH_RESULTS)
+            truncated = truncated or has_more
+            matches = set(ids)
+            ranked = ids if ranked is None else [pk for pk in ranked if pk in matches]
+
     filter_query = Q()
-    if name:   # Add a condition to filter products by name
-        filter_query &= Q(name__icontains=name)   #&= means and query was getting constructed
-    # add a condition to filter based on Description and Skip filtering by description if it's empty
-    if description and not description.strip():
-        filter_query &= Q(description__icontains=description)
+    if ranked is not None:
+        filter_query &= Q(pk__in=ranked)
     if min_price:
         filter_query &= Q(price__gte=min_price)  #Products with price >= min_price
     if max_price:
@@ -110,10 +163,16 @@ def filter_products(request):
 
     # Fetch products from the database that match the constructed filter query
     filtered_products = Products.objects.filter(filter_query)
+    if ranked is not None:  # Keep the relevance order of the search
+        position = {pk: index for index, pk in enumerate(ranked)}
+        filtered_products = sorted(filtered_products, key=lambda product: position[product.pk])
     # Serialize the filtered products to convert them into a JSON-friendly format
     serialized_products = ProductSerializer(filtered_products, many=True)
-    # Return the response with filtered data
-    return Response(serialized_products.data, status=status.HTTP_200_OK)
+    # Return the response with filtered data, flagging results cut at MAX_SEARCH_RESULTS matches
+    response = Response(serialized_products.data, status=status.HTTP_200_OK)
+    if truncated:
+        response['X-Search-Truncated'] = 'true'
+    return response
 
 
 #PATCH allows partial updates without affecting others, and also can update fully.
@@ -151,36 +210,81 @@ class ProductPaginator(PageNumberPagination):
     page_size_query_param = 'page_size'  # Allows dynamic resizing via query params
     max_page_size = 50  # Prevents excessive data requests that could slow down the server
 
+# Cursor pagination for the product listing, newest first
+class ProductCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')  # Matches the (created_at, id) index
+    page_size = 20  # Default number of products per page
+    max_page_size = 100  # Upper bound for `page_size`
+
 # ✅ API View get the filtered products with Post request and pagination applied
 class PageViewSet(APIView):
 
     def post(self, request):
-        # 🎯 Get search query and sorting preference from request body
+        # 🎯 Get search query, facet filters and sorting preference from request body
         query = request.data.get("query", "")
         order_by = request.data.get("order_by", "-created_at")
+        try:
+            filters = ProductFacets.parse_filters(request.data)  # category, is_available, price (bucket key)
+        except (TypeError, ValueError) as e:
+            return Response({"error": str(e) or "Invalid filters"}, status=400)
 
         # 🛠 Validate ordering field to prevent unexpected errors
         valid_ordering = {"created_at", "name", "price", "-created_at", "-name", "-price"}
         if order_by not in valid_ordering:
             order_by = "-created_at"  # Default fallback
 
-        # 🔍 Build filtering query using Q() for flexibility
-        filters = Q()
+        # 📊 Facet counts for the query and filters, served from the facet cache when possible
+        facets = ProductFacets.get(query, filters)
+
+        # 🔍 With a query, products come from the search index ranked by relevance (order_by only
+        # applies when browsing without one)
         if query:
-            filters |= Q(name__icontains=query) | Q(description__icontains=query)  # Case-insensitive search on name & description
+            return self.search(request, query, filters, facets)
 
-        # 📦 Fetch filtered and sorted products from the database
-        queryset = Products.objects.filter(filters).order_by(order_by)
+        # 📦 Fetch filtered, sorted products from the database (filters use the composite indexes)
+        queryset = ProductFacets.apply_filters(Products.objects.all(), filters).order_by(order_by)
 
         # 🔢 Apply pagination with error handling in this post request to get the data
         paginator = ProductPaginator()
         try:
             result = paginator.paginate_queryset(queryset, request)
         except Exception as e:
-            self.logger.error(f"Pagination error: {e}")
+            logger.error(f"Pagination error: {e}")
             return Response({"error": "Invalid pagination parameters"}, status=400)
 
         # 📝 Serialize results before returning
         serializer = ProductSerializer(result, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        response = paginator.get_paginated_response(serializer.data)
+        response.data['facets'] = facets
+        return response
+
+    def search(self, request, query, filters, facets):
+        # One page of search results: the backend ranks and pages the IDs, one query loads the rows.
+        # Same `page`/`page_size` parameters as browsing; there is no total count, which would
+        # mean reading every match
+        paginator = ProductPaginator()
+        page_size = paginator.get_page_size(request)
+        try:
+            page_number = int(request.query_params.get(paginator.page_query_param, 1))
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            return Response({"error": "Invalid pagination parameters"}, status=400)
 
+        offset = (page_number - 1) * page_size
+        if filters:  # Rank the matches, then keep those passing the filters (one query)
+            ranked = get_search_backend().search(query, limit=ProductFacets.max_matches).ids
+            kept = set(ProductFacets.apply_filters(Products.objects.filter(pk__in=ranked), filters)
+                       .values_list('pk', flat=True))
+            ranked = [pk for pk in ranked if pk in kept]
+            ids, has_more = ranked[offset:offset + page_size], len(ranked) > offset + page_size
+        else:
+            ids, has_more = get_search_backend().search(query, offset=offset, limit=page_size)
+        products = Products.objects.in_bulk(ids)
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, paginator.page_query_param, page_number + 1) if has_more else None,
+            'previous': replace_query_param(url, paginator.page_query_param, page_number - 1) if page_number > 1 else None,
+            'results': ProductSerializer([products[pk] for pk in ids if pk in products], many=True).data,
+            'facets': facets,
+        })
@@ -0,0 +1,48 @@
+from datetime import date, timedelta  # Day ranges
+
+from django.core.management.base import BaseCommand, CommandError  # Base class for custom manage.py commands
+from django.db.models import Min  # Earliest order
+from django.utils import timezone  # Today, and the local day of the first order
+
+from orders.models import ArchivedOrder, Order  # History to roll up
+from reports.services import SalesRollupService  # Rollup rebuild
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the daily sales rollups from order history, a chunk of days at a time.
+    Every chunk is replaced in its own transaction, so the command can be stopped and resumed
+    with --start. Recent days still receiving orders are best rebuilt during a quiet period.
+
+    Usage:
+        python manage.py backfill_sales_rollups [--start 2024-01-01] [--end 2024-12-31] [--chunk-days 7]
+    """
+    help = "Recompute daily product sales and order status rollups from orders, in chunks of days."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help="First day (default: day of the first order)")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day (default: today)")
+        parser.add_argument('--chunk-days', type=int, default=7, help="Days rebuilt per transaction")
+
+    def handle(self, *args, **options):
+        start = options['start'] or self.first_order_day()
+        end = options['end'] or timezone.localdate()
+        if start is None:
+            self.stdout.write("No orders to roll up")
+            return
+        if start > end:
+            raise CommandError("--start must not be after --end")
+
+        chunk = timedelta(days=max(options['chunk_days'], 1))
+        day = start
+        while day <= end:
+            last = min(day + chunk - timedelta(days=1), end)
+            products, statuses = SalesRollupService.rebuild(day, last)
+            self.stdout.write(f"{day}..{last}: {products} product rows, {statuses} status rows")
+            day = last + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups for {start}..{end}"))
+
+    def first_order_day(self):
+        firsts = [model.objects.aggregate(first=Min('created_at'))['first'] for model in (Order, ArchivedOrder)]
+        firsts = [first for first in firsts if first is not None]
+        return timezone.localdate(min(firsts)) if firsts else None
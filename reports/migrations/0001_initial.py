@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-17 23:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('products', '0004_remove_orderproduct_order_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Day the orders were placed', verbose_name='Day')),
+                ('status', models.CharField(choices=[('pending', 'Pending Confirmation'), ('confirmed', 'Confirmed'), ('partial', 'Partially Paid'), ('paid', 'Fully Paid'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('returned', 'Returned')], max_length=15, verbose_name='Order Status')),
+                ('count', models.IntegerField(default=0, help_text='Orders placed on this day that are currently in this status', verbose_name='Orders')),
+            ],
+            options={
+                'verbose_name': 'Daily Order Status Count',
+                'verbose_name_plural': 'Daily Order Status Counts',
+                'unique_together': {('day', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Day the orders were placed', verbose_name='Day')),
+                ('units', models.IntegerField(default=0, help_text='Units sold', verbose_name='Units')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Units × price at purchase', max_digits=14, verbose_name='Revenue')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.products', verbose_name='Product')),
+            ],
+            options={
+                'verbose_name': 'Daily Product Sales',
+                'verbose_name_plural': 'Daily Product Sales',
+                'indexes': [models.Index(fields=['product', 'day'], name='reports_dai_product_b3b10a_idx')],
+                'unique_together': {('day', 'product')},
+            },
+        ),
+    ]
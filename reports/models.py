@@ -0,0 +1,73 @@
+from django.db import models  # Django's ORM library for defining and managing database models
+from products.models import Products  # Rollups are kept per product
+from orders.models import Order  # Status choices for the per-status counts
+
+
+class DailyProductSales(models.Model):
+    """
+    Units and revenue booked per product per day (day of the order's creation).
+    Cancelled and returned orders are not sales, so their lines are taken back out.
+    Maintained incrementally by `SalesRollupService`; rebuilt by `backfill_sales_rollups`.
+    """
+    day = models.DateField(
+        verbose_name="Day",  # User-friendly name shown in the admin interface
+        help_text="Day the orders were placed"  # Explains what this field represents
+    )
+    product = models.ForeignKey(
+        Products,
+        on_delete=models.CASCADE,  # Rollups go with their product
+        related_name='daily_sales',  # Reverse lookup from a product to its daily figures
+        verbose_name="Product"
+    )
+    units = models.IntegerField(
+        default=0,  # Signed so deltas can be applied in any order
+        verbose_name="Units",
+        help_text="Units sold"
+    )
+    revenue = models.DecimalField(
+        max_digits=14,  # A day of a popular product can outgrow a single order's 12 digits
+        decimal_places=2,
+        default=0,
+        verbose_name="Revenue",
+        help_text="Units × price at purchase"
+    )
+
+    class Meta:
+        unique_together = ('day', 'product')  # One row per product per day; also serves date range scans
+        indexes = [
+            models.Index(fields=['product', 'day']),  # One product's history
+        ]
+        verbose_name = "Daily Product Sales"
+        verbose_name_plural = "Daily Product Sales"
+
+    def __str__(self):
+        return f"{self.day} product {self.product_id}: {self.units} units, ₹{self.revenue:.2f}"
+
+
+class DailyOrderStatusCount(models.Model):
+    """
+    Number of orders placed on a day that are currently in each status.
+    Maintained incrementally by `SalesRollupService`; rebuilt by `backfill_sales_rollups`.
+    """
+    day = models.DateField(
+        verbose_name="Day",
+        help_text="Day the orders were placed"
+    )
+    status = models.CharField(
+        max_length=15,
+        choices=Order.OrderStatus.choices,  # Same statuses as orders
+        verbose_name="Order Status"
+    )
+    count = models.IntegerField(
+        default=0,  # Signed so deltas can be applied in any order
+        verbose_name="Orders",
+        help_text="Orders placed on this day that are currently in this status"
+    )
+
+    class Meta:
+        unique_together = ('day', 'status')  # One row per status per day; also serves date range scans
+        verbose_name = "Daily Order Status Count"
+        verbose_name_plural = "Daily Order Status Counts"
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.count}"
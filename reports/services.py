@@ -0,0 +1,195 @@
+import logging  # Failed rollup writes are logged, never raised to the order request
+from collections import defaultdict  # Delta accumulation
+from datetime import datetime, time, timedelta  # Day boundaries for rebuilds
+from decimal import Decimal  # Monetary arithmetic
+
+from django.db import IntegrityError, transaction  # Rollup writes run after the order commits
+from django.db.models import Count, DecimalField, F, Sum  # Rebuild aggregates and increments
+from django.db.models.functions import TruncDate  # Group orders by local day
+from django.utils import timezone  # Local day of an order
+
+from orders.models import ArchivedOrder, ArchivedOrderProduct, Order, OrderProduct  # Source of truth
+from .models import DailyOrderStatusCount, DailyProductSales  # Rollup tables
+
+logger = logging.getLogger(__name__)
+
+
+class SalesRollupService:
+    """
+    Maintains the daily sales rollups from order lifecycle events.
+
+    - Receivers translate `orders_status_changed` / `order_lines_changed` into per-day deltas.
+    - Deltas are written after the order transaction commits (one short transaction per commit),
+      so checkouts never wait on the shared rollup rows and rolled-back orders never count.
+    - Each write locks the affected rollup rows, applies `F() + delta` with `bulk_update` and
+      inserts the missing rows with `bulk_create`: a constant number of queries per event.
+    - `rebuild` recomputes a range of days from live and archived orders (backfill and repair).
+    """
+
+    @staticmethod
+    def day_of(created_at):
+        """
+        The reporting day an order belongs to (local calendar day of its creation).
+        """
+        return timezone.localdate(created_at)
+
+    @staticmethod
+    def record_line_changes(created_at, changes):
+        """
+        Queue per-product unit and revenue deltas of one order.
+        Args:
+            created_at: Creation time of the order.
+            changes: dict of product ID -> (units, revenue) deltas.
+        """
+        day = SalesRollupService.day_of(created_at)
+        sales = {(day, product_id): delta for product_id, delta in changes.items() if any(delta)}
+        SalesRollupService._defer(sales, {})
+
+    @staticmethod
+    def record_status_changes(changes):
+        """
+        Queue per-status count deltas for orders that were created or changed status.
+        Orders that became cancelled or returned also take their lines out of the sales rollup.
+        Args:
+            changes: list of (order_id, created_at, old_status, new_status).
+        """
+        counts = defaultdict(int)  # (day, status) -> change in count
+        lost_sales = {}  # order ID -> day, for orders whose lines no longer count as sales
+        for order_id, created_at, old_status, new_status in changes:
+            day = SalesRollupService.day_of(created_at)
+            if old_status is not None:
+                counts[(day, old_status)] -= 1
+            counts[(day, new_status)] += 1
+            if (old_status is not None and new_status in Order.STOCK_RELEASE_STATUSES and
+                    old_status not in Order.STOCK_RELEASE_STATUSES):
+                lost_sales[order_id] = day
+
+        sales = defaultdict(lambda: (0, Decimal('0')))  # (day, product ID) -> (units, revenue)
+        if lost_sales:  # One query for the lines of every cancelled/returned order
+            lines = OrderProduct.objects.filter(order_id__in=lost_sales) \
+                                        .values_list('order_id', 'product_id', 'quantity', 'price_at_purchase')
+            for order_id, product_id, quantity, price in lines:
+                units, revenue = sales[(lost_sales[order_id], product_id)]
+                sales[(lost_sales[order_id], product_id)] = (units - quantity, revenue - quantity * price)
+
+        SalesRollupService._defer(dict(sales), {key: n for key, n in counts.items() if n})
+
+    @staticmethod
+    def _defer(sales, counts):
+        """
+        Write the deltas once the surrounding transaction commits.
+        The order is already committed by then, so a failed rollup write is logged instead of
+        failing the request (the affected days can be repaired with `backfill_sales_rollups`).
+        """
+        if sales or counts:
+            transaction.on_commit(lambda: SalesRollupService._apply_logged(sales, counts))
+
+    @staticmethod
+    def _apply_logged(sales, counts):
+        try:
+            SalesRollupService.apply(sales, counts)
+        except Exception:
+            days = sorted({day for day, _ in sales} | {day for day, _ in counts})
+            logger.error(f"Sales rollup update failed for {', '.join(map(str, days))}; "
+                         f"run backfill_sales_rollups for these days", exc_info=True)
+
+    @staticmethod
+    def apply(sales, counts):
+        """
+        Adds the deltas to the rollup tables.
+        Args:
+            sales: dict of (day, product ID) -> (units, revenue).
+            counts: dict of (day, status) -> change in order count.
+        """
+        with transaction.atomic():
+            SalesRollupService._increment(
+                DailyProductSales, ('day', 'product_id'), ('units', 'revenue'), sales
+            )
+            SalesRollupService._increment(
+                DailyOrderStatusCount, ('day', 'status'), ('count',),
+                {key: (n,) for key, n in counts.items()}
+            )
+
+    @staticmethod
+    def _increment(model, key_fields, value_fields, deltas):
+        """
+        Adds `deltas` ({key tuple: value tuple}) to `model` rows, creating missing rows.
+        """
+        if not deltas:
+            return
+        for attempt in range(2):  # A concurrent first insert of the same key is retried as an update
+            existing = {
+                tuple(getattr(row, name) for name in key_fields): row
+                for row in model.objects.select_for_update().filter(**{
+                    f'{name}__in': {key[index] for key in deltas} for index, name in enumerate(key_fields)
+                })
+            }  # May include extra combinations of the key values; only matching keys are used
+
+            to_update, to_create = [], []
+            for key, values in deltas.items():
+                row = existing.get(key)
+                if row is None:
+                    to_create.append(model(**dict(zip(key_fields, key)), **dict(zip(value_fields, values))))
+                    continue
+                for name, value in zip(value_fields, values):
+                    setattr(row, name, F(name) + value)
+                to_update.append(row)
+
+            try:
+                with transaction.atomic():  # Savepoint so a lost insert race can be retried
+                    if to_update:
+                        model.objects.bulk_update(to_update, value_fields)
+                    if to_create:
+                        model.objects.bulk_create(to_create)
+                return
+            except IntegrityError:
+                if attempt:
+                    raise
+
+    @staticmethod
+    def rebuild(first_day, last_day):
+        """
+        Recomputes the rollups for `first_day`..`last_day` (inclusive) from live and archived orders,
+        replacing whatever is stored for those days.
+        Returns:
+            (product rows, status rows) written.
+        """
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(first_day, time.min), tz)
+        end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min), tz)
+        revenue = Sum(F('quantity') * F('price_at_purchase'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+        sales = defaultdict(lambda: [0, Decimal('0')])
+        for model in (OrderProduct, ArchivedOrderProduct):
+            rows = model.objects.filter(order__created_at__gte=start, order__created_at__lt=end) \
+                .exclude(order__status__in=Order.STOCK_RELEASE_STATUSES) \
+                .order_by() \
+                .values('product_id', day=TruncDate('order__created_at', tzinfo=tz)) \
+                .annotate(units=Sum('quantity'), revenue=revenue) \
+                .values_list('day', 'product_id', 'units', 'revenue')
+            for day, product_id, units, amount in rows:
+                sales[(day, product_id)][0] += units
+                sales[(day, product_id)][1] += amount
+
+        counts = defaultdict(int)
+        for model in (Order, ArchivedOrder):
+            rows = model.objects.filter(created_at__gte=start, created_at__lt=end) \
+                .order_by() \
+                .values('status', day=TruncDate('created_at', tzinfo=tz)) \
+                .annotate(count=Count('pk')) \
+                .values_list('day', 'status', 'count')
+            for day, status, count in rows:
+                counts[(day, status)] += count
+
+        with transaction.atomic():
+            DailyProductSales.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+            DailyOrderStatusCount.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+            DailyProductSales.objects.bulk_create([
+                DailyProductSales(day=day, product_id=product_id, units=units, revenue=amount)
+                for (day, product_id), (units, amount) in sales.items()
+            ], batch_size=1000)
+            DailyOrderStatusCount.objects.bulk_create([
+                DailyOrderStatusCount(day=day, status=status, count=count)
+                for (day, status), count in counts.items()
+            ], batch_size=1000)
+        return len(sales), len(counts)
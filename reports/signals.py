@@ -0,0 +1,14 @@
+from django.dispatch import receiver  # Signal receiver decorator
+
+from orders.events import order_lines_changed, orders_status_changed  # Order lifecycle events
+from .services import SalesRollupService  # Rollup maintenance
+
+
+@receiver(orders_status_changed)
+def order_statuses_changed(sender, changes, **kwargs):
+    SalesRollupService.record_status_changes(changes)  # Per-status counts, and lost sales on cancel/return
+
+
+@receiver(order_lines_changed)
+def order_lines_changed_receiver(sender, order_id, created_at, changes, **kwargs):
+    SalesRollupService.record_line_changes(created_at, changes)  # Units and revenue per product
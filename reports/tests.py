@@ -0,0 +1,110 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from orders.models import Order
+from orders.services import OrderService
+from products.models import Products, User
+from .models import DailyOrderStatusCount, DailyProductSales
+from .services import SalesRollupService
+
+
+class SalesRollupTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(name="Customer")
+        self.first = Products.objects.create(name="First", price=Decimal('10.00'), stock_quantity=100)
+        self.second = Products.objects.create(name="Second", price=Decimal('2.50'), stock_quantity=100)
+        self.today = timezone.localdate()
+
+    def checkout(self, first=1, second=2):
+        with self.captureOnCommitCallbacks(execute=True):
+            return OrderService.create_order(self.user, [
+                {'product': self.first, 'quantity': first}, {'product': self.second, 'quantity': second}
+            ])
+
+    def sales(self):
+        return {
+            product_id: (units, revenue) for product_id, units, revenue in
+            DailyProductSales.objects.filter(day=self.today).values_list('product_id', 'units', 'revenue')
+        }
+
+    def counts(self):
+        return dict(DailyOrderStatusCount.objects.filter(day=self.today, count__gt=0).values_list('status', 'count'))
+
+    def test_checkout_and_line_edits_update_the_rollups(self):
+        order = self.checkout()
+        self.checkout(first=2, second=1)
+        self.assertEqual(self.sales(), {
+            self.first.pk: (3, Decimal('30.00')), self.second.pk: (3, Decimal('7.50'))
+        })
+        self.assertEqual(self.counts(), {'pending': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.update_order_lines(order, [{'product': self.second}], mode=OrderService.LINES_REMOVE)
+        self.assertEqual(self.sales()[self.second.pk], (1, Decimal('2.50')))
+
+    def test_status_changes_move_counts_and_cancellations_drop_sales(self):
+        kept, cancelled, bulk = self.checkout(), self.checkout(), self.checkout()
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.update_order_status(kept, Order.OrderStatus.CONFIRMED)
+            OrderService.update_order_status(cancelled, Order.OrderStatus.CANCELLED)
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.bulk_update_status([bulk.pk], Order.OrderStatus.RETURNED)
+
+        self.assertEqual(self.counts(), {'confirmed': 1, 'cancelled': 1, 'returned': 1})
+        self.assertEqual(self.sales(), {self.first.pk: (1, Decimal('10.00')), self.second.pk: (2, Decimal('5.00'))})
+
+    def test_failed_rollup_write_does_not_fail_the_order(self):
+        payload = {'user_id': self.user.pk, 'order_products': [{'product_id': self.first.pk, 'quantity': 1}]}
+        with mock.patch.object(SalesRollupService, 'apply', side_effect=IntegrityError("duplicate key")), \
+                self.assertLogs('reports.services', 'ERROR') as logs, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post('/api/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("backfill_sales_rollups", logs.output[0])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_rolled_back_orders_do_not_count(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                OrderService.create_order(self.user, [{'product': self.first, 'quantity': 1}])
+                transaction.set_rollback(True)
+        self.assertEqual(self.sales(), {})
+
+    def test_backfill_matches_incremental_rollups(self):
+        order = self.checkout()
+        self.checkout(first=4, second=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.update_order_status(order, Order.OrderStatus.CANCELLED)
+        incremental = (self.sales(), self.counts())
+
+        DailyProductSales.objects.all().delete()
+        DailyOrderStatusCount.objects.all().delete()
+        out = StringIO()
+        call_command('backfill_sales_rollups', chunk_days=1, stdout=out)
+        self.assertIn("Rebuilt sales rollups", out.getvalue())
+        self.assertEqual((self.sales(), self.counts()), incremental)
+
+    def test_report_reads_only_rollups(self):
+        self.checkout()
+        self.checkout(first=2, second=4)
+        client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/reports/sales/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('orders_order' in query['sql'] for query in ctx.captured_queries))
+        self.assertEqual(response.data['totals'], {'units': 9, 'revenue': '45.00', 'orders': {'pending': 2}})
+        self.assertEqual(response.data['days'], [
+            {'date': self.today.isoformat(), 'units': 9, 'revenue': '45.00', 'orders': {'pending': 2}}
+        ])
+        self.assertEqual([row['product_id'] for row in response.data['top_products']], [self.first.pk, self.second.pk])
+        self.assertEqual(client.get('/api/reports/sales/?start=2024-02-01&end=2024-01-01').status_code, 400)
+        self.assertEqual(client.get('/api/reports/sales/?start=yesterday').status_code, 400)
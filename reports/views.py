@@ -0,0 +1,80 @@
+from datetime import date, timedelta  # Report date range
+
+from django.db.models import Sum  # Aggregation over the rollup rows
+from django.utils import timezone  # Default range ends today
+from rest_framework import status  # Provides HTTP status codes like 200, 400, 404, etc.
+from rest_framework.response import Response  # Used for creating HTTP responses with JSON data.
+from rest_framework.views import APIView  # Base class for creating class-based views in Django REST Framework.
+
+from .models import DailyOrderStatusCount, DailyProductSales  # Rollup tables (the only tables this view scans)
+
+
+def _money(value):
+    """Monetary values as two-decimal strings, like the rest of the API."""
+    return f"{value or 0:.2f}"
+
+
+class SalesReportView(APIView):
+    """
+    Daily sales report read exclusively from the rollup tables.
+    """
+    default_days = 30  # Range used when no dates are given
+    max_days = 366  # Upper bound for one report
+    top_products_limit = 10  # Products listed in `top_products`
+
+    def get(self, request):
+        """
+        Handles GET requests for `?start=YYYY-MM-DD&end=YYYY-MM-DD` (both inclusive, default: last 30 days).
+        - Returns totals, one entry per day (units, revenue, orders per status) and the top products by revenue.
+        - Cost depends on the number of days and products in the range, not on the number of orders.
+        """
+        try:
+            end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params \
+                else timezone.localdate()
+            start = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params \
+                else end - timedelta(days=self.default_days - 1)
+        except ValueError:
+            return Response({'error': 'start and end must be dates (YYYY-MM-DD).'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'start must not be after end.'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days >= self.max_days:
+            return Response({'error': f'A report covers at most {self.max_days} days.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        sales = DailyProductSales.objects.filter(day__gte=start, day__lte=end)
+        days = {}  # day -> entry, filled from both rollups
+        for row in sales.order_by().values('day').annotate(units=Sum('units'), revenue=Sum('revenue')):
+            days[row['day']] = {'units': row['units'], 'revenue': row['revenue'], 'orders': {}}
+        for day, order_status, count in DailyOrderStatusCount.objects.filter(day__gte=start, day__lte=end) \
+                .values_list('day', 'status', 'count'):
+            if count:
+                days.setdefault(day, {'units': 0, 'revenue': 0, 'orders': {}})['orders'][order_status] = count
+
+        totals = {'units': 0, 'revenue': 0, 'orders': {}}
+        for entry in days.values():
+            totals['units'] += entry['units']
+            totals['revenue'] += entry['revenue']
+            for order_status, count in entry['orders'].items():
+                totals['orders'][order_status] = totals['orders'].get(order_status, 0) + count
+
+        top_products = sales.order_by().values('product_id', 'product__name') \
+            .annotate(units=Sum('units'), revenue=Sum('revenue')) \
+            .order_by('-revenue', 'product_id')[:self.top_products_limit]
+
+        return Response({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'totals': {**totals, 'revenue': _money(totals['revenue'])},
+            'days': [
+                {'date': day.isoformat(), **entry, 'revenue': _money(entry['revenue'])}
+                for day, entry in sorted(days.items())
+            ],
+            'top_products': [
+                {
+                    'product_id': row['product_id'],
+                    'product_name': row['product__name'],
+                    'units': row['units'],
+                    'revenue': _money(row['revenue']),
+                } for row in top_products
+            ],
+        })